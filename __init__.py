@@ -30,6 +30,7 @@ bl_info = {
 }
 
 import math
+import time
 import typing
 import uuid
 import bpy
@@ -39,6 +40,9 @@ from .lib.driver_utils import DriverVariableNameGenerator, driver_ensure, driver
 from .lib.curve_mapping import BCLMAP_CurveManager, to_bezier, keyframe_points_assign, draw_curve_manager_ui
 from .lib.transform_utils import transform_matrix, transform_matrix_compose, transform_matrix_flatten
 from .lib.symmetry import symmetrical_target
+from .pose_driven_shape_keys import registration
+from .pose_driven_shape_keys.core import registry
+from .pose_driven_shape_keys.core.fingerprint import fingerprint
 
 curve_mapping.BLCMAP_OT_curve_copy.bl_idname = "pose_driver_shape_keys.curve_copy"
 curve_mapping.BLCMAP_OT_curve_paste.bl_idname = "pose_driver_shape_keys.curve_paste"
@@ -47,6 +51,25 @@ curve_mapping.BLCMAP_OT_curve_edit.bl_idname = "pose_driver_shape_keys.curve_edi
 COMPAT_ENGINES = {'BLENDER_RENDER', 'BLENDER_EEVEE', 'BLENDER_WORKBENCH'}
 COMPAT_OBJECTS = {'MESH', 'LATTICE', 'CURVE', 'SURFACE'}
 
+BBONE_PROPERTIES = (
+    "bbone_curveinx",
+    "bbone_curveiny",
+    "bbone_curveinz",
+    "bbone_curveoutx",
+    "bbone_curveouty",
+    "bbone_curveoutz",
+    "bbone_easein",
+    "bbone_easeout",
+    "bbone_rollin",
+    "bbone_rollout",
+    "bbone_scaleinx",
+    "bbone_scaleiny",
+    "bbone_scaleinz",
+    "bbone_scaleoutx",
+    "bbone_scaleouty",
+    "bbone_scaleoutz",
+    )
+
 def bbone_values_apply(props: 'PoseDrivenShapeKey', bone: bpy.types.PoseBone, set_flags: typing.Optional[bool]=False) -> None:
     v3 = bpy.app.version[0] >= 3
     v2 = not v3
@@ -119,6 +142,93 @@ def distance_fcurve_set(points: bpy.types.FCurveKeyframePoints, distance: float)
         point.handle_left = hl
         point.handle_right = hr
 
+def fcurves_bone_target(fcurves: typing.Iterable[bpy.types.FCurve]) -> str:
+    for fcurve in fcurves:
+        variables = fcurve.driver.variables
+        if len(variables) > 0:
+            variable = variables[0]
+            if variable.type == 'TRANSFORMS':
+                return variable.targets[0].bone_target
+            else:
+                datapath = variable.targets[0].data_path
+                if datapath.startswith('pose.bones["'):
+                    return datapath[12:datapath.find('"]')]
+            break
+    return ""
+
+# Bumped whenever the drivers generated by PoseDrivenShapeKey.rebuild() change.
+#
+# 2: Swing and twist distances are generated from the metric registry, as the
+#    groups' are. A swing distance is now the angle between the Y axes over pi,
+#    0 at the pose (it was the opposite, 1 at the pose, with the same falloff).
+#    A twist center is keyframed at its absolute twist from the rest pose over pi
+#    (it was the signed twist, so negative twists were keyframed below zero).
+#    Rebuilding a pose driver made before these changes changes its response.
+FINGERPRINT_VERSION = 2
+
+def pose_driver_fingerprint(settings: 'PoseDrivenShapeKey', bone_target: str) -> str:
+    # Hash of everything the pose driver's drivers and keyframes are generated from.
+    # rebuild() is skipped when it matches the hash stored by the last rebuild.
+    curve = settings.falloff.curve
+    return fingerprint(FINGERPRINT_VERSION,
+                       settings.name,
+                       settings.identifier,
+                       settings.object.name if settings.object is not None else "",
+                       bone_target,
+                       settings.rotation_mode,
+                       settings.radius,
+                       settings.value,
+                       tuple(settings.transform_matrix),
+                       [getattr(settings, prop) for prop in BBONE_PROPERTIES],
+                       [getattr(settings, name) for name in settings.bl_rna.properties.keys() if name.startswith("use_")],
+                       curve.get("extend", 0),
+                       [(tuple(point.location), point.get("handle_type", 0)) for point in curve.points])
+
+class RebuildReport:
+
+    def __init__(self) -> None:
+        self.keys = 0
+        self.shape_keys = 0
+        self.drivers = 0
+        self.keyframes = 0
+        self.skipped = 0
+        self.timings = dict.fromkeys(("scan", "matrix", "drivers", "keyframes"), 0.0)
+
+    def __str__(self) -> str:
+        timings = ", ".join(f'{name} {value*1000.0:.1f}ms' for name, value in self.timings.items())
+        return (f'Rebuilt {self.shape_keys} pose drivers on {self.keys} keys '
+                f'({self.drivers} drivers, {self.keyframes} keyframes, {self.skipped} unchanged). {timings}')
+
+def pose_drivers_rebuild(keys: typing.Optional[typing.Iterable[bpy.types.Key]]=None,
+                         progress: typing.Optional[typing.Callable[[int], None]]=None,
+                         force: typing.Optional[bool]=False) -> RebuildReport:
+    report = RebuildReport()
+    clock = time.perf_counter
+
+    for index, key in enumerate(bpy.data.shape_keys if keys is None else keys):
+        if progress is not None:
+            progress(index)
+
+        if not key.is_property_set("pose_drivers") or len(key.pose_drivers) == 0:
+            continue
+
+        # Index the Key's drivers once rather than once per shape key
+        start = clock()
+        fcurves: typing.Dict[str, typing.List[bpy.types.FCurve]] = {}
+        animdata = key.animation_data
+        if animdata:
+            for fcurve in animdata.drivers:
+                fcurves.setdefault(fcurve.data_path, []).append(fcurve)
+        report.timings["scan"] += clock() - start
+
+        for settings in key.pose_drivers:
+            distance_fcurves = fcurves.get(f'["{settings.identifier}_distances"]', [])
+            settings.rebuild(fcurves_bone_target(distance_fcurves), distance_fcurves, report, force)
+
+        report.keys += 1
+
+    return report
+
 class PoseDrivenShapeKeyCurveMap(curve_mapping.BCLMAP_CurveManager, bpy.types.PropertyGroup):
 
     def update(self, context: typing.Optional[bpy.types.Context] = None) -> None:
@@ -132,18 +242,7 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
         animdata = self.id_data.animation_data
         if animdata:
             datapath = f'["{self.identifier}_distances"]'
-            for fcurve in animdata.drivers:
-                if fcurve.data_path == datapath:
-                    variables = fcurve.driver.variables
-                    if len(variables) > 0:
-                        variable = variables[0]
-                        if variable.type == 'TRANSFORMS':
-                            return variable.targets[0].bone_target
-                        else:
-                            datapath = variable.targets[0].data_path
-                            if datapath.startswith('pose.bones["'):
-                                return datapath[12:datapath.find('"]')]
-                        break
+            return fcurves_bone_target(fc for fc in animdata.drivers if fc.data_path == datapath)
         return ""
 
     def get_location(self) -> mathutils.Vector:
@@ -245,27 +344,59 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
         else:
             bone_target = self.get_bone_target()
 
+        self.rebuild(bone_target)
+
+    def rebuild(self,
+                bone_target: str,
+                fcurves: typing.Optional[typing.Iterable[bpy.types.FCurve]]=None,
+                report: typing.Optional['RebuildReport']=None,
+                force: typing.Optional[bool]=False) -> None:
+        # If given, fcurves should hold the existing distance drivers for the shape key,
+        # which saves rescanning all of the Key's drivers (see pose_drivers_rebuild)
         key = self.id_data
         distance_data_prop = f'{self.identifier}_distances'
         distance_data_path = f'["{distance_data_prop}"]'
+
+        # Skip the rebuild when nothing it reads has changed since the last one and
+        # its drivers are still in place
+        digest = pose_driver_fingerprint(self, bone_target)
+        if not force and digest == self.get("fingerprint") and distance_data_prop in key.keys():
+            animdata = key.animation_data
+            if animdata and animdata.drivers.find(self.data_path) is not None:
+                if report is not None:
+                    report.skipped += 1
+                return
+
+        clock = time.perf_counter
+        start = clock()
+
         distance_data = []
+        keyframes = []
+
         matrix = self.transform_matrix
+        location = matrix.to_translation()
+        quaternion = matrix.to_quaternion()
+        euler = matrix.to_euler()
+        scale = matrix.to_scale()
+        mode = self.rotation_mode
+
+        matrix_done = clock()
 
         animdata = key.animation_data
         if animdata:
-            for fcurve in tuple(animdata.drivers):
-                if fcurve.data_path == distance_data_path:
-                    animdata.drivers.remove(fcurve)
-        
+            if fcurves is None:
+                fcurves = [fc for fc in animdata.drivers if fc.data_path == distance_data_path]
+            for fcurve in tuple(fcurves):
+                animdata.drivers.remove(fcurve)
+
         flags = (self.use_location_x, self.use_location_y, self.use_location_z)
         if True in flags:
             distance_data.append(0.0)
 
             fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
             driver = fcurve.driver
-            points = fcurve.keyframe_points
             tokens = []
-            values = matrix.to_translation()
+            values = location
 
             driver_variables_clear(driver.variables)
 
@@ -281,24 +412,22 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                     target.transform_type = f'LOC_{axis}'
                     target.transform_space = 'LOCAL_SPACE'
 
-                    tokens.append((variable.name, str(value)))
+                    tokens.append((variable.name, value))
 
+            metric = registry.metric("euclidean")
             driver.type = 'SCRIPTED'
-            driver.expression = f'sqrt({"+".join("pow("+a+"-"+b+",2.0)" for a, b in tokens)})'
-
-            distance = math.sqrt(sum([pow(value, 2) for value in values]))
-            distance_fcurve_set(points, distance)
+            driver.expression = metric.expression(*zip(*tokens))
 
-        mode = self.rotation_mode
+            distance = float(metric.kernel(tuple(values), (0.0, 0.0, 0.0)))
+            keyframes.append((fcurve.keyframe_points, distance))
 
         if mode == 'QUATERNION' and self.use_rotation:
             distance_data.append(0.0)
 
             fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
             driver = fcurve.driver
-            points = fcurve.keyframe_points
             tokens = []
-            values = matrix.to_quaternion()
+            values = quaternion
 
             driver_variables_clear(driver.variables)
 
@@ -314,28 +443,27 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                 target.transform_type = f'ROT_{axis}'
                 target.transform_space = 'LOCAL_SPACE'
 
-                tokens.append((variable.name, str(value)))
+                tokens.append((variable.name, value))
 
+            metric = registry.metric("quaternion")
             driver.type = 'SCRIPTED'
-            driver.expression = f'acos((2.0*pow(clamp({"+".join(a+"*"+b for a, b in tokens)},-1.0,1.0),2.0))-1.0)/pi'
+            driver.expression = metric.expression(*zip(*tokens))
 
-            identity = (1.0, 0.0, 0.0, 0.0)
-            distance = math.acos((2.0*pow(min(max(-1.0, sum([a*b for a, b in zip(values, identity)])), 1.0), 2.0))-1.0)/math.pi
-            distance_fcurve_set(points, distance)
+            distance = float(metric.kernel(tuple(values), (1.0, 0.0, 0.0, 0.0)))
+            keyframes.append((fcurve.keyframe_points, distance))
 
         elif mode == 'TWIST' and self.use_rotation:
             distance_data.append(0.0)
 
             fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
             driver = fcurve.driver
-            points = fcurve.keyframe_points
-            value = matrix.to_quaternion().to_swing_twist('Y')[1]
+            value = quaternion.to_swing_twist('Y')[1]
 
             driver_variables_clear(driver.variables)
 
             variable = driver.variables.new()
             variable.type = 'TRANSFORMS'
-            variable.name = axis.lower()
+            variable.name = "y"
 
             target = variable.targets[0]
             target.id = self.object
@@ -344,21 +472,19 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
             target.transform_type = 'ROT_Y'
             target.transform_space = 'LOCAL_SPACE'
 
+            metric = registry.metric("twist_y")
             driver.type = 'SCRIPTED'
-            driver.expression = f'fabs({variable.name}-{str(value)})/pi'
+            driver.expression = metric.expression((variable.name,), (value,))
 
-            distance = value/math.pi
-            distance_fcurve_set(points, distance)
+            distance = float(metric.kernel((value,), (0.0,)))
+            keyframes.append((fcurve.keyframe_points, distance))
 
         elif mode == 'SWING' and self.use_rotation:
-            
+
             distance_data.append(0.0)
 
             fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
             driver = fcurve.driver
-            points = fcurve.keyframe_points
-            tokens = []
-            values = matrix.to_quaternion()
 
             driver_variables_clear(driver.variables)
 
@@ -374,14 +500,10 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                 target.transform_type = f'ROT_{axis}'
                 target.transform_space = 'LOCAL_SPACE'
 
-            w, x, y, z = matrix.to_quaternion()
-            a = str(2.0*(x*y-w*z))
-            b = str(1.0-2.0*(x*x+z*z))
-            c = str(2.0*(y*z+w*x))
-
+            metric = registry.metric("swing_y")
             driver.type = 'SCRIPTED'
-            driver.expression = f'(asin(2.0*(x*y-w*z)*{a}+(1.0-2.0*(x*x+z*z))*{b}+2.0*(y*z+w*x)*{c})--(pi/2.0))/pi'
-            distance_fcurve_set(points, 1.0)
+            driver.expression = metric.expression(metric.names, tuple(quaternion))
+            keyframes.append((fcurve.keyframe_points, metric.scale))
 
         else:
             flags = (self.use_rotation_x, self.use_rotation_y, self.use_rotation_z)
@@ -390,9 +512,8 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
 
                 fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
                 driver = fcurve.driver
-                points = fcurve.keyframe_points
                 tokens = []
-                values = matrix.to_euler()
+                values = euler
 
                 driver_variables_clear(driver.variables)
 
@@ -409,13 +530,14 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                         target.transform_type = f'ROT_{axis}'
                         target.transform_space = 'LOCAL_SPACE'
 
-                        tokens.append((variable.name, str(value)))
+                        tokens.append((variable.name, value))
 
+                metric = registry.metric("euclidean")
                 driver.type = 'SCRIPTED'
-                driver.expression = f'sqrt({"+".join("pow("+a+"-"+b+",2.0)" for a, b in tokens)})'
+                driver.expression = metric.expression(*zip(*tokens))
 
-                distance = math.sqrt(sum([pow(value, 2) for value in values]))
-                distance_fcurve_set(points, distance)
+                distance = float(metric.kernel(tuple(values), (0.0, 0.0, 0.0)))
+                keyframes.append((fcurve.keyframe_points, distance))
 
         flags = (self.use_scale_x, self.use_scale_y, self.use_scale_z)
         if True in flags:
@@ -423,9 +545,8 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
 
             fcurve = driver_ensure(key, distance_data_path, len(distance_data)-1)
             driver = fcurve.driver
-            points = fcurve.keyframe_points
             tokens = []
-            values = matrix.to_scale()
+            values = scale
 
             driver_variables_clear(driver.variables)
 
@@ -441,13 +562,14 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                     target.transform_type = f'SCALE_{axis}'
                     target.transform_space = 'LOCAL_SPACE'
 
-                    tokens.append((variable.name, str(value)))
+                    tokens.append((variable.name, value))
 
+            metric = registry.metric("euclidean")
             driver.type = 'SCRIPTED'
-            driver.expression = f'sqrt({"+".join("pow("+a+"-"+b+",2.0)" for a, b in tokens)})'
+            driver.expression = metric.expression(*zip(*tokens))
 
-            distance = math.sqrt(sum([pow(value, 2) for value in values]))
-            distance_fcurve_set(points, distance)
+            distance = float(metric.kernel(tuple(values), (0.0, 0.0, 0.0)))
+            keyframes.append((fcurve.keyframe_points, distance))
 
         fcurve = None
         driver = None
@@ -455,22 +577,7 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
         tokens = []
         values = []
 
-        for prop in ("bbone_curveinx",
-                     "bbone_curveiny",
-                     "bbone_curveinz",
-                     "bbone_curveoutx",
-                     "bbone_curveouty",
-                     "bbone_curveoutz",
-                     "bbone_easein",
-                     "bbone_easeout",
-                     "bbone_rollin",
-                     "bbone_rollout",
-                     "bbone_scaleinx",
-                     "bbone_scaleiny",
-                     "bbone_scaleinz",
-                     "bbone_scaleoutx",
-                     "bbone_scaleouty",
-                     "bbone_scaleoutz"):
+        for prop in BBONE_PROPERTIES:
             if getattr(self, f'use_{prop}'):
                 if driver is None:
                     fcurve = driver_ensure(key, distance_data_path, len(distance_data))
@@ -478,7 +585,7 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                     keygen = DriverVariableNameGenerator()
                     driver_variables_clear(driver.variables)
                     distance_data.append(0.0)
-                
+
                 variable = driver.variables.new()
                 variable.name = next(keygen)
                 variable.type = 'SINGLE_PROP'
@@ -490,11 +597,13 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
                 tokens.append((variable.name, getattr(self, prop), float("scale" in prop)))
 
         if driver:
+            names, values, defaults = zip(*tokens)
+            metric = registry.metric("euclidean")
             driver.type = 'SCRIPTED'
-            driver.expression = f'sqrt({"+".join("pow("+a+"-"+str(b)+",2.0)" for a, b, _ in tokens)})'
+            driver.expression = metric.expression(names, values)
 
-            distance = math.sqrt(sum([pow(b-c, 2) for _, b, c in tokens]))
-            distance_fcurve_set(points, distance)
+            distance = float(metric.kernel(values, defaults))
+            keyframes.append((fcurve.keyframe_points, distance))
 
         if not distance_data:
             # Fake driver used to track bone target name
@@ -540,12 +649,27 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
             target.id = key
             target.data_path = f'{distance_data_path}[{index}]'
 
+        drivers_done = clock()
+
+        for points, distance in keyframes:
+            distance_fcurve_set(points, distance)
+
         points = to_bezier(self.falloff.curve.points,
                            x_range=(1.0-self.radius, 1.0),
                            y_range=(0.0, self.value),
                            extrapolate=False)
 
         keyframe_points_assign(fcurve.keyframe_points, points)
+        self["fingerprint"] = digest
+
+        if report is not None:
+            timings = report.timings
+            timings["matrix"] += matrix_done - start
+            timings["drivers"] += drivers_done - matrix_done
+            timings["keyframes"] += clock() - drivers_done
+            report.shape_keys += 1
+            report.drivers += len(distance_data) + 1
+            report.keyframes += 2 * len(keyframes) + len(points)
 
     bbone_curveinx: bpy.props.FloatProperty(
         name="X",
@@ -700,6 +824,13 @@ class PoseDrivenShapeKey(bpy.types.PropertyGroup):
         options=set()
         )
 
+    fingerprint: bpy.props.StringProperty(
+        name="Fingerprint",
+        description="Hash of the settings the pose driver's drivers were generated from",
+        get=lambda self: self.get("fingerprint", ""),
+        options=set()
+        )
+
     identifier: bpy.props.StringProperty(
         name="Shape",
         description="Unique identifier used to hold a reference to the driven shape key.",
@@ -1098,6 +1229,7 @@ class SHAPEKEYPOSEDRIVER_OT_add(bpy.types.Operator):
         settings["value"] = shape.value if shape.value > 0.01 else 1.0
         settings.falloff.__init__(interpolation='QUAD', easing='EASE_IN_OUT')
         settings.update()
+        shape_key_name_subscribe(key, shape)
         return {'FINISHED'}
 
 COPY_PASTE_BUFFER = None
@@ -1238,6 +1370,7 @@ class SHAPEKEYPOSEDRIVER_OT_paste(bpy.types.Operator):
             settings["name"] = shape.name
             settings["identifier"] = f'posedriver_{uuid.uuid4()}'
             settings.falloff.__init__(interpolation='QUAD', easing='EASE_IN_OUT')
+            shape_key_name_subscribe(key, shape)
 
         settings["object"] = context.blend_data.objects.get(buffer.get("object", ""), None)
         settings["bone_target"] = buffer.get("bone_target", "")
@@ -1416,6 +1549,35 @@ class SHAPEKEYPOSEDRIVER_OT_center_update(bpy.types.Operator):
         settings.update()
         return {'FINISHED'}
 
+class SHAPEKEYPOSEDRIVER_OT_rebuild_all(bpy.types.Operator):
+
+    bl_idname = 'shape_key_pose_driver.rebuild_all'
+    bl_label = "Rebuild All Pose Drivers"
+    bl_description = "Regenerate the pose drivers of every shape key in the file"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    force: bpy.props.BoolProperty(
+        name="Force",
+        description="Rebuild pose drivers even where they match their settings",
+        default=False,
+        options=set()
+        )
+
+    @classmethod
+    def poll(cls, context: bpy.types.Context) -> bool:
+        return any(key.is_property_set("pose_drivers") for key in context.blend_data.shape_keys)
+
+    def execute(self, context: bpy.types.Context) -> typing.Set[str]:
+        keys = list(context.blend_data.shape_keys)
+        wm = context.window_manager
+        wm.progress_begin(0, len(keys))
+        try:
+            report = pose_drivers_rebuild(keys, wm.progress_update, self.force)
+        finally:
+            wm.progress_end()
+        self.report({'INFO'}, str(report))
+        return {'FINISHED'}
+
 #endregion Operators
 
 def layout_split(layout: bpy.types.UILayout,
@@ -1461,6 +1623,10 @@ class SHAPEKEYPOSEDRIVER_MT_actions(bpy.types.Menu):
         layout.operator(SHAPEKEYPOSEDRIVER_OT_paste.bl_idname,
                         icon='PASTEDOWN',
                         text="Paste Pose Driver (Mirrored)").mirror=True
+        layout.separator()
+        layout.operator(SHAPEKEYPOSEDRIVER_OT_rebuild_all.bl_idname,
+                        icon='FILE_REFRESH',
+                        text="Rebuild All Pose Drivers")
 
 class SHAPEKEYPOSEDRIVER_PT_settings(bpy.types.Panel):
 
@@ -1744,6 +1910,7 @@ CLASSES = [
     SHAPEKEYPOSEDRIVER_OT_copy,
     SHAPEKEYPOSEDRIVER_OT_paste,
     SHAPEKEYPOSEDRIVER_OT_center_update,
+    SHAPEKEYPOSEDRIVER_OT_rebuild_all,
     SHAPEKEYPOSEDRIVER_MT_actions,
     SHAPEKEYPOSEDRIVER_PT_settings,
     ]
@@ -1789,28 +1956,86 @@ def draw_menu_items(menu: bpy.types.Menu, context: bpy.types.Context) -> None:
 
 MESSAGE_BROKER = object()
 
-def shape_key_name_callback():
+def pose_drivers_rename(key: bpy.types.Key) -> bool:
+    if not key.is_property_set("pose_drivers"):
+        return False
+
+    shapes = key.key_blocks
+    stale = [entry for entry in key.pose_drivers if entry.name not in shapes]
+    if not stale:
+        return False
+
+    # Blender fixes up driver data paths when a shape key is renamed, so the value
+    # driver of each stale entry (found through its posedriver_ variable) holds the new name
+    animdata = key.animation_data
+    if animdata:
+        pending = {f'posedriver_{entry.identifier}': entry for entry in stale}
+        for fcurve in animdata.drivers:
+            variables = fcurve.driver.variables
+            entry = pending.pop(variables[0].name, None) if len(variables) > 0 else None
+            if entry is not None:
+                path = fcurve.data_path
+                if path.startswith('key_blocks["') and path.endswith('"].value'):
+                    entry["name"] = path[12:-8]
+                if not pending:
+                    break
+
+    return True
+
+def shape_key_name_callback(name: str) -> None:
+    key = bpy.data.shape_keys.get(name)
+    if key is not None:
+        pose_drivers_rename(key)
+    else:
+        # The Key was renamed since its shape keys were subscribed to
+        for key in bpy.data.shape_keys:
+            pose_drivers_rename(key)
+        enable_message_broker()
+
+# The (Key name, shape key name, shape key address) of each subscription made
+MESSAGE_BROKER_SUBSCRIPTIONS: typing.Set[typing.Tuple[str, str, int]] = set()
+
+def shape_key_name_subscribe(key: bpy.types.Key, shape: bpy.types.ShapeKey) -> None:
+    # Each pose driven shape key's name is subscribed to with its Key's name, so a
+    # rename only looks up the entries and drivers of the Key owning the shape key
+    bpy.msgbus.subscribe_rna(key=shape.path_resolve("name", False),
+                             owner=MESSAGE_BROKER,
+                             args=(key.name,),
+                             notify=shape_key_name_callback)
+    MESSAGE_BROKER_SUBSCRIPTIONS.add((key.name, shape.name, shape.as_pointer()))
+
+def pose_driver_shapes() -> typing.Iterator[typing.Tuple[bpy.types.Key, bpy.types.ShapeKey]]:
     for key in bpy.data.shape_keys:
         if key.is_property_set("pose_drivers"):
-            animdata = key.animation_data
-            if animdata:
-                data = key.cone_based_drivers
-                for fc in animdata.drivers:
-                    vars = fc.driver.variables
-                    if len(vars) == 2:
-                        k = vars[0].name
-                        if k.startswith("posedriver_") and k in data:
-                            data[k]["name"] = fc.data_path[12:-8]
+            shapes = key.key_blocks
+            for entry in key.pose_drivers:
+                shape = shapes.get(entry.name)
+                if shape is not None:
+                    yield key, shape
 
 @bpy.app.handlers.persistent
 def enable_message_broker(_=None) -> None:
+    # Subscriptions are to data, so they are all made again when a file is loaded
     bpy.msgbus.clear_by_owner(MESSAGE_BROKER)
-    bpy.msgbus.subscribe_rna(key=(bpy.types.ShapeKey, "name"),
-                             owner=MESSAGE_BROKER,
-                             args=tuple(),
-                             notify=shape_key_name_callback)
+    MESSAGE_BROKER_SUBSCRIPTIONS.clear()
+    for key, shape in pose_driver_shapes():
+        shape_key_name_subscribe(key, shape)
 
-class register():
+@bpy.app.handlers.persistent
+def refresh_message_broker(_=None) -> None:
+    # Undo and redo only reload the data that changed, so unless a pose driven shape
+    # key was added, removed, renamed or reloaded the subscriptions still hold
+    current = {(key.name, shape.name, shape.as_pointer()) for key, shape in pose_driver_shapes()}
+    if current != MESSAGE_BROKER_SUBSCRIPTIONS:
+        enable_message_broker()
+
+MESSAGE_BROKER_HANDLERS = (
+    ("load_post", enable_message_broker),
+    ("undo_post", refresh_message_broker),
+    ("redo_post", refresh_message_broker),
+    )
+
+def register():
     for cls in CLASSES:
         bpy.utils.register_class(cls)
 
@@ -1821,12 +2046,24 @@ class register():
         )
 
     bpy.types.MESH_MT_shape_key_context_menu.append(draw_menu_items)
-    bpy.app.handlers.load_post.append(enable_message_broker)
-    enable_message_broker() # Ensure messages are subscribed to on first install
+    for name, handler in MESSAGE_BROKER_HANDLERS:
+        getattr(bpy.app.handlers, name).append(handler)
+    # Ensure messages are subscribed to on first install (once data is accessible)
+    bpy.app.timers.register(enable_message_broker, first_interval=0.0)
+
+    registration.register()
 
 def unregister():
+    registration.unregister()
+
     bpy.msgbus.clear_by_owner(MESSAGE_BROKER)
-    bpy.app.handlers.load_post.remove(enable_message_broker)
+    MESSAGE_BROKER_SUBSCRIPTIONS.clear()
+    for name, handler in MESSAGE_BROKER_HANDLERS:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    if bpy.app.timers.is_registered(enable_message_broker):
+        bpy.app.timers.unregister(enable_message_broker)
     bpy.types.MESH_MT_shape_key_context_menu.remove(draw_menu_items)
 
     try:
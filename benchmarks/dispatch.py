@@ -0,0 +1,83 @@
+"""Measures the per-dispatch overhead of the add-on's event dispatch.
+
+    events     lib.events.dispatch_event(Event(...)), which looks up handlers
+               when dispatching
+    table      lib.dispatch.dispatch_event(Event(...)), using the precomputed
+               dispatch table
+    fast path  lib.dispatch.dispatch(Event, ...), which skips constructing
+               events nothing handles
+
+Each is timed for events with no handlers, one handler, and three handlers
+registered on the event class and its base classes. Handlers do nothing, so the
+times are the dispatch overhead alone.
+
+Runs outside Blender: python benchmarks/dispatch.py [--number 200000] [--output dispatch.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_driven_shape_keys.lib import dispatch, events
+
+
+@events.dataclass(frozen=True)
+class BaseEvent(events.Event):
+    data: object
+    value: float
+
+
+# Event classes per case, with their own handlers for each implementation
+CASES = {}
+
+
+def case(name: str, depth: int) -> None:
+    classes = []
+    for registry in (events, dispatch):
+        root = events.dataclass(frozen=True)(type(f'{name}Root', (BaseEvent,), {}))
+        base = events.dataclass(frozen=True)(type(f'{name}Base', (root,), {}))
+        leaf = events.dataclass(frozen=True)(type(f'{name}Event', (base,), {}))
+        for cls in (leaf, base, root)[:depth]:
+            registry.event_handler(cls)(lambda _: None)
+        classes.append(leaf)
+    CASES[name] = classes
+
+
+def measure(number: int) -> dict:
+    data = object()
+    results = {}
+    for name, (events_cls, dispatch_cls) in CASES.items():
+        timings = {
+            "events": timeit.timeit(lambda: events.dispatch_event(events_cls(data, 1.0)), number=number),
+            "table": timeit.timeit(lambda: dispatch.dispatch_event(dispatch_cls(data, 1.0)), number=number),
+            "fast path": timeit.timeit(lambda: dispatch.dispatch(dispatch_cls, data, 1.0), number=number),
+            }
+        results[name] = {key: value / number * 1e9 for key, value in timings.items()}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    case("None", 0)
+    case("One", 1)
+    case("Three", 3)
+
+    results = measure(args.number)
+    for name, timings in results.items():
+        print(f'{name:<8}' + "".join(f'{key:>10}: {value:8.1f} ns' for key, value in timings.items()))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
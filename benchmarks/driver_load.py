@@ -0,0 +1,192 @@
+"""Measures the driver load generated by the pose driver add-on.
+
+For each rotation mode, with and without bendy-bone channels, and for each group
+size, a synthetic armature and mesh are built with one pose driver per shape key.
+The number of driver F-Curves, variables, keyframes and expression bytes are
+recorded along with the per-frame evaluation time over an animated frame range.
+
+Usage (python drivers must be allowed to run, hence --enable-autoexec):
+
+    blender --background --factory-startup --enable-autoexec \\
+        --python benchmarks/driver_load.py -- --sizes 4 16 64 --frames 120 --output results.json
+
+The add-on is imported from this checkout unless --addon names an installed module.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import uuid
+import bpy
+
+MODES = ('EULER', 'QUATERNION', 'SWING', 'TWIST')
+
+BBONE_FLAGS = ("use_bbone_curveinx",
+               "use_bbone_curveoutx",
+               "use_bbone_easein",
+               "use_bbone_easeout",
+               "use_bbone_rollin",
+               "use_bbone_rollout",
+               "use_bbone_scaleinx",
+               "use_bbone_scaleiny",
+               "use_bbone_scaleoutx",
+               "use_bbone_scaleouty")
+
+
+def arguments() -> argparse.Namespace:
+    argv = sys.argv[sys.argv.index("--")+1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="driver_load")
+    parser.add_argument("--addon", default="", help="Module name of an installed copy of the add-on")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--output", default="", help="Write the JSON results to a file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def addon_enable(name: str) -> str:
+    import addon_utils
+    if not name:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        sys.path.insert(0, os.path.dirname(root))
+        name = os.path.basename(root)
+    addon_utils.enable(name, default_set=False, handle_error=None)
+    return name
+
+
+def scene_build(mode: str, bbone: bool, size: int, frames: int):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = frames
+
+    armature = bpy.data.armatures.new("Armature")
+    rig = bpy.data.objects.new("Rig", armature)
+    scene.collection.objects.link(rig)
+    bpy.context.view_layer.objects.active = rig
+    bpy.ops.object.mode_set(mode='EDIT')
+    bone = armature.edit_bones.new("Bone")
+    bone.head = (0.0, 0.0, 0.0)
+    bone.tail = (0.0, 1.0, 0.0)
+    bone.bbone_segments = 4 if bbone else 1
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    pose_bone = rig.pose.bones["Bone"]
+    pose_bone.rotation_mode = 'QUATERNION' if mode != 'EULER' else 'XYZ'
+    for frame in range(1, frames+1):
+        t = frame / frames * math.tau
+        if mode == 'EULER':
+            pose_bone.rotation_euler = (math.sin(t), math.cos(t) * 0.5, math.sin(t*2.0) * 0.25)
+            pose_bone.keyframe_insert("rotation_euler", frame=frame)
+        else:
+            pose_bone.rotation_quaternion = (math.cos(t*0.5), math.sin(t*0.5) * 0.3, math.sin(t*0.5) * 0.8, 0.1)
+            pose_bone.rotation_quaternion.normalize()
+            pose_bone.keyframe_insert("rotation_quaternion", frame=frame)
+        if bbone:
+            pose_bone.bbone_curveinx = math.sin(t)
+            pose_bone.keyframe_insert("bbone_curveinx", frame=frame)
+
+    mesh = bpy.data.meshes.new("Mesh")
+    mesh.from_pydata([(x, y, 0.0) for x in range(8) for y in range(8)], [], [])
+    object = bpy.data.objects.new("Mesh", mesh)
+    scene.collection.objects.link(object)
+    object.shape_key_add(name="Basis")
+
+    key = mesh.shape_keys
+    for index in range(size):
+        shape = object.shape_key_add(name=f'Pose{index:03d}')
+        t = index / size * math.tau
+
+        settings = key.pose_drivers.add()
+        settings["name"] = shape.name
+        settings["identifier"] = f'posedriver_{uuid.uuid4()}'
+        settings["value"] = 1.0
+        settings.falloff.__init__(interpolation='QUAD', easing='EASE_IN_OUT')
+        settings.rotation_mode = mode
+        settings.object = rig
+        settings.bone_target = "Bone"
+
+        if mode == 'EULER':
+            settings.rotation_euler = (math.sin(t), math.cos(t) * 0.5, 0.0)
+            settings.use_rotation_x = True
+            settings.use_rotation_y = True
+            settings.use_rotation_z = True
+        else:
+            settings.rotation_quaternion = (math.cos(t*0.5), 0.0, math.sin(t*0.5), 0.0)
+            settings.use_rotation = True
+
+        if bbone:
+            settings.bbone_curveinx = math.sin(t)
+            for flag in BBONE_FLAGS:
+                setattr(settings, flag, True)
+
+        settings.update()
+
+    return scene, key
+
+
+def driver_stats(key) -> dict:
+    fcurves = list(key.animation_data.drivers) if key.animation_data else []
+    return {
+        "fcurves": len(fcurves),
+        "variables": sum(len(fc.driver.variables) for fc in fcurves),
+        "expression_bytes": sum(len(fc.driver.expression.encode()) for fc in fcurves),
+        "keyframes": sum(len(fc.keyframe_points) for fc in fcurves),
+        "simple_expressions": sum(1 for fc in fcurves if fc.driver.is_simple_expression),
+        "invalid_drivers": sum(1 for fc in fcurves if not fc.driver.is_valid),
+        }
+
+
+def frame_times(scene, frames: int) -> dict:
+    scene.frame_set(1)
+    samples = []
+    clock = time.perf_counter
+    for frame in range(1, frames+1):
+        start = clock()
+        scene.frame_set(frame)
+        samples.append((clock() - start) * 1000.0)
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        }
+
+
+def main() -> None:
+    args = arguments()
+    addon = addon_enable(args.addon)
+    results = []
+
+    for mode in args.modes:
+        for bbone in (False, True):
+            for size in args.sizes:
+                scene, key = scene_build(mode, bbone, size, args.frames)
+                result = {"rotation_mode": mode, "bbone": bbone, "shape_keys": size}
+                result.update(driver_stats(key))
+                result["frame"] = frame_times(scene, args.frames)
+                results.append(result)
+                print(f'{mode:<10} bbone={bbone!s:<5} n={size:<4} '
+                      f'{result["fcurves"]} fcurves, {result["frame"]["mean_ms"]:.3f}ms/frame',
+                      file=sys.stderr)
+
+    output = json.dumps({
+        "blender": bpy.app.version_string,
+        "addon": addon,
+        "frames": args.frames,
+        "results": results,
+        }, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
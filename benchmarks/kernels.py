@@ -0,0 +1,216 @@
+"""Compares the evaluation cost of the three ways a distance driver can run.
+
+    SIMPLE  the inline expression, evaluated by Blender's simple expression
+            evaluator when it qualifies
+    PYTHON  the same inline expression forced through the Python evaluator
+    KERNEL  a call to the compiled kernel in the driver namespace (pds_k)
+
+For each metric and group size a synthetic Key is built with one distance driver
+per shape key, reading an animated bone, and the per-frame evaluation time is
+measured over the frame range.
+
+Usage (python drivers must be allowed to run, hence --enable-autoexec):
+
+    blender --background --factory-startup --enable-autoexec \\
+        --python benchmarks/kernels.py -- --sizes 64 256 --frames 120 --output kernels.json
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_driven_shape_keys.core import kernels, registry
+
+MODES = ('SIMPLE', 'PYTHON', 'KERNEL')
+
+METRICS = ('bbone', 'quaternion', 'swing_y')
+
+BBONE_PATHS = ("bbone_curveinx",
+               "bbone_curveinz",
+               "bbone_curveoutx",
+               "bbone_curveoutz",
+               "bbone_easein",
+               "bbone_easeout",
+               "bbone_rollin",
+               "bbone_rollout",
+               "bbone_scalein[0]",
+               "bbone_scalein[1]",
+               "bbone_scalein[2]",
+               "bbone_scaleout[0]",
+               "bbone_scaleout[1]",
+               "bbone_scaleout[2]")
+
+
+def arguments() -> argparse.Namespace:
+    argv = sys.argv[sys.argv.index("--")+1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="kernels")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--metrics", nargs="+", default=list(METRICS), choices=METRICS)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--output", default="", help="Write the JSON results to a file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def rig_build(frames: int):
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = frames
+
+    armature = bpy.data.armatures.new("Armature")
+    rig = bpy.data.objects.new("Rig", armature)
+    scene.collection.objects.link(rig)
+    bpy.context.view_layer.objects.active = rig
+    bpy.ops.object.mode_set(mode='EDIT')
+    bone = armature.edit_bones.new("Bone")
+    bone.tail = (0.0, 1.0, 0.0)
+    bone.bbone_segments = 4
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    pose_bone = rig.pose.bones["Bone"]
+    pose_bone.rotation_mode = 'QUATERNION'
+    for frame in range(1, frames+1):
+        t = frame / frames * math.tau
+        pose_bone.rotation_quaternion = (math.cos(t*0.5), math.sin(t*0.5) * 0.3, math.sin(t*0.5) * 0.8, 0.1)
+        pose_bone.rotation_quaternion.normalize()
+        pose_bone.keyframe_insert("rotation_quaternion", frame=frame)
+        for path in BBONE_PATHS:
+            name, _, index = path.partition("[")
+            value = math.sin(t + len(name))
+            if index:
+                getattr(pose_bone, name)[int(index[:-1])] = 1.0 + value * 0.5
+                pose_bone.keyframe_insert(name, index=int(index[:-1]), frame=frame)
+            else:
+                setattr(pose_bone, name, value)
+                pose_bone.keyframe_insert(name, frame=frame)
+    return rig
+
+
+def variables_add(driver, metric: str, rig) -> list:
+    names = []
+    if metric == 'bbone':
+        for index, path in enumerate(BBONE_PATHS):
+            variable = driver.variables.new()
+            variable.type = 'SINGLE_PROP'
+            variable.name = f'v{index}'
+            target = variable.targets[0]
+            target.id = rig
+            target.data_path = f'pose.bones["Bone"].{path}'
+            names.append(variable.name)
+    else:
+        m = registry.metric(metric)
+        for type, name in zip(m.variables, m.names):
+            variable = driver.variables.new()
+            variable.type = 'TRANSFORMS'
+            variable.name = name
+            target = variable.targets[0]
+            target.id = rig
+            target.bone_target = "Bone"
+            target.transform_type = type
+            target.transform_space = 'LOCAL_SPACE'
+            target.rotation_mode = 'QUATERNION'
+            names.append(name)
+    return names
+
+
+def center(metric: str, index: int, size: int) -> list:
+    t = index / size * math.tau
+    if metric == 'bbone':
+        return [math.sin(t + i) for i in range(len(BBONE_PATHS))]
+    q = (math.cos(t*0.5), 0.0, math.sin(t*0.5), 0.0)
+    return registry.metric(metric).params(q).tolist()
+
+
+def key_build(mode: str, metric: str, size: int, rig):
+    mesh = bpy.data.meshes.new("Mesh")
+    mesh.from_pydata([(x, y, 0.0) for x in range(8) for y in range(8)], [], [])
+    object = bpy.data.objects.new("Mesh", mesh)
+    bpy.context.scene.collection.objects.link(object)
+    object.shape_key_add(name="Basis")
+    key = mesh.shape_keys
+    kernels.KERNELS.clear()
+
+    for index in range(size):
+        shape = object.shape_key_add(name=f'Pose{index:03d}')
+        driver = shape.driver_add("value").driver
+        driver.type = 'SCRIPTED'
+        names = variables_add(driver, metric, rig)
+        values = center(metric, index, size)
+        if metric == 'bbone':
+            expression = registry.metric("euclidean").expression(names, values)
+        else:
+            expression = registry.metric(metric).expression(names, values)
+
+        if mode == 'KERNEL':
+            kernels.define(shape.name, kernels.source(names, expression))
+            driver.expression = kernels.expression(shape.name, names)
+        elif mode == 'PYTHON':
+            driver.expression = f'float({expression})'
+        else:
+            driver.expression = expression
+    return key
+
+
+def frame_times(scene, frames: int) -> dict:
+    scene.frame_set(1)
+    samples = []
+    clock = time.perf_counter
+    for frame in range(1, frames+1):
+        start = clock()
+        scene.frame_set(frame)
+        samples.append((clock() - start) * 1000.0)
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        }
+
+
+def main() -> None:
+    args = arguments()
+    bpy.app.driver_namespace[kernels.NAME] = kernels.call
+    results = []
+
+    for metric in args.metrics:
+        for size in args.sizes:
+            for mode in MODES:
+                bpy.ops.wm.read_factory_settings(use_empty=True)
+                bpy.app.driver_namespace[kernels.NAME] = kernels.call
+                scene = bpy.context.scene
+                key = key_build(mode, metric, size, rig_build(args.frames))
+                fcurves = list(key.animation_data.drivers)
+                result = {
+                    "metric": metric,
+                    "mode": mode,
+                    "shape_keys": size,
+                    "expression_bytes": sum(len(fc.driver.expression.encode()) for fc in fcurves),
+                    "simple_expressions": sum(1 for fc in fcurves if fc.driver.is_simple_expression),
+                    "invalid_drivers": sum(1 for fc in fcurves if not fc.driver.is_valid),
+                    "frame": frame_times(scene, args.frames),
+                    }
+                results.append(result)
+                print(f'{metric:<10} {mode:<6} n={size:<4} {result["frame"]["mean_ms"]:.3f}ms/frame',
+                      file=sys.stderr)
+
+    output = json.dumps({
+        "blender": bpy.app.version_string,
+        "frames": args.frames,
+        "results": results,
+        }, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measures how solving the distance matrices and radii of many groups scales with
+the number of worker threads (see core.parallel and radii.update_groups).
+
+Synthetic pose tables are generated for each group, with location, quaternion and
+swing channels on the target bone and one additional bone, and the groups are
+solved with each worker count. Times are the best of --repeat runs, with the
+speedup relative to solving the groups one at a time on the calling thread.
+
+Runs outside Blender:
+
+    python benchmarks/recompute.py [--groups 64] [--poses 32 128 512] [--workers 1 2 4 8]
+                                   [--output recompute.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_driven_shape_keys.core import distance, parallel, registry
+from pose_driven_shape_keys.core.radii import pose_radii
+
+
+def quaternions(rng: np.random.Generator, count: int) -> np.ndarray:
+    q = rng.normal(size=(count, 4))
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    return np.where(q[:, :1] < 0.0, -q, q)
+
+
+def pose_table(rng: np.random.Generator, count: int) -> distance.Poses:
+    euclidean = registry.metric("euclidean").kernel
+    quaternion = registry.metric("quaternion")
+    swing = registry.metric("swing_y")
+    target = ((rng.uniform(-1.0, 1.0, size=(count, 3)), euclidean),
+              (swing.params(quaternions(rng, count)), swing.kernel))
+    bone = ((quaternion.params(quaternions(rng, count)), quaternion.kernel),)
+    return distance.Poses(count, (target, bone), (1.0, 0.5))
+
+
+def solve(poses: distance.Poses) -> np.ndarray:
+    return pose_radii(distance.poses_matrix(poses), default=1.0)
+
+
+def measure(groups: int, poses: int, workers: list, repeat: int) -> dict:
+    rng = np.random.default_rng(0)
+    tables = [pose_table(rng, poses) for _ in range(groups)]
+    expected = [solve(x) for x in tables]
+
+    results = {}
+    serial = min(timeit.repeat(lambda: [solve(x) for x in tables], number=1, repeat=repeat))
+    results["serial"] = {"time": serial, "speedup": 1.0}
+    for count in workers:
+        # The threaded results must match the serial ones exactly
+        for a, b in zip(parallel.run(solve, tables, count), expected):
+            assert np.array_equal(a, b)
+        time = min(timeit.repeat(lambda: parallel.run(solve, tables, count), number=1, repeat=repeat))
+        results[str(count)] = {"time": time, "speedup": serial / time}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--groups", type=int, default=64)
+    parser.add_argument("--poses", type=int, nargs="+", default=[32, 128, 512])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    results = {}
+    for poses in args.poses:
+        results[str(poses)] = measure(args.groups, poses, args.workers, args.repeat)
+        print(f'{args.groups} groups of {poses} poses')
+        for name, data in results[str(poses)].items():
+            print(f'  {name:>8} {data["time"]*1000.0:9.1f} ms {data["speedup"]:6.2f}x')
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
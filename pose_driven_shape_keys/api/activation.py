@@ -3,24 +3,27 @@ from typing import TYPE_CHECKING
 from bpy.types import PropertyGroup
 from bpy.props import BoolProperty, FloatProperty, PointerProperty
 from ..lib.curve_mapping import BCLMAP_CurveManager
-from ..lib.events import dataclass, dispatch_event, Event
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
 from .activation_center import PoseDrivenShapeKeyActivationCenter
 if TYPE_CHECKING:
     from bpy.types import Context
 
 
+@deferrable
 @dataclass(frozen=True)
 class ActivationRadiusUpdateEvent(Event):
     activation: 'PoseDrivenShapeKeyActivation'
     value: float
 
 
+@deferrable
 @dataclass(frozen=True)
 class ActivationTargetUpdateEvent(Event):
     activation: 'PoseDrivenShapeKeyActivation'
     value: float
 
 
+@deferrable
 @dataclass(frozen=True)
 class ActivationUpdateEvent(Event):
     activation: 'PoseDrivenShapeKeyActivation'
@@ -28,12 +31,12 @@ class ActivationUpdateEvent(Event):
 
 def activation_radius_update_handler(activation: 'PoseDrivenShapeKeyActivation',
                                      _: 'Context') -> None:
-    dispatch_event(ActivationRadiusUpdateEvent(activation, activation.radius))
+    dispatch(ActivationRadiusUpdateEvent, activation, activation.radius)
 
 
 def activation_target_update_handler(activation: 'PoseDrivenShapeKeyActivation',
                                      _: 'Context') -> None:
-    dispatch_event(ActivationTargetUpdateEvent(activation, activation.target))
+    dispatch(ActivationTargetUpdateEvent, activation, activation.target)
 
 
 class PoseDrivenShapeKeyActivation(BCLMAP_CurveManager, PropertyGroup):
@@ -74,4 +77,4 @@ class PoseDrivenShapeKeyActivation(BCLMAP_CurveManager, PropertyGroup):
 
     def update(self) -> None:
         super().update()
-        dispatch_event(ActivationUpdateEvent(self))
+        dispatch(ActivationUpdateEvent, self)
@@ -1,14 +1,17 @@
 
 from typing import Tuple, TYPE_CHECKING
 from bpy.types import PropertyGroup
-from bpy.props import FloatProperty, FloatVectorProperty
-from mathutils import Euler, Matrix, Quaternion, Vector
-from ..lib.transform_utils import transform_matrix_flatten, transform_matrix_compose
-from ..lib.events import dataclass, dispatch_event, Event
+from bpy.props import CollectionProperty, FloatProperty, FloatVectorProperty
+from mathutils import Matrix
+import numpy as np
+from ..core import transform
+from ..lib.transform_utils import transform_matrix_flatten
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
 if TYPE_CHECKING:
     from bpy.types import Context
 
 
+@deferrable
 @dataclass(frozen=True)
 class ActivationCenterUpdateEvent(Event):
     center: 'PoseDrivenShapeKeyActivationCenter'
@@ -16,52 +19,72 @@ class ActivationCenterUpdateEvent(Event):
 
 def center_property_update_handler(center: 'PoseDrivenShapeKeyActivationCenter',
                                    _: 'Context') -> None:
-    dispatch_event(ActivationCenterUpdateEvent(center))
+    dispatch(ActivationCenterUpdateEvent, center)
 
 
-def center_location(center: 'PoseDrivenShapeKeyActivationCenter') -> Vector:
-    return center.transform_matrix.to_translation()
+def center_bone_update_handler(bone: 'PoseDrivenShapeKeyActivationCenterBone', _: 'Context') -> None:
+    path: str = bone.path_from_id()
+    dispatch(ActivationCenterUpdateEvent, bone.id_data.path_resolve(path.rpartition(".bones[")[0]))
+
+
+def center_matrix(center: 'PoseDrivenShapeKeyActivationCenter') -> np.ndarray:
+    return np.array(center.transform_matrix, dtype=float)
+
+
+def center_matrix_set(center: 'PoseDrivenShapeKeyActivationCenter', matrix: np.ndarray) -> None:
+    center.transform_matrix = transform.flatten(matrix).tolist()
+
+
+def center_location(center: 'PoseDrivenShapeKeyActivationCenter') -> Tuple[float, float, float]:
+    return tuple(transform.location(center_matrix(center)).tolist())
 
 
 def center_location_set(center: 'PoseDrivenShapeKeyActivationCenter',
                         vector: Tuple[float, float, float]) -> None:
-    matrix = transform_matrix_compose(vector,
-                                      center_rotation_quaternion(center),
-                                      center_scale(center))
-    center.transform_matrix = transform_matrix_flatten(matrix)
+    _, rotation, scale = transform.decompose(center_matrix(center))
+    center_matrix_set(center, transform.compose(vector, rotation, scale))
 
 
-def center_rotation_euler(center: 'PoseDrivenShapeKeyActivationCenter') -> Euler:
-    return center.transform_matrix.to_euler()
+def center_rotation_euler(center: 'PoseDrivenShapeKeyActivationCenter') -> Tuple[float, float, float]:
+    return tuple(transform.euler(center_matrix(center)).tolist())
 
 
 def center_rotation_euler_set(center: 'PoseDrivenShapeKeyActivationCenter',
                               vector: Tuple[float, float, float]) -> None:
-    center_rotation_quaternion_set(center, Euler(vector).to_quaternion())
+    center_rotation_quaternion_set(center, transform.euler_quaternion(vector))
 
 
-def center_rotation_quaternion(center: 'PoseDrivenShapeKeyActivationCenter') -> 'Quaternion':
-    return center.transform_matrix.to_quaternion()
+def center_rotation_quaternion(center: 'PoseDrivenShapeKeyActivationCenter') -> Tuple[float, float, float, float]:
+    return tuple(transform.quaternion(center_matrix(center)).tolist())
 
 
 def center_rotation_quaternion_set(center: 'PoseDrivenShapeKeyActivationCenter',
-                               vector: Tuple[float, float, float, float]) -> None:
-    matrix = transform_matrix_compose(center_location(center),
-                                      vector,
-                                      center_scale(center))
-    center.transform_matrix = transform_matrix_flatten(matrix)
+                                   vector: Tuple[float, float, float, float]) -> None:
+    location, _, scale = transform.decompose(center_matrix(center))
+    center_matrix_set(center, transform.compose(location, vector, scale))
 
 
-def center_scale(center: 'PoseDrivenShapeKeyActivationCenter') -> Vector:
-    return center.transform_matrix.to_scale()
+def center_scale(center: 'PoseDrivenShapeKeyActivationCenter') -> Tuple[float, float, float]:
+    return tuple(transform.scale(center_matrix(center)).tolist())
 
 
 def center_scale_set(center: 'PoseDrivenShapeKeyActivationCenter',
                      vector: Tuple[float, float, float]) -> None:
-        matrix = transform_matrix_compose(center_location(center),
-                                          center_rotation_quaternion(center),
-                                          vector)
-        center.transform_matrix = transform_matrix_flatten(matrix)
+    location, rotation, _ = transform.decompose(center_matrix(center))
+    center_matrix_set(center, transform.compose(location, rotation, vector))
+
+
+class PoseDrivenShapeKeyActivationCenterBone(PropertyGroup):
+    """The pose of one of the group's additional bones, named after the bone"""
+
+    transform_matrix: FloatVectorProperty(
+        name="Transform Matrix",
+        size=16,
+        subtype='MATRIX',
+        default=transform_matrix_flatten(Matrix.Identity(4)),
+        update=center_bone_update_handler,
+        options=set()
+        )
 
 
 class PoseDrivenShapeKeyActivationCenter(PropertyGroup):
@@ -200,6 +223,13 @@ class PoseDrivenShapeKeyActivationCenter(PropertyGroup):
         update=center_property_update_handler
         )
 
+    bones: CollectionProperty(
+        name="Bones",
+        description="The poses of the group's additional bones",
+        type=PoseDrivenShapeKeyActivationCenterBone,
+        options=set()
+        )
+
     location: FloatVectorProperty(
         name="Location",
         size=3,
@@ -0,0 +1,19 @@
+
+from bpy.types import Key, PropertyGroup
+from bpy.props import PointerProperty
+
+
+def consumer_key_validate(consumer: 'PoseDrivenShapeKeyConsumer', key: Key) -> bool:
+    return key != consumer.id_data
+
+
+class PoseDrivenShapeKeyConsumer(PropertyGroup):
+    """A Key whose matching shape keys follow the values of a group's shape keys"""
+
+    key: PointerProperty(
+        name="Key",
+        description="The shape key datablock that follows the group",
+        type=Key,
+        poll=consumer_key_validate,
+        options=set()
+        )
@@ -1,15 +1,25 @@
 
 from ctypes import Union
-from typing import Iterator, Optional, TYPE_CHECKING, Tuple
-from bpy.types import Object, PropertyGroup
-from bpy.props import BoolProperty, EnumProperty, PointerProperty, StringProperty
-from ..lib.events import dataclass, dispatch_event, Event
+from typing import Callable, Iterator, Optional, TYPE_CHECKING, Tuple
+from bpy.types import Key, Object, PropertyGroup
+from bpy.props import (BoolProperty,
+                       CollectionProperty,
+                       EnumProperty,
+                       FloatProperty,
+                       IntProperty,
+                       PointerProperty,
+                       StringProperty)
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
 from ..lib.mixins import Identifiable
 from .activation_center import PoseDrivenShapeKeyActivationCenter
+from .consumer import PoseDrivenShapeKeyConsumer
+from .group_bone import PoseDrivenShapeKeyGroupBone
 if TYPE_CHECKING:
+    from bpy.types import Context
     from .shape_key import PoseDrivenShapeKey
 
 
+@deferrable
 @dataclass(frozen=True)
 class GroupBoneTargetUpdateEvent(Event):
     group: 'PoseDrivenShapeKeyGroup'
@@ -17,6 +27,19 @@ class GroupBoneTargetUpdateEvent(Event):
     previous_value: str
 
 
+@dataclass(frozen=True)
+class GroupConsumerCreatedEvent(Event):
+    group: 'PoseDrivenShapeKeyGroup'
+    consumer: PoseDrivenShapeKeyConsumer
+
+
+@dataclass(frozen=True)
+class GroupConsumerDisposeEvent(Event):
+    group: 'PoseDrivenShapeKeyGroup'
+    consumer: PoseDrivenShapeKeyConsumer
+
+
+@deferrable
 @dataclass(frozen=True)
 class GroupNameUpdateEvent(Event):
     group: 'PoseDrivenShapeKeyGroup'
@@ -24,6 +47,7 @@ class GroupNameUpdateEvent(Event):
     previous_value: str
 
 
+@deferrable
 @dataclass(frozen=True)
 class GroupObjectUpdateEvent(Event):
     group: 'PoseDrivenShapeKeyGroup'
@@ -31,6 +55,7 @@ class GroupObjectUpdateEvent(Event):
     previous_value: Optional[Object]
 
 
+@deferrable
 @dataclass(frozen=True)
 class GroupPropertyFlagUpdateEvent(Event):
     group: 'PoseDrivenShapeKeyGroup'
@@ -38,6 +63,27 @@ class GroupPropertyFlagUpdateEvent(Event):
     value: bool
 
 
+@deferrable
+@dataclass(frozen=True)
+class GroupSettingsUpdateEvent(Event):
+    group: 'PoseDrivenShapeKeyGroup'
+
+
+@deferrable
+@dataclass(frozen=True)
+class GroupSuspendUpdateEvent(Event):
+    group: 'PoseDrivenShapeKeyGroup'
+    value: str
+
+
+def group_approximation_error(group: 'PoseDrivenShapeKeyGroup') -> float:
+    return group.get("approximation_error", 0.0)
+
+
+def group_fingerprint(group: 'PoseDrivenShapeKeyGroup') -> str:
+    return group.get("fingerprint", "")
+
+
 def group_bone_target(target: 'PoseDrivenShapeKeyGroup') -> str:
     animdata = target.id_data.animation_data
     if animdata:
@@ -62,7 +108,7 @@ def group_bone_target(target: 'PoseDrivenShapeKeyGroup') -> str:
 def group_bone_group_set(group: 'PoseDrivenShapeKeyGroup', value: str) -> None:
     cache = group_bone_target(group)
     group["bone_target"] = value
-    dispatch_event(GroupBoneTargetUpdateEvent(group, value, cache))
+    dispatch(GroupBoneTargetUpdateEvent, group, value, cache)
 
 
 def group_name(group: 'PoseDrivenShapeKeyGroup') -> str:
@@ -78,7 +124,21 @@ def group_name_set(group: 'PoseDrivenShapeKeyGroup', value: str) -> None:
         index += 1
         value = f'{basis}.{str(index).zfill(3)}'
     group['name'] = value
-    dispatch_event(GroupNameUpdateEvent(group, value, cache))
+    dispatch(GroupNameUpdateEvent, group, value, cache)
+
+
+def group_property_flag_update_handler(name: str) -> Callable[['PoseDrivenShapeKeyGroup', 'Context'], None]:
+    def handler(group: 'PoseDrivenShapeKeyGroup', _: 'Context') -> None:
+        dispatch(GroupPropertyFlagUpdateEvent, group, name, getattr(group, name))
+    return handler
+
+
+def group_settings_update_handler(group: 'PoseDrivenShapeKeyGroup', _: 'Context') -> None:
+    dispatch(GroupSettingsUpdateEvent, group)
+
+
+def group_suspend_update_handler(group: 'PoseDrivenShapeKeyGroup', _: 'Context') -> None:
+    dispatch(GroupSuspendUpdateEvent, group, group.suspend)
 
 
 def group_object_validate(_: 'PoseDrivenShapeKeyGroup', object: Object) -> bool:
@@ -87,11 +147,58 @@ def group_object_validate(_: 'PoseDrivenShapeKeyGroup', object: Object) -> bool:
 
 class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
 
-    def update(self) -> None:
-        identifier = self.identifier
-        for driven in self.id_data.pose_driven.shape_keys:
-            if driven.target == identifier:
-                driven.update()
+    consumers: CollectionProperty(
+        name="Consumers",
+        description="Keys whose matching shape keys follow this group's shape keys",
+        type=PoseDrivenShapeKeyConsumer,
+        options={'HIDDEN'}
+        )
+
+    def consumer_add(self, key: Key) -> PoseDrivenShapeKeyConsumer:
+        if not isinstance(key, Key):
+            raise TypeError((f'{self.__class__.__name__}.consumer_add(key): '
+                             f'Expected key to be Key, not {key.__class__.__name__}'))
+
+        if key == self.id_data:
+            raise ValueError((f'{self.__class__.__name__}.consumer_add(key): '
+                              f'A group cannot be its own consumer'))
+
+        consumer = next((x for x in self.consumers if x.key == key), None)
+        if consumer is None:
+            consumer = self.consumers.add()
+            consumer.name = key.name
+            consumer.key = key
+            dispatch(GroupConsumerCreatedEvent, self, consumer)
+        return consumer
+
+    def consumer_remove(self, key: Key) -> None:
+        index = next((i for i, x in enumerate(self.consumers) if x.key == key), -1)
+        if index == -1:
+            raise ValueError((f'{self.__class__.__name__}.consumer_remove(key): '
+                              f'{key} is not a consumer of this group.'))
+
+        dispatch(GroupConsumerDisposeEvent, self, self.consumers[index])
+        self.consumers.remove(index)
+
+    approximation: EnumProperty(
+        name="Approximation",
+        description="Use cheaper proxy distances for quaternion and swing rotations, with the remap folded into the activation curves",
+        items=[
+            ('EXACT' , "Exact"      , "Always use the exact rotation distance"),
+            ('APPROX', "Approximate", "Always use the proxy distance"),
+            ('AUTO'  , "Auto"       , "Use the proxy distance while the scene's simplify setting is enabled"),
+            ],
+        default='EXACT',
+        options=set(),
+        update=group_settings_update_handler
+        )
+
+    approximation_error: FloatProperty(
+        name="Approximation Error",
+        description="The largest difference between the approximated and exact activations",
+        get=group_approximation_error,
+        options=set()
+        )
 
     bone_target: StringProperty(
         name="Bone",
@@ -101,12 +208,29 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         options=set()
         )
 
+    bone_weight: FloatProperty(
+        name="Weight",
+        description="Weight of the target bone's distance when the group reads additional bones",
+        min=0.0,
+        default=1.0,
+        precision=3,
+        options=set(),
+        update=group_settings_update_handler
+        )
+
+    bones: CollectionProperty(
+        name="Bones",
+        description="Additional bones read alongside the target bone, each with its own channels",
+        type=PoseDrivenShapeKeyGroupBone,
+        options=set()
+        )
+
     bbone_curveinx: BoolProperty(
         name="X",
         description="Use the target bendy-bone's curve-in X",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveinx")
         )
 
     bbone_curveiny: BoolProperty(
@@ -114,7 +238,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's curve-in Y",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveiny")
         )
 
     bbone_curveinz: BoolProperty(
@@ -122,7 +246,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's curve-in Z",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveinz")
         )
 
     bbone_curveoutx: BoolProperty(
@@ -130,7 +254,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's curve-out X",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveoutx")
         )
 
     bbone_curveouty: BoolProperty(
@@ -138,7 +262,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's curve-out Y",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveouty")
         )
 
     bbone_curveoutz: BoolProperty(
@@ -146,7 +270,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's curve-out Z",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_curveoutz")
         )
 
     bbone_easein: BoolProperty(
@@ -154,7 +278,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's ease-in",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_easein")
         )
 
     bbone_easeout: BoolProperty(
@@ -162,7 +286,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's ease-out",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_easeout")
         )
 
     bbone_rollin: BoolProperty(
@@ -170,7 +294,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's roll-in",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_rollin")
         )
 
     bbone_rollout: BoolProperty(
@@ -178,7 +302,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's roll-out",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_rollout")
         )
 
     bbone_scaleinx: BoolProperty(
@@ -186,7 +310,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-in X",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleinx")
         )
 
     bbone_scaleiny: BoolProperty(
@@ -194,7 +318,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-in Y",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleiny")
         )
 
     bbone_scaleinz: BoolProperty(
@@ -202,7 +326,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-in Z",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleinz")
         )
 
     bbone_scaleoutx: BoolProperty(
@@ -210,7 +334,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-out X",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleoutx")
         )
 
     bbone_scaleouty: BoolProperty(
@@ -218,7 +342,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-out Y",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleouty")
         )
 
     bbone_scaleoutz: BoolProperty(
@@ -226,7 +350,48 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bendy-bone's scale-out Z",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("bbone_scaleoutz")
+        )
+
+    engine: EnumProperty(
+        name="Engine",
+        description="How the shape key values are evaluated",
+        items=[
+            ('DRIVERS', "Drivers", "Evaluate each shape key with its own drivers"),
+            ('NUMPY'  , "NumPy"  , "Evaluate the whole group at once in a handler (drivers are used when rendering in the background)"),
+            ],
+        default='DRIVERS',
+        options=set(),
+        update=group_settings_update_handler
+        )
+
+    expression_mode: EnumProperty(
+        name="Expressions",
+        description="How the distance drivers evaluate their expressions",
+        items=[
+            ('INLINE', "Inline", "Scripted expressions evaluated by the driver"),
+            ('KERNEL', "Kernel", "Expressions compiled once per shape key and called from the driver namespace"),
+            ],
+        default='INLINE',
+        options=set(),
+        update=group_settings_update_handler
+        )
+
+    expression_precision: IntProperty(
+        name="Precision",
+        description="Significant digits of the numbers in driver expressions (0 for full precision)",
+        min=0,
+        max=17,
+        default=0,
+        options=set(),
+        update=group_settings_update_handler
+        )
+
+    fingerprint: StringProperty(
+        name="Fingerprint",
+        description="Hash of the settings the group's drivers were generated from",
+        get=group_fingerprint,
+        options=set()
         )
 
     @property
@@ -262,7 +427,12 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
                 or self.bbone_scaleinz
                 or self.bbone_scaleoutx
                 or self.bbone_scaleouty
-                or self.bbone_scaleoutz)
+                or self.bbone_scaleoutz
+                or any(x.is_enabled for x in self.bones))
+
+    @property
+    def is_suspended(self) -> bool:
+        return self.get("suspended") is not None
 
     @property
     def is_valid(self) -> bool:
@@ -275,7 +445,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's X location",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("location_x")
         )
 
     location_y: BoolProperty(
@@ -283,7 +453,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Y location",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("location_y")
         )
 
     location_z: BoolProperty(
@@ -291,7 +461,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Z location",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("location_z")
         )
 
     name: StringProperty(
@@ -303,7 +473,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="The armature object",
         type=Object,
         poll=group_object_validate,
-        update=update,
+        update=group_settings_update_handler,
         options=set()
         )
 
@@ -319,7 +489,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's rotation",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("rotation")
         )
 
     rotation_axis: EnumProperty(
@@ -332,7 +502,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
             ],
         default='Y',
         options=set(),
-        update=update
+        update=group_settings_update_handler
         )
 
     rotation_mode: EnumProperty(
@@ -346,7 +516,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
             ],
         default='',
         options=set(),
-        update=update
+        update=group_settings_update_handler
         )
 
     rotation_order: EnumProperty(
@@ -363,7 +533,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
             ],
         default='AUTO',
         options=set(),
-        update=update
+        update=group_settings_update_handler
         )
 
     rotation_x: BoolProperty(
@@ -371,7 +541,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's X rotation",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("rotation_x")
         )
 
     rotation_y: BoolProperty(
@@ -379,7 +549,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Y rotation",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("rotation_y")
         )
 
     rotation_z: BoolProperty(
@@ -387,7 +557,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Z rotation",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("rotation_z")
         )
 
     scale_x: BoolProperty(
@@ -395,7 +565,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's X scale",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("scale_x")
         )
 
     scale_y: BoolProperty(
@@ -403,7 +573,7 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Y scale",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("scale_y")
         )
 
     scale_z: BoolProperty(
@@ -411,7 +581,20 @@ class PoseDrivenShapeKeyGroup(Identifiable, PropertyGroup):
         description="Use the target bone's Z scale",
         default=False,
         options=set(),
-        update=update
+        update=group_property_flag_update_handler("scale_z")
+        )
+
+    suspend: EnumProperty(
+        name="Suspend",
+        description="Remove the group's drivers from evaluation while they aren't needed",
+        items=[
+            ('OFF' , "Off" , "Always evaluate the group's drivers"),
+            ('ON'  , "On"  , "Suspend the group's drivers"),
+            ('AUTO', "Auto", "Suspend the group's drivers while its meshes are hidden or not deformed by its armature"),
+            ],
+        default='OFF',
+        options=set(),
+        update=group_suspend_update_handler
         )
 
     def __init__(self, name: str) -> None:
@@ -0,0 +1,103 @@
+from typing import TYPE_CHECKING
+from bpy.types import PropertyGroup
+from bpy.props import BoolProperty, FloatProperty
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
+if TYPE_CHECKING:
+    from bpy.types import Context
+    from .group import PoseDrivenShapeKeyGroup
+
+
+def group_bone_group(bone: 'PoseDrivenShapeKeyGroupBone') -> 'PoseDrivenShapeKeyGroup':
+    path: str = bone.path_from_id()
+    return bone.id_data.path_resolve(path.rpartition(".bones[")[0])
+
+
+@deferrable
+@dataclass(frozen=True)
+class GroupBoneUpdateEvent(Event):
+    group: 'PoseDrivenShapeKeyGroup'
+    bone: 'PoseDrivenShapeKeyGroupBone'
+
+
+def group_bone_update_handler(bone: 'PoseDrivenShapeKeyGroupBone', _: 'Context') -> None:
+    dispatch(GroupBoneUpdateEvent, group_bone_group(bone), bone)
+
+
+class PoseDrivenShapeKeyGroupBone(PropertyGroup):
+    """An additional bone read by a group, named after the pose bone"""
+
+    @property
+    def is_enabled(self) -> bool:
+        return (self.location_x
+                or self.location_y
+                or self.location_z
+                or self.rotation
+                or self.scale_x
+                or self.scale_y
+                or self.scale_z)
+
+    location_x: BoolProperty(
+        name="X",
+        description="Use the bone's X location",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    location_y: BoolProperty(
+        name="Y",
+        description="Use the bone's Y location",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    location_z: BoolProperty(
+        name="Z",
+        description="Use the bone's Z location",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    rotation: BoolProperty(
+        name="Rotation",
+        description="Use the bone's rotation (as a quaternion distance)",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    scale_x: BoolProperty(
+        name="X",
+        description="Use the bone's X scale",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    scale_y: BoolProperty(
+        name="Y",
+        description="Use the bone's Y scale",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    scale_z: BoolProperty(
+        name="Z",
+        description="Use the bone's Z scale",
+        default=False,
+        options=set(),
+        update=group_bone_update_handler
+        )
+
+    weight: FloatProperty(
+        name="Weight",
+        description="Weight of the bone's distance in the group's combined distance",
+        min=0.0,
+        default=1.0,
+        precision=3,
+        options=set(),
+        update=group_bone_update_handler
+        )
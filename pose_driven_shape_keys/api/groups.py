@@ -2,7 +2,7 @@
 from typing import Iterator, List, Optional, Tuple, Union
 from bpy.types import PropertyGroup
 from bpy.props import CollectionProperty, IntProperty
-from ..lib.events import dataclass, dispatch_event, Event
+from ..lib.dispatch import dataclass, dispatch, Event
 from .group import PoseDrivenShapeKeyGroup
 
 
@@ -94,7 +94,7 @@ class PoseDrivenShapeKeyGroups(PropertyGroup):
 
         group = self.collection__internal__.add()
         group.__init__(name=value)
-        dispatch_event(PoseDrivenShapeKeyGroupCreatedEvent(group))
+        dispatch(PoseDrivenShapeKeyGroupCreatedEvent, group)
 
         return group
 
@@ -113,7 +113,7 @@ class PoseDrivenShapeKeyGroups(PropertyGroup):
             raise RuntimeError((f'{self.__class__.__name__}.remove(group): '
                                 f'Group {group} is not empty.'))
 
-        dispatch_event(PoseDrivenShapeKeyGroupDisposeEvent(group))
+        dispatch(PoseDrivenShapeKeyGroupDisposeEvent, group)
         self.collection__internal__.remove(index)
         self.active_index = min(len(self)-1, self.active_index)
-        dispatch_event(PoseDrivenShapeKeyTargetRemovedEvent(self, index))
+        dispatch(PoseDrivenShapeKeyTargetRemovedEvent, self, index)
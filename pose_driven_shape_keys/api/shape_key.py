@@ -1,15 +1,16 @@
 
 from typing import TYPE_CHECKING
 from bpy.types import PropertyGroup
-from bpy.props import BoolProperty, PointerProperty
+from bpy.props import BoolProperty, PointerProperty, StringProperty
 from ..lib.mixins import Identifiable
-from ..lib.events import dataclass, dispatch_event, Event
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
 from .activation import PoseDrivenShapeKeyActivation
 if TYPE_CHECKING:
     from bpy.types import Context, ShapeKey
     from .group import PoseDrivenShapeKeyGroup
 
 
+@deferrable
 @dataclass(frozen=True)
 class ShapeKeyMuteUpdateEvent(Event):
     shapekey: 'PoseDrivenShapeKey'
@@ -17,7 +18,11 @@ class ShapeKeyMuteUpdateEvent(Event):
 
 
 def shapekey_mute_update_handler(shape: 'PoseDrivenShapeKey', _: 'Context') -> None:
-    dispatch_event(ShapeKeyMuteUpdateEvent(shape, shape.mute))
+    dispatch(ShapeKeyMuteUpdateEvent, shape, shape.mute)
+
+
+def shapekey_fingerprint(shape: 'PoseDrivenShapeKey') -> str:
+    return shape.get("fingerprint", "")
 
 
 class PoseDrivenShapeKey(Identifiable, PropertyGroup):
@@ -29,6 +34,13 @@ class PoseDrivenShapeKey(Identifiable, PropertyGroup):
         options=set()
         )
 
+    fingerprint: StringProperty(
+        name="Fingerprint",
+        description="Hash of the settings the shape key's drivers were generated from",
+        get=shapekey_fingerprint,
+        options=set()
+        )
+
     mute: BoolProperty(
         name="Mute",
         description=("Whether or not the driven shape key's driver is enabled. Disabling "
@@ -1,11 +1,13 @@
 
-from typing import Iterator, List, Optional, Tuple, Union
+from typing import Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 from bpy.types import PropertyGroup, ShapeKey
-from bpy.props import CollectionProperty,  PointerProperty
-from ..lib.events import dataclass, dispatch_event, Event
+from bpy.props import CollectionProperty, EnumProperty, PointerProperty
+from ..lib.dispatch import dataclass, deferrable, dispatch, Event
 from .group import PoseDrivenShapeKeyGroup
 from .groups import PoseDrivenShapeKeyGroups
 from .shape_key import PoseDrivenShapeKey
+if TYPE_CHECKING:
+    from bpy.types import Context
 
 
 @dataclass(frozen=True)
@@ -24,6 +26,34 @@ class PoseDrivenShapeKeyRemovedEvent(Event):
     index: int
 
 
+@dataclass(frozen=True)
+class PoseDrivenShapeKeyBulkCreatedEvent(Event):
+    items: Tuple[PoseDrivenShapeKey, ...]
+
+
+@dataclass(frozen=True)
+class PoseDrivenShapeKeyBulkDisposeEvent(Event):
+    items: Tuple[PoseDrivenShapeKey, ...]
+
+
+@dataclass(frozen=True)
+class PoseDrivenShapeKeyBulkRemovedEvent(Event):
+    shapekeys: 'PoseDrivenShapeKeys'
+    indices: Tuple[int, ...]
+    groups: Tuple[str, ...]
+
+
+@deferrable
+@dataclass(frozen=True)
+class PoseDrivenShapeKeysSuspendUpdateEvent(Event):
+    shapekeys: 'PoseDrivenShapeKeys'
+    value: str
+
+
+def shapekeys_suspend_update_handler(shapekeys: 'PoseDrivenShapeKeys', _: 'Context') -> None:
+    dispatch(PoseDrivenShapeKeysSuspendUpdateEvent, shapekeys, shapekeys.suspend)
+
+
 class PoseDrivenShapeKeys(PropertyGroup):
 
     collection__internal__: CollectionProperty(
@@ -38,6 +68,19 @@ class PoseDrivenShapeKeys(PropertyGroup):
         options=set()
         )
 
+    suspend: EnumProperty(
+        name="Suspend",
+        description="Remove the drivers of every group on the Key from evaluation while they aren't needed",
+        items=[
+            ('GROUPS', "Groups", "Use each group's own suspend mode"),
+            ('ON'    , "On"    , "Suspend the drivers of every group"),
+            ('AUTO'  , "Auto"  , "Suspend the drivers of every group while its meshes are hidden or not deformed by its armature"),
+            ],
+        default='GROUPS',
+        options=set(),
+        update=shapekeys_suspend_update_handler
+        )
+
     def __contains__(self, key: Union[PoseDrivenShapeKey, str]) -> bool:
         if isinstance(key, str):
             return self.find(key) != -1
@@ -76,20 +119,20 @@ class PoseDrivenShapeKeys(PropertyGroup):
                              f'Expected shape to be ShapeKey, not {shape.__class__.__name__}'))
 
         if group is None:
-            group = self.targets.active or self.targets.new()
+            group = self.groups.active or self.groups.new()
         else:
             if not isinstance(group, PoseDrivenShapeKeyGroup):
                 raise TypeError((f'{self.__class__.__name__}.new(shape, target=None): '
                                  f'Expected target to be PoseDrivenShapeKeyGroup,'
                                  f' not {group.__class__.__name__}'))
 
-            if self.targets.index(group) == -1:
+            if group not in self.groups:
                 raise ValueError((f'{self.__class__.__name__}.new(shape, target=None): '
                                   f'target is not a target for this Key'))
         
         item = self.collection__internal__.add()
         item.__init__(shape, group)
-        dispatch_event(PoseDrivenShapeKeyCreatedEvent(item))
+        dispatch(PoseDrivenShapeKeyCreatedEvent, item)
         return item
 
     def remove(self, item: PoseDrivenShapeKey) -> None:
@@ -103,6 +146,68 @@ class PoseDrivenShapeKeys(PropertyGroup):
             raise ValueError((f'{self.__class__.__name__}.remove(item): '
                              f'item {item} is not a member of this collection.'))
 
-        dispatch_event(PoseDrivenShapeKeyDisposeEvent(item))
+        dispatch(PoseDrivenShapeKeyDisposeEvent, item)
         self.collection__internal__.remove(index)
-        dispatch_event(PoseDrivenShapeKeyRemovedEvent(self, index))
\ No newline at end of file
+        dispatch(PoseDrivenShapeKeyRemovedEvent, self, index)
+
+    def new_many(self,
+                 shapes: Iterable[ShapeKey],
+                 group: Optional[PoseDrivenShapeKeyGroup]=None) -> List[PoseDrivenShapeKey]:
+        shapes = tuple(shapes)
+        for shape in shapes:
+            if not isinstance(shape, ShapeKey):
+                raise TypeError((f'{self.__class__.__name__}.new_many(shapes, group=None): '
+                                 f'Expected shapes to be ShapeKey, not {shape.__class__.__name__}'))
+
+        if group is None:
+            group = self.groups.active or self.groups.new()
+        else:
+            if not isinstance(group, PoseDrivenShapeKeyGroup):
+                raise TypeError((f'{self.__class__.__name__}.new_many(shapes, group=None): '
+                                 f'Expected group to be PoseDrivenShapeKeyGroup,'
+                                 f' not {group.__class__.__name__}'))
+
+            if group not in self.groups:
+                raise ValueError((f'{self.__class__.__name__}.new_many(shapes, group=None): '
+                                  f'group is not a group for this Key'))
+
+        collection = self.collection__internal__
+        for shape in shapes:
+            collection.add().__init__(shape, group)
+
+        # Re-fetch items by index as adding to a collection can reallocate it
+        count = len(collection)
+        items = tuple(collection[index] for index in range(count-len(shapes), count))
+        if items:
+            dispatch(PoseDrivenShapeKeyBulkCreatedEvent, items)
+        return list(items)
+
+    def remove_many(self, items: Iterable[PoseDrivenShapeKey]) -> None:
+        items = tuple(items)
+        for item in items:
+            if not isinstance(item, PoseDrivenShapeKey):
+                raise TypeError((f'{self.__class__.__name__}.remove_many(items): '
+                                 f'Expected items to be PoseDrivenShapeKey, '
+                                 f'not {item.__class__.__name__}'))
+
+        lookup = {x.as_pointer(): i for i, x in enumerate(self)}
+        indices = []
+        for item in items:
+            index = lookup.pop(item.as_pointer(), -1)
+            if index == -1:
+                raise ValueError((f'{self.__class__.__name__}.remove_many(items): '
+                                  f'item {item} is not a member of this collection '
+                                  f'or is listed more than once.'))
+            indices.append(index)
+
+        if not indices:
+            return
+
+        groups = tuple({item.get("group", ""): None for item in items})
+        dispatch(PoseDrivenShapeKeyBulkDisposeEvent, items)
+
+        collection = self.collection__internal__
+        for index in sorted(indices, reverse=True):
+            collection.remove(index)
+
+        dispatch(PoseDrivenShapeKeyBulkRemovedEvent, self, tuple(sorted(indices)), groups)
\ No newline at end of file
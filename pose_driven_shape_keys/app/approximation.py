@@ -0,0 +1,94 @@
+
+from typing import Optional, TYPE_CHECKING
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+from ..core import registry
+from ..core.registry import Metric
+from . import distance, drivers
+if TYPE_CHECKING:
+    from ..api.group import PoseDrivenShapeKeyGroup
+
+# The quaternion and swing metrics can be replaced by cheaper proxies (chord
+# distances) which avoid acos/asin in the driver expression. The proxies are
+# monotonic in the exact distance, so the remap back to the exact distance is
+# folded into the activation F-Curve's keyframes and the activation still matches
+# the exact metric, up to the error of the folded curve (which is stored on the
+# group as approximation_error). The remap can only be folded when the rotation is
+# the group's single channel, otherwise the exact metric is used.
+
+SAMPLES = 48
+
+OWNER = object()
+
+
+def metric(group: 'PoseDrivenShapeKeyGroup') -> Optional[Metric]:
+    # The proxy metric the group's rotation driver uses, None for the exact metric
+    mode = group.approximation
+    if mode == 'EXACT':
+        return None
+    if mode == 'AUTO':
+        scene = bpy.context.scene
+        if scene is None or not scene.render.use_simplify:
+            return None
+    if not group.rotation or group.rotation_mode not in ('QUATERNION', 'SWING'):
+        return None
+    if len(distance.metrics(group)) != 1:
+        return None
+    result = registry.rotation_metric(group.rotation_mode, group.rotation_axis, approximate=True)
+    return result if result.remap is not None else None
+
+
+def samples(proxy: Metric, radius: float) -> np.ndarray:
+    # Driver inputs (1 - proxy distance) at which the folded curve is sampled, evenly
+    # spaced in exact distance over the radius
+    grid = np.linspace(0.0, 1.0, 1025)
+    exact = proxy.remap(grid)
+    distances = np.linspace(0.0, min(max(radius, 0.0), proxy.scale or 1.0), SAMPLES)
+    return 1.0 - np.interp(distances, exact, grid)
+
+
+def inputs(proxy: Metric, x: np.ndarray) -> np.ndarray:
+    # Maps driver inputs computed from the proxy to the ones of the exact metric
+    return 1.0 - proxy.remap(1.0 - np.asarray(x, dtype=float))
+
+
+def error_reset(group: 'PoseDrivenShapeKeyGroup') -> None:
+    group["approximation_error"] = 0.0
+
+
+def error_update(group: 'PoseDrivenShapeKeyGroup', error: float) -> None:
+    group["approximation_error"] = max(group.get("approximation_error", 0.0), error)
+
+
+def on_simplify_update() -> None:
+    for key in bpy.data.shape_keys:
+        if key.is_property_set("pose_driven"):
+            for group in key.pose_driven.groups:
+                if group.approximation == 'AUTO':
+                    drivers.group_update(group)
+
+
+def subscribe() -> None:
+    bpy.msgbus.subscribe_rna(key=(bpy.types.RenderSettings, "use_simplify"),
+                             owner=OWNER,
+                             args=(),
+                             notify=on_simplify_update)
+
+
+@persistent
+def on_load_post(_=None) -> None:
+    # Subscriptions are cleared when a file is loaded
+    bpy.msgbus.clear_by_owner(OWNER)
+    subscribe()
+
+
+def register() -> None:
+    subscribe()
+    bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister() -> None:
+    if on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_load_post)
+    bpy.msgbus.clear_by_owner(OWNER)
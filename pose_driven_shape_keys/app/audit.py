@@ -0,0 +1,232 @@
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+import bpy
+from .idprops import CHANNELS, PREFIX, STRIDE
+if TYPE_CHECKING:
+    from bpy.types import Key
+
+# The audit reads ID properties directly rather than going through RNA. That keeps it
+# read-only (the identifier getters lazily write new identifiers) and lets it run
+# whether or not the legacy add-on is registered.
+
+DANGLING_DISTANCES = 'DANGLING_DISTANCES'
+ORPHAN_DRIVER = 'ORPHAN_DRIVER'
+STALE_PROPERTY = 'STALE_PROPERTY'
+MISSING_SHAPE = 'MISSING_SHAPE'
+MISSING_BONE = 'MISSING_BONE'
+MISSING_GROUP = 'MISSING_GROUP'
+INVALID_GROUP = 'INVALID_GROUP'
+
+# Text block the audit operator writes its machine-readable report to
+REPORT_TEXT = "pose_driven_audit.json"
+
+
+@dataclass(frozen=True)
+class Issue:
+    key: str
+    code: str
+    path: str
+    message: str
+    repairable: bool
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def collection(owner: Any, *path: str) -> List[Any]:
+    for name in path:
+        owner = owner.get(name) if owner is not None else None
+    return list(owner) if owner is not None else []
+
+
+def channel_property(name: str) -> Tuple[str, str]:
+    # The channel and shape key identifier of a legacy per shape key distance
+    # property (pds_<channel>_<identifier>), as named by drivers.legacy_path
+    parts = name.split("_", 2)
+    return (parts[1], parts[2]) if len(parts) == 3 else ("", "")
+
+
+def bone_exists(object: Any, name: str) -> bool:
+    return (object is not None
+            and getattr(object, "type", "") == 'ARMATURE'
+            and name in object.data.bones)
+
+
+def audit(key: 'Key') -> List[Issue]:
+    issues: List[Issue] = []
+    shapes = set(key.key_blocks.keys())
+    props = set(key.keys())
+
+    legacy = collection(key, "pose_drivers")
+    legacy_ids = {item.get("identifier", "") for item in legacy}
+
+    driven = collection(key, "pose_driven", "collection__internal__")
+    driven_ids = {item.get("identifier", "") for item in driven}
+
+    groups = collection(key, "pose_driven", "groups", "collection__internal__")
+    group_names = {group.get("name", "") for group in groups}
+    group_slots = {}
+    for group in groups:
+        slots = group.get("slots")
+        group_slots[group.get("identifier", "")] = set(slots.values()) if slots is not None else set()
+
+    # Single pass over the Key's drivers
+    legacy_bones: Dict[str, str] = {}
+    driver_paths: Set[str] = set()
+    animdata = key.animation_data
+    if animdata:
+        for fcurve in animdata.drivers:
+            path = fcurve.data_path
+            driver_paths.add(path)
+            variables = fcurve.driver.variables
+
+            if path.startswith('key_blocks["'):
+                if len(variables) > 0:
+                    name = variables[0].name
+                    if name.startswith("posedriver_") and name[11:] not in legacy_ids:
+                        issues.append(Issue(key.name, ORPHAN_DRIVER, path,
+                                            f'Driver references missing pose driver {name[11:]}', True))
+
+            elif path.startswith('["') and path.endswith('_distances"]'):
+                identifier = path[2:-12]
+                if identifier not in legacy_ids:
+                    issues.append(Issue(key.name, ORPHAN_DRIVER, path,
+                                        f'Distance driver for missing pose driver {identifier}', True))
+                elif len(variables) > 0 and identifier not in legacy_bones:
+                    target = variables[0].targets[0]
+                    if variables[0].type == 'TRANSFORMS':
+                        legacy_bones[identifier] = target.bone_target
+                    elif target.data_path.startswith('pose.bones["'):
+                        legacy_bones[identifier] = target.data_path[12:target.data_path.find('"]')]
+
+            elif path.startswith(f'["{PREFIX}_') and path.count("_") == 1:
+                identifier = path[2+len(PREFIX)+1:-2]
+                if identifier not in group_slots:
+                    issues.append(Issue(key.name, ORPHAN_DRIVER, path,
+                                        f'Distance driver for missing group {identifier}', True))
+                elif fcurve.array_index // STRIDE not in group_slots[identifier]:
+                    issues.append(Issue(key.name, ORPHAN_DRIVER, f'{path}[{fcurve.array_index}]',
+                                        f'Distance driver for unassigned slot {fcurve.array_index // STRIDE}', True))
+
+            elif path.startswith(f'["{PREFIX}_'):
+                _, identifier = channel_property(path[2:-2])
+                if identifier not in driven_ids:
+                    issues.append(Issue(key.name, ORPHAN_DRIVER, path,
+                                        f'Distance driver for missing shape key {identifier}', True))
+
+    # Single pass over the Key's ID properties
+    for name in props:
+        if name.endswith("_distances"):
+            if name[:-10] not in legacy_ids:
+                issues.append(Issue(key.name, DANGLING_DISTANCES, f'["{name}"]',
+                                    f'Distance data for missing pose driver {name[:-10]}', True))
+        elif name.startswith(f'{PREFIX}_') and name.count("_") == 1:
+            if name[len(PREFIX)+1:] not in group_slots:
+                issues.append(Issue(key.name, STALE_PROPERTY, f'["{name}"]',
+                                    f'Distance data for missing group {name[len(PREFIX)+1:]}', True))
+        elif name.startswith(f'{PREFIX}_'):
+            channel, identifier = channel_property(name)
+            if channel not in CHANNELS or identifier not in driven_ids:
+                issues.append(Issue(key.name, STALE_PROPERTY, f'["{name}"]',
+                                    f'Property for missing shape key {identifier}', True))
+            elif f'["{name}"]' not in driver_paths:
+                issues.append(Issue(key.name, STALE_PROPERTY, f'["{name}"]',
+                                    f'Property {name} is not driven', True))
+
+    for index, item in enumerate(legacy):
+        name = item.get("name", "")
+        path = f'pose_drivers[{index}]'
+        if name not in shapes:
+            issues.append(Issue(key.name, MISSING_SHAPE, path,
+                                f'Pose driver for missing shape key "{name}"', True))
+        elif not bone_exists(item.get("object"), legacy_bones.get(item.get("identifier", ""), "")):
+            issues.append(Issue(key.name, MISSING_BONE, path,
+                                f'Pose driver "{name}" targets a missing armature or bone', False))
+
+    for index, item in enumerate(driven):
+        name = item.get("name", "")
+        path = f'pose_driven.collection__internal__[{index}]'
+        if name not in shapes:
+            issues.append(Issue(key.name, MISSING_SHAPE, path,
+                                f'Pose driven shape key for missing shape key "{name}"', True))
+        if item.get("group", "") not in group_names:
+            issues.append(Issue(key.name, MISSING_GROUP, path,
+                                f'Pose driven shape key "{name}" references a missing group', False))
+
+    for index, group in enumerate(groups):
+        if not bone_exists(group.get("object"), group.get("bone_target", "")):
+            issues.append(Issue(key.name, INVALID_GROUP,
+                                f'pose_driven.groups.collection__internal__[{index}]',
+                                f'Group "{group.get("name", "")}" bone target does not resolve', False))
+
+    return issues
+
+
+def audit_all(keys: Optional[Iterable['Key']]=None) -> List[Issue]:
+    issues = []
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        issues.extend(audit(key))
+    return issues
+
+
+def repair(issues: Iterable[Issue]) -> int:
+    by_key: Dict[str, List[Issue]] = {}
+    for issue in issues:
+        if issue.repairable:
+            by_key.setdefault(issue.key, []).append(issue)
+
+    count = 0
+    for name, items in by_key.items():
+        key = bpy.data.shape_keys.get(name)
+        if key is None:
+            continue
+
+        fcurve_paths: Set[str] = set()
+        fcurve_elements: Set[Tuple[str, int]] = set()
+        legacy_indices: Set[int] = set()
+        driven_indices: Set[int] = set()
+
+        for issue in items:
+            if issue.code == ORPHAN_DRIVER:
+                if issue.path.endswith("]") and '"][' in issue.path:
+                    path, _, index = issue.path[:-1].rpartition("[")
+                    fcurve_elements.add((path, int(index)))
+                else:
+                    fcurve_paths.add(issue.path)
+            elif issue.code in (DANGLING_DISTANCES, STALE_PROPERTY):
+                fcurve_paths.add(issue.path)
+                try:
+                    del key[issue.path[2:-2]]
+                except KeyError: pass
+            elif issue.code == MISSING_SHAPE:
+                index = int(issue.path[issue.path.rfind("[")+1:-1])
+                if issue.path.startswith("pose_drivers"):
+                    identifier = collection(key, "pose_drivers")[index].get("identifier", "")
+                    fcurve_paths.add(f'["{identifier}_distances"]')
+                    try:
+                        del key[f'{identifier}_distances']
+                    except KeyError: pass
+                    legacy_indices.add(index)
+                else:
+                    driven_indices.add(index)
+            count += 1
+
+        animdata = key.animation_data
+        if animdata and (fcurve_paths or fcurve_elements):
+            drivers = animdata.drivers
+            for fcurve in [fcurve for fcurve in drivers
+                           if fcurve.data_path in fcurve_paths
+                           or (fcurve.data_path, fcurve.array_index) in fcurve_elements]:
+                drivers.remove(fcurve)
+
+        if legacy_indices:
+            for index in sorted(legacy_indices, reverse=True):
+                key.pose_drivers.remove(index)
+
+        # Removed through the API so that the usual handlers clean up their drivers
+        if driven_indices:
+            shape_keys = key.pose_driven
+            shape_keys.remove_many([shape_keys[index] for index in sorted(driven_indices)])
+
+    return count
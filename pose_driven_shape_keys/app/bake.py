@@ -0,0 +1,50 @@
+from typing import Iterable, Optional, TYPE_CHECKING
+import bpy
+from . import cache, engine
+from .jobs import Job, key_names
+if TYPE_CHECKING:
+    from bpy.types import Key, Scene
+
+# Baking fills the activation caches of Keys for the whole frame range ahead of
+# playback. Each frame is set on the scene and its groups solved from the evaluated
+# pose, exactly as during playback (see engine.key_solve), so constraints, NLA and
+# drivers acting on the bones are baked in. Suspended groups aren't baked.
+
+
+def bake_job(scene: 'Scene', keys: Optional[Iterable['Key']]=None) -> Job:
+    scene_name = scene.name
+    names = key_names(keys)
+    current = scene.frame_current
+
+    def prepare() -> None:
+        # Digests are computed again, so caches of edited animation are discarded
+        for name in names:
+            engine.DIGESTS.pop(name, None)
+
+    def bake(frame: int) -> None:
+        scene = bpy.data.scenes.get(scene_name)
+        if scene is None:
+            return
+        scene.frame_set(frame)
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        items = [key for key in map(bpy.data.shape_keys.get, names)
+                 if key is not None and key.is_property_set("pose_driven")]
+        engine.solve_all(depsgraph, scene, items)
+
+    def finish(_: Job) -> None:
+        scene = bpy.data.scenes.get(scene_name)
+        if scene is not None:
+            scene.frame_set(current)
+        cache.flush()
+
+    frames = range(scene.frame_start, scene.frame_end + 1)
+    return Job("Baking pose driver caches",
+               [prepare] + [lambda f=frame: bake(f) for frame in frames],
+               finish,
+               undo=False)
+
+
+def clear(keys: Optional[Iterable['Key']]=None) -> None:
+    for name in key_names(keys):
+        cache.remove(name)
+    engine.DIGESTS.clear()
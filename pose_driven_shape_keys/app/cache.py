@@ -0,0 +1,158 @@
+
+from dataclasses import dataclass
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+
+# Activations of groups using the NUMPY engine are cached per Key in a memory
+# mapped (frame x key block) array next to the .blend (<file>.pds_cache/<key>.npy),
+# with NaN marking values which haven't been cached. Frames are filled lazily as
+# they're played back, or eagerly by baking. Each cache is tagged with a digest of
+# the configuration it was computed from (see engine.key_digest) and is reset as
+# soon as the digest no longer matches.
+
+SUFFIX = ".pds_cache"
+
+
+@dataclass
+class Cache:
+    path: str
+    digest: str
+    start: int
+    data: np.memmap
+
+    def row(self, frame: float) -> Optional[int]:
+        index = int(frame) - self.start
+        if frame == int(frame) and 0 <= index < len(self.data):
+            return index
+
+    def lookup(self, frame: float, indices: np.ndarray) -> Optional[np.ndarray]:
+        row = self.row(frame)
+        if row is not None:
+            values = self.data[row, indices]
+            if not np.isnan(values).any():
+                return values
+
+    def store(self, frame: float, indices: np.ndarray, values: np.ndarray) -> None:
+        row = self.row(frame)
+        if row is not None:
+            self.data[row, indices] = values
+
+    def store_range(self, frames: Sequence[float], indices: np.ndarray, values: np.ndarray) -> None:
+        # Stores (frames x indices) values
+        for frame, data in zip(frames, values):
+            self.store(frame, indices, data)
+
+
+CACHES: Dict[str, Cache] = {}
+
+
+def directory() -> Optional[str]:
+    # Unsaved files have no cache
+    filepath = bpy.data.filepath
+    if filepath:
+        return os.path.splitext(bpy.path.abspath(filepath))[0] + SUFFIX
+
+
+def header_read(path: str) -> Dict:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def cache_open(name: str, digest: str, start: int, shape: Tuple[int, int]) -> Optional[Cache]:
+    """Returns the cache of the named Key, creating (or resetting) its file if it
+    doesn't match the digest, frame range and number of key blocks.
+    """
+    folder = directory()
+    cache = CACHES.get(name)
+    if (cache is not None
+            and cache.digest == digest
+            and cache.start == start
+            and cache.data.shape == shape
+            and os.path.dirname(cache.path) == folder):
+        return cache
+
+    if folder is None or shape[0] <= 0:
+        return None
+
+    path = os.path.join(folder, bpy.path.clean_name(name))
+    header = header_read(f'{path}.json')
+    data = None
+
+    if header.get("digest") == digest and header.get("start") == start and os.path.exists(f'{path}.npy'):
+        try:
+            data = np.lib.format.open_memmap(f'{path}.npy', mode="r+")
+        except (OSError, ValueError):
+            data = None
+        if data is not None and data.shape != shape:
+            data = None
+
+    if data is None:
+        try:
+            os.makedirs(folder, exist_ok=True)
+            data = np.lib.format.open_memmap(f'{path}.npy', mode="w+", dtype=np.float32, shape=shape)
+            data[:] = np.nan
+            with open(f'{path}.json', "w") as file:
+                json.dump({"key": name, "digest": digest, "start": start}, file)
+        except OSError:
+            return None
+
+    cache = Cache(path, digest, start, data)
+    CACHES[name] = cache
+    return cache
+
+
+def flush() -> None:
+    for cache in CACHES.values():
+        cache.data.flush()
+
+
+def clear() -> None:
+    flush()
+    CACHES.clear()
+
+
+def remove(name: str) -> None:
+    # Deletes the Key's cache files
+    cache = CACHES.pop(name, None)
+    path = cache.path if cache is not None else None
+    # Release the memory map before deleting its file
+    cache = None
+    if path is None:
+        folder = directory()
+        if folder is None:
+            return
+        path = os.path.join(folder, bpy.path.clean_name(name))
+    for suffix in (".npy", ".json"):
+        try:
+            os.remove(f'{path}{suffix}')
+        except OSError: pass
+
+
+@persistent
+def on_load_pre(_=None) -> None:
+    clear()
+
+
+@persistent
+def on_save_post(_=None) -> None:
+    flush()
+
+
+def register() -> None:
+    bpy.app.handlers.load_pre.append(on_load_pre)
+    bpy.app.handlers.save_post.append(on_save_post)
+
+
+def unregister() -> None:
+    for handlers, handler in ((bpy.app.handlers.load_pre, on_load_pre),
+                              (bpy.app.handlers.save_post, on_save_post)):
+        if handler in handlers:
+            handlers.remove(handler)
+    clear()
@@ -0,0 +1,191 @@
+
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import numpy as np
+from ..lib.transform_utils import transform_matrix
+from ..core import rotation, transform
+from . import distance, drivers
+from .activation import rotation_order
+from .drivers import BBONE_PROPERTIES
+if TYPE_CHECKING:
+    from bpy.types import Action, FCurve, Object
+    from ..api.group import PoseDrivenShapeKeyGroup
+    from ..api.shape_key import PoseDrivenShapeKey
+
+# Centers are read for a whole group at once: the pose bone (or the action's
+# F-Curves) is read a single time, every member's center is written as ID
+# properties so no per-center update event is dispatched, and the radii and
+# drivers are then updated once for the group.
+
+TOLERANCE = 0.001
+
+
+def bbone_path(path: str) -> Tuple[str, int]:
+    # "bbone_scalein[0]" -> ("bbone_scalein", 0)
+    if path.endswith("]"):
+        name, _, index = path[:-1].partition("[")
+        return name, int(index)
+    return path, 0
+
+
+def bbone_defaults() -> np.ndarray:
+    return np.array([1.0 if "scale" in name else 0.0 for name, _ in BBONE_PROPERTIES], dtype=float)
+
+
+def pose_read(ob: 'Object', bone_target: str) -> Tuple[np.ndarray, np.ndarray]:
+    bone = ob.pose.bones[bone_target]
+    matrix = np.array(transform_matrix(bone, 'LOCAL_SPACE'), dtype=float)
+    values = np.array([bone.path_resolve(path) for _, path in BBONE_PROPERTIES], dtype=float)
+    return matrix, values
+
+
+def marker_frames(action: 'Action') -> Dict[str, float]:
+    return {marker.name: float(marker.frame) for marker in action.pose_markers}
+
+
+def action_read(action: 'Action',
+                ob: 'Object',
+                bone_target: str,
+                frames: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    # Evaluates the bone's channels directly from the action's F-Curves. Unlike the
+    # current pose, constraints are not taken into account.
+    prefix = f'pose.bones["{bone_target}"].'
+    fcurves: Dict[Tuple[str, int], 'FCurve'] = {}
+    for fcurve in action.fcurves:
+        path = fcurve.data_path
+        if path.startswith(prefix):
+            fcurves[(path[len(prefix):], fcurve.array_index)] = fcurve
+
+    count = len(frames)
+
+    def channel(name: str, index: int, default: float) -> np.ndarray:
+        fcurve = fcurves.get((name, index))
+        if fcurve is None:
+            return np.full(count, default, dtype=float)
+        return np.array([fcurve.evaluate(frame) for frame in frames], dtype=float)
+
+    def vector(name: str, defaults: Sequence[float]) -> np.ndarray:
+        return np.stack([channel(name, i, x) for i, x in enumerate(defaults)], axis=-1)
+
+    mode = ob.pose.bones[bone_target].rotation_mode
+    if mode == 'QUATERNION':
+        quaternion = vector("rotation_quaternion", (1.0, 0.0, 0.0, 0.0))
+    elif mode == 'AXIS_ANGLE':
+        quaternion = transform.axis_angle_quaternion(vector("rotation_axis_angle", (0.0, 0.0, 1.0, 0.0)))
+    else:
+        quaternion = transform.euler_quaternion(vector("rotation_euler", (0.0, 0.0, 0.0)), mode)
+
+    matrices = transform.compose(vector("location", (0.0, 0.0, 0.0)),
+                                 quaternion,
+                                 vector("scale", (1.0, 1.0, 1.0)))
+
+    defaults = bbone_defaults()
+    values = np.stack([channel(*bbone_path(path), default)
+                       for (_, path), default in zip(BBONE_PROPERTIES, defaults)], axis=-1)
+
+    return matrices, values
+
+
+def centers_write(items: Sequence['PoseDrivenShapeKey'],
+                  matrices: np.ndarray,
+                  values: np.ndarray) -> None:
+    names = [name for name, _ in BBONE_PROPERTIES]
+    for item, matrix, data in zip(items, transform.flatten(matrices).tolist(), values.tolist()):
+        center = item.activation.center
+        center["transform_matrix"] = matrix
+        for name, value in zip(names, data):
+            center[name] = value
+
+
+def bone_centers_write(items: Sequence['PoseDrivenShapeKey'],
+                       names: Sequence[str],
+                       matrices: np.ndarray) -> None:
+    # Stores the (items, bones, 4, 4) poses of the group's additional bones
+    flat = transform.flatten(matrices).tolist()
+    for item, data in zip(items, flat):
+        bones = item.activation.center.bones
+        for name, matrix in zip(names, data):
+            entry = bones.get(name)
+            if entry is None:
+                entry = bones.add()
+                entry.name = name
+            entry["transform_matrix"] = matrix
+
+
+def flags_write(group: 'PoseDrivenShapeKeyGroup',
+                matrices: np.ndarray,
+                values: np.ndarray) -> None:
+    # Enables the channels in which any of the poses differs from the rest pose
+    def varies(data: np.ndarray, default: object) -> np.ndarray:
+        return np.any(np.abs(data - default) > TOLERANCE, axis=0)
+
+    location, quaternion, scale = transform.decompose(matrices)
+    for axis, a, b in zip("xyz", varies(location, 0.0), varies(scale, 1.0)):
+        group[f'location_{axis}'] = bool(a)
+        group[f'scale_{axis}'] = bool(b)
+
+    mode = group.rotation_mode
+    if mode == 'EULER':
+        for axis, flag in zip("xyz", varies(transform.euler(matrices, rotation_order(group)), 0.0)):
+            group[f'rotation_{axis}'] = bool(flag)
+    elif mode == 'TWIST':
+        group["rotation"] = bool(varies(rotation.twist(quaternion, group.rotation_axis), 0.0))
+    elif mode == 'SWING':
+        group["rotation"] = bool(varies(rotation.swing(quaternion, group.rotation_axis)[..., 0], 1.0))
+    else:
+        group["rotation"] = bool(np.any(varies(quaternion, (1.0, 0.0, 0.0, 0.0))))
+
+    segmented = group.object.data.bones[group.bone_target].bbone_segments > 1
+    for (name, _), flag in zip(BBONE_PROPERTIES, varies(values, bbone_defaults())):
+        group[name] = segmented and bool(flag)
+
+
+def update(group: 'PoseDrivenShapeKeyGroup',
+           items: Optional[Sequence['PoseDrivenShapeKey']]=None,
+           action: Optional['Action']=None,
+           set_flags: Optional[bool]=False) -> List['PoseDrivenShapeKey']:
+    """Updates the centers of the group's members (all members by default).
+
+    Without an action every center is read from the target bone's current pose.
+    With an action each member is read from the pose marker named after it, and
+    members without a marker are left unchanged. Returns the updated members.
+    """
+    if not group.is_valid:
+        return []
+
+    members = list(group)
+    items = members if items is None else list(items)
+    ob = group.object
+    bone_target = group.bone_target
+
+    # Each additional bone is read once for all the items too
+    names = [bone.name for _, bone in distance.bones(group)]
+
+    if action is None:
+        matrix, data = pose_read(ob, bone_target)
+        matrices = np.broadcast_to(matrix, (len(items), 4, 4))
+        values = np.broadcast_to(data, (len(items), len(data)))
+        poses = np.array([transform_matrix(ob.pose.bones[name], 'LOCAL_SPACE') for name in names],
+                         dtype=float).reshape(-1, 4, 4)
+        poses = np.broadcast_to(poses, (len(items),) + poses.shape)
+    else:
+        frames = marker_frames(action)
+        items = [item for item in items if item.name in frames]
+        times = [frames[x.name] for x in items]
+        matrices, values = action_read(action, ob, bone_target, times)
+        poses = np.empty((len(items), 0, 4, 4))
+        if names:
+            poses = np.stack([action_read(action, ob, name, times)[0] for name in names], axis=1)
+
+    if not items:
+        return items
+
+    centers_write(items, matrices, values)
+    if names:
+        bone_centers_write(items, names, poses)
+
+    if set_flags:
+        flags_write(group, matrices, values)
+
+    # The radii of the other members depend on the updated centers too
+    drivers.group_update(group, members)
+    return items
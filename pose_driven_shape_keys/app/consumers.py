@@ -0,0 +1,161 @@
+
+from typing import Dict, Iterable, Optional, Set, TYPE_CHECKING
+import bpy
+from ..lib.dispatch import event_handler
+from ..lib.driver_utils import driver_ensure, driver_variables_clear
+from ..api.group import GroupConsumerCreatedEvent, GroupConsumerDisposeEvent
+from ..api.shape_keys import (PoseDrivenShapeKeyCreatedEvent,
+                              PoseDrivenShapeKeyDisposeEvent,
+                              PoseDrivenShapeKeyBulkCreatedEvent,
+                              PoseDrivenShapeKeyBulkDisposeEvent)
+from .drivers import items_by_group
+if TYPE_CHECKING:
+    from bpy.types import Driver, FCurve, Key
+    from ..api.group import PoseDrivenShapeKeyGroup
+
+# A consumer Key's shape keys follow the value of the group's shape key of the same
+# name through a single variable AVERAGE driver, so the distance drivers only run
+# on the group's own Key. Consumer drivers are recognised by their variable name.
+
+VARIABLE = "pds_src"
+
+
+def value_path(name: str) -> str:
+    return f'key_blocks["{name}"].value'
+
+
+def consumer_drivers(key: 'Key', source: 'Key') -> Dict[str, 'FCurve']:
+    # Maps source shape key names to the consumer Key's drivers following them
+    result: Dict[str, 'FCurve'] = {}
+    animdata = key.animation_data
+    if animdata:
+        for fcurve in animdata.drivers:
+            variables = fcurve.driver.variables
+            if len(variables) == 1 and variables[0].name == VARIABLE:
+                target = variables[0].targets[0]
+                if target.id == source:
+                    result[target.data_path[12:-8]] = fcurve
+    return result
+
+
+def consumer_driver_update(driver: 'Driver', source: 'Key', name: str) -> None:
+    driver.type = 'AVERAGE'
+    driver_variables_clear(driver.variables)
+
+    variable = driver.variables.new()
+    variable.type = 'SINGLE_PROP'
+    variable.name = VARIABLE
+
+    target = variable.targets[0]
+    target.id_type = 'KEY'
+    target.id = source
+    target.data_path = value_path(name)
+
+
+def sync(group: 'PoseDrivenShapeKeyGroup', keys: Optional[Iterable['Key']]=None) -> None:
+    """Brings the consumer drivers of the group's consumers (or the given keys) up to date.
+
+    Drivers are added for members with a matching shape key on the consumer, and
+    removed when the source shape key no longer exists. When a source shape key has
+    been renamed (Blender updates the driver variable's path) the consumer's shape
+    key is renamed to match.
+    """
+    source = group.id_data
+    shapes = source.key_blocks
+    members = {item.name for item in group}
+
+    if keys is None:
+        keys = [x.key for x in group.consumers]
+
+    for key in keys:
+        if key is None or key == source:
+            continue
+
+        existing = consumer_drivers(key, source)
+        blocks = key.key_blocks
+        own = set(key.pose_driven.keys()) if key.is_property_set("pose_driven") else set()
+
+        obsolete = [fcurve for name, fcurve in existing.items() if name not in shapes]
+        if obsolete:
+            drivers = key.animation_data.drivers
+            for fcurve in obsolete:
+                drivers.remove(fcurve)
+
+        for name, fcurve in existing.items():
+            if name in shapes:
+                current = fcurve.data_path[12:-8]
+                if current != name and current in blocks and name not in blocks:
+                    blocks[current].name = name
+
+        for name in members:
+            if name not in existing and name not in own and name in blocks:
+                if blocks[name] != key.reference_key:
+                    consumer_driver_update(driver_ensure(key, value_path(name)).driver, source, name)
+
+
+def unlink(group: 'PoseDrivenShapeKeyGroup',
+           keys: Optional[Iterable['Key']]=None,
+           names: Optional[Set[str]]=None) -> None:
+    # Removes the drivers following the group's members (or the given names)
+    source = group.id_data
+    if names is None:
+        names = {item.name for item in group}
+    if keys is None:
+        keys = [x.key for x in group.consumers]
+
+    for key in keys:
+        if key is None or key == source:
+            continue
+        obsolete = [fcurve for name, fcurve in consumer_drivers(key, source).items() if name in names]
+        if obsolete:
+            drivers = key.animation_data.drivers
+            for fcurve in obsolete:
+                drivers.remove(fcurve)
+
+
+def sync_all(keys: Optional[Iterable['Key']]=None) -> None:
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        if key.is_property_set("pose_driven"):
+            for group in key.pose_driven.groups:
+                if len(group.consumers):
+                    sync(group)
+
+
+@event_handler(GroupConsumerCreatedEvent)
+def on_consumer_created(event: GroupConsumerCreatedEvent) -> None:
+    sync(event.group, (event.consumer.key,))
+
+
+@event_handler(GroupConsumerDisposeEvent)
+def on_consumer_dispose(event: GroupConsumerDisposeEvent) -> None:
+    unlink(event.group, (event.consumer.key,))
+
+
+@event_handler(PoseDrivenShapeKeyCreatedEvent)
+def on_shape_key_created(event: PoseDrivenShapeKeyCreatedEvent) -> None:
+    group = event.shapekey.group
+    if group is not None and len(group.consumers):
+        sync(group)
+
+
+@event_handler(PoseDrivenShapeKeyBulkCreatedEvent)
+def on_shape_keys_created(event: PoseDrivenShapeKeyBulkCreatedEvent) -> None:
+    for key, name in items_by_group(event.items):
+        group = key.pose_driven.groups.get(name)
+        if group is not None and len(group.consumers):
+            sync(group)
+
+
+@event_handler(PoseDrivenShapeKeyDisposeEvent)
+def on_shape_key_dispose(event: PoseDrivenShapeKeyDisposeEvent) -> None:
+    group = event.shapekey.group
+    if group is not None and len(group.consumers):
+        unlink(group, names={event.shapekey.name})
+
+
+@event_handler(PoseDrivenShapeKeyBulkDisposeEvent)
+def on_shape_keys_dispose(event: PoseDrivenShapeKeyBulkDisposeEvent) -> None:
+    for (key, name), items in items_by_group(event.items).items():
+        group = key.pose_driven.groups.get(name)
+        if group is not None and len(group.consumers):
+            unlink(group, names={item.name for item in items})
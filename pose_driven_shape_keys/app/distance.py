@@ -1,74 +1,125 @@
 
-from typing import Callable, List, Sequence, TYPE_CHECKING
-from functools import partial
-from math import acos, asin, fabs, pi, sqrt
+from typing import List, Optional, Sequence, Tuple, TYPE_CHECKING
 import numpy as np
+from ..core import distance as core_distance, registry, transform
+from ..core.registry import Metric
+from . import idprops
+from .activation import rotation_order
 if TYPE_CHECKING:
+    from ..api.activation_center import PoseDrivenShapeKeyActivationCenter
     from ..api.group import PoseDrivenShapeKeyGroup
+    from ..api.group_bone import PoseDrivenShapeKeyGroupBone
     from ..api.shape_key import PoseDrivenShapeKey
 
-def euclidean(a: Sequence[float], b: Sequence[float]) -> float:
-    return sqrt(sum(pow(ai-bi,2.0) for ai,bi in zip(a,b)))
-
-
-def angle(a: Sequence[float], b: Sequence[float]) -> float:
-    return fabs(a[0]-b[0])/pi
-
-
-def quaternion(a: Sequence[float], b: Sequence[float]) -> float:
-    return acos((2.0*pow(min(max(sum(ai*bi for ai,bi in zip(a,b)),-1.0),1.0),2.0))-1.0)/pi
-
-
-def direction(a: Sequence[float], b: Sequence[float], axis: str) -> float:
-    aw, ax, ay, az = a
-    bw, bx, by, bz = b
-    if axis == 'X':
-        a = (1.0-2.0*(ay*ay+az*az),2.0*(ax*ay+aw*az),2.0*(ax*az-aw*ay))
-        b = (1.0-2.0*(by*by+bz*bz),2.0*(bx*by+bw*bz),2.0*(bx*bz-bw*by))
-    elif axis == 'Y':
-        a = (2.0*(ax*ay-aw*az),1.0-2.0*(ax*ax+az*az),2.0*(ay*az+aw*ax))
-        b = (2.0*(bx*by-bw*bz),1.0-2.0*(bx*bx+bz*bz),2.0*(by*bz+bw*bx))
-    else:
-        a = (2.0*(ax*az+aw*ay),2.0*(ay*az-aw*ax),1.0-2.0*(ax*ax+ay*ay))
-        b = (2.0*(bx*bz+bw*by),2.0*(by*bz-bw*bx),1.0-2.0*(bx*bx+by*by))
-    return (asin((sum(ai*bi for ai,bi in zip(a,b))))--(pi/2.0))/pi
-
-
-def direction_x(a: Sequence[float], b: Sequence[float]) -> float:
-    return direction(a, b, 'X')
-
-
-def direction_y(a: Sequence[float], b: Sequence[float]) -> float:
-    return direction(a, b, 'Y')
-
-
-def direction_z(a: Sequence[float], b: Sequence[float]) -> float:
-    return direction(a, b, 'Z')
-
+BBONE_PROPERTIES = ('bbone_curveinx',
+                    'bbone_curveinz',
+                    'bbone_curveoutx',
+                    'bbone_curveoutz',
+                    'bbone_easein',
+                    'bbone_easeout',
+                    'bbone_rollin',
+                    'bbone_rollout',
+                    'bbone_scaleinx',
+                    'bbone_scaleiny',
+                    'bbone_scaleinz',
+                    'bbone_scaleoutx',
+                    'bbone_scaleouty',
+                    'bbone_scaleoutz')
+
+
+IDENTITY = np.identity(4)
+
+
+def bones(group: 'PoseDrivenShapeKeyGroup') -> List[Tuple[int, 'PoseDrivenShapeKeyGroupBone']]:
+    # The group's enabled additional bones (with their indices) which exist in the
+    # armature and fit in the bone storage
+    object = group.object
+    if object is None or object.type != 'ARMATURE':
+        return []
+    names = object.data.bones
+    return [(index, bone) for index, bone in enumerate(group.bones)
+            if index < idprops.BONES and bone.is_enabled and bone.name in names]
+
+
+def bone_matrix(center: 'PoseDrivenShapeKeyActivationCenter', name: str) -> np.ndarray:
+    # The stored pose of an additional bone, the rest pose if none was stored
+    item = center.bones.get(name)
+    if item is None:
+        return IDENTITY
+    return np.array(item.transform_matrix, dtype=float).reshape(4, 4)
+
+
+def bone_matrices(centers: Sequence['PoseDrivenShapeKeyActivationCenter'], name: str) -> np.ndarray:
+    return np.array([bone_matrix(x, name) for x in centers], dtype=float).reshape(-1, 4, 4)
+
+
+def bone_channels(bone: 'PoseDrivenShapeKeyGroupBone', matrices: np.ndarray) -> List[core_distance.Channel]:
+    # The parameters and metrics of the bone's enabled channels
+    channels = []
+    euclidean = registry.metric("euclidean").kernel
+    flags = (bone.location_x, bone.location_y, bone.location_z)
+    if any(flags):
+        channels.append((core_distance.columns(transform.location(matrices), flags), euclidean))
+    if bone.rotation:
+        metric = registry.metric("quaternion")
+        channels.append((metric.params(transform.quaternion(matrices)), metric.kernel))
+    flags = (bone.scale_x, bone.scale_y, bone.scale_z)
+    if any(flags):
+        channels.append((core_distance.columns(transform.scale(matrices), flags), euclidean))
+    return channels
 
-def matrix_(params: np.ndarray,
-            metric: Callable[[Sequence[float], Sequence[float]], float]) -> np.ndarray:
-    matrix = np.array((len(params), len(params)), dtype=float)
-    for a, row in zip(params, matrix):
-        for i, b in enumerate(params):
-            row[i] = metric(a, b)
-    return matrix
 
+def metrics(group: 'PoseDrivenShapeKeyGroup') -> Tuple[Metric, ...]:
+    # The metrics of the group's enabled channels
+    result = []
+    euclidean = registry.metric("euclidean")
+    if group.location_x or group.location_y or group.location_z:
+        result.append(euclidean)
+    if group.rotation_mode == 'EULER':
+        if group.rotation_x or group.rotation_y or group.rotation_z:
+            result.append(euclidean)
+    elif group.rotation:
+        result.append(registry.rotation_metric(group.rotation_mode, group.rotation_axis))
+    if group.scale_x or group.scale_y or group.scale_z:
+        result.append(euclidean)
+    if any(getattr(group, key) for key in BBONE_PROPERTIES):
+        result.append(euclidean)
+    for _, bone in bones(group):
+        if bone.location_x or bone.location_y or bone.location_z:
+            result.append(euclidean)
+        if bone.rotation:
+            result.append(registry.metric("quaternion"))
+        if bone.scale_x or bone.scale_y or bone.scale_z:
+            result.append(euclidean)
+    return tuple(result)
+
+
+def scale(group: 'PoseDrivenShapeKeyGroup') -> Optional[float]:
+    # The smallest natural range of the group's metrics, None if all are unbounded
+    scales = [x.scale for x in metrics(group) if x.scale is not None]
+    return min(scales) if scales else None
+
+
+def poses(group: 'PoseDrivenShapeKeyGroup',
+          items: Optional[Sequence['PoseDrivenShapeKey']]=None) -> core_distance.Poses:
+    # Reads the group's pose table (see core.distance.poses_matrix), which is all
+    # that's needed to compute its distance matrix away from the main thread
+    if items is None:
+        items = list(group)
+    centers: List['PoseDrivenShapeKeyActivationCenter'] = [x.activation.center for x in items]
+    channels = []
+
+    # Read each center's transform once, the components are derived in bulk
+    matrices = np.array([x.transform_matrix for x in centers], dtype=float).reshape(-1, 4, 4)
+
+    euclidean = registry.metric("euclidean").kernel
 
-def matrix(group: PoseDrivenShapeKeyGroup) -> np.ndarray:
-    items: List[PoseDrivenShapeKey] = list(group)
-    stack = []
-    
     flags = (group.location_x,
              group.location_y,
              group.location_z)
 
     if any(flags):
-        params = np.array([x.location for x in items], dtype=float)
-        if not all(flags):
-            params = params.T
-            params = np.array([params[i] for i, x in enumerate(flags) if x], dtype=float).T
-        stack.append(matrix_(params, euclidean))
+        channels.append((core_distance.columns(transform.location(matrices), flags), euclidean))
 
     if group.rotation_mode == 'EULER':
         flags = (group.rotation_x,
@@ -76,69 +127,34 @@ def matrix(group: PoseDrivenShapeKeyGroup) -> np.ndarray:
                  group.rotation_z)
 
         if any(flags):
-            params = np.array([x.rotation_euler for x in items], dtype=float)
-            if not all(flags):
-                params = params.T
-                params = np.array([params[i] for i, x in enumerate(flags) if x], dtype=float).T
-            stack.append(matrix_(params, euclidean))
+            channels.append((core_distance.columns(transform.euler(matrices, rotation_order(group)), flags),
+                             euclidean))
 
     elif group.rotation:
-        mode = group.rotation_mode
-
-        if mode == 'TWIST':
-            axis = group.rotation_axis
-            params = np.array([x.rotation_quaternion.to_swing_twist(axis)[1] for x in items], dtype=float)
-            metric = angle
-        else:
-            params = np.array([x.rotation_quaternion for x in items], dtype=float)
-            if mode == 'SWING':
-                metric = partial(direction, axis=group.rotation_axis)
-            else:
-                metric = quaternion
-
-        stack.append(matrix_(params, metric))
+        metric = registry.rotation_metric(group.rotation_mode, group.rotation_axis)
+        channels.append((metric.params(transform.quaternion(matrices)), metric.kernel))
 
     flags = (group.scale_x,
              group.scale_y,
              group.scale_z)
 
     if any(flags):
-        params = np.array([x.scale for x in items], dtype=float)
-        if not all(flags):
-            params = params.T
-            params = np.array([params[i] for i, x in enumerate(flags) if x], dtype=float).T
-        stack.append(matrix_(params, euclidean))
-
-    params = []
-    for key in ('bbone_curveinx',
-                'bbone_curveinz',
-                'bbone_curveoutx',
-                'bbone_curveoutz',
-                'bbone_easein',
-                'bbone_easeout',
-                'bbone_rollin',
-                'bbone_rollout',
-                'bbone_scaleinx',
-                'bbone_scaleiny',
-                'bbone_scaleinz',
-                'bbone_scaleoutx',
-                'bbone_scaleouty',
-                'bbone_scaleoutz'):
-        if getattr(group, key):
-            params.append([getattr(x, key) for x in items])
+        channels.append((core_distance.columns(transform.scale(matrices), flags), euclidean))
 
+    params = [[getattr(x, key) for x in centers] for key in BBONE_PROPERTIES if getattr(group, key)]
     if params:
-        params = np.array(params, dtype=float)
-        for data in params:
-            norm = np.linalg.norm(data)
-            if norm != 0.0:
-                data /= norm
-        stack.append(matrix_(params.T, euclidean))
-
-    if len(stack) == 1:
-        matrix = stack[0]
-    else:
-        matrix = np.add.reduce(stack, axis=1)
-        matrix /= float(len(stack))
-
-    return matrix
\ No newline at end of file
+        channels.append((core_distance.normalized(np.array(params, dtype=float).T), euclidean))
+
+    # As for the value drivers, the mean distance of each bone is weighted
+    bone_params = [tuple(channels)]
+    weights = [group.bone_weight]
+    for _, bone in bones(group):
+        bone_params.append(tuple(bone_channels(bone, bone_matrices(centers, bone.name))))
+        weights.append(bone.weight)
+
+    return core_distance.Poses(len(centers), tuple(bone_params), tuple(weights))
+
+
+def matrix(group: 'PoseDrivenShapeKeyGroup',
+           items: Optional[Sequence['PoseDrivenShapeKey']]=None) -> np.ndarray:
+    return core_distance.poses_matrix(poses(group, items))
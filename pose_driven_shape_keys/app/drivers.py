@@ -1,31 +1,565 @@
 
-from typing import TYPE_CHECKING
-from ..lib.events import event_handler
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+import bpy
+import numpy as np
+from ..lib.dispatch import event_handler
+from ..lib.driver_utils import DriverVariableNameGenerator, driver_ensure, driver_variables_clear
+from ..api.activation_center import center_matrix
 from ..api.group import (GroupBoneTargetUpdateEvent,
                          GroupObjectUpdateEvent,
-                         GroupPropertyFlagUpdateEvent)
+                         GroupPropertyFlagUpdateEvent,
+                         GroupSettingsUpdateEvent)
+from ..api.group_bone import GroupBoneUpdateEvent
+from ..api.groups import PoseDrivenShapeKeyGroupDisposeEvent
+from ..api.shape_keys import (PoseDrivenShapeKeyCreatedEvent,
+                              PoseDrivenShapeKeyDisposeEvent,
+                              PoseDrivenShapeKeyBulkCreatedEvent,
+                              PoseDrivenShapeKeyBulkDisposeEvent,
+                              PoseDrivenShapeKeyBulkRemovedEvent)
+from ..core import minimize, registry, transform
+from .activation import rotation_order, target_assign__bboneprop, target_assign__bone, target_assign__transform
+from . import approximation, distance, engine, fcurves, fingerprint, idprops, kernels, radii, resolve, suspend
 if TYPE_CHECKING:
-    from bpy.types import Driver
+    from bpy.types import Driver, FCurve, Key
+    from ..api.group import PoseDrivenShapeKeyGroup
     from ..api.shape_key import PoseDrivenShapeKey
 
+CHANNELS = idprops.CHANNELS
 
+if bpy.app.version[0] >= 3:
+    BBONE_PROPERTIES = (
+        ("bbone_curveinx" , "bbone_curveinx"  ),
+        ("bbone_curveinz" , "bbone_curveinz"  ),
+        ("bbone_curveoutx", "bbone_curveoutx" ),
+        ("bbone_curveoutz", "bbone_curveoutz" ),
+        ("bbone_easein"   , "bbone_easein"    ),
+        ("bbone_easeout"  , "bbone_easeout"   ),
+        ("bbone_rollin"   , "bbone_rollin"    ),
+        ("bbone_rollout"  , "bbone_rollout"   ),
+        ("bbone_scaleinx" , "bbone_scalein[0]"),
+        ("bbone_scaleiny" , "bbone_scalein[1]"),
+        ("bbone_scaleinz" , "bbone_scalein[2]"),
+        ("bbone_scaleoutx", "bbone_scaleout[0]"),
+        ("bbone_scaleouty", "bbone_scaleout[1]"),
+        ("bbone_scaleoutz", "bbone_scaleout[2]"),
+        )
+else:
+    BBONE_PROPERTIES = (
+        ("bbone_curveinx" , "bbone_curveinx" ),
+        ("bbone_curveiny" , "bbone_curveiny" ),
+        ("bbone_curveoutx", "bbone_curveoutx"),
+        ("bbone_curveouty", "bbone_curveouty"),
+        ("bbone_easein"   , "bbone_easein"   ),
+        ("bbone_easeout"  , "bbone_easeout"  ),
+        ("bbone_rollin"   , "bbone_rollin"   ),
+        ("bbone_rollout"  , "bbone_rollout"  ),
+        ("bbone_scaleinx" , "bbone_scaleinx" ),
+        ("bbone_scaleiny" , "bbone_scaleiny" ),
+        ("bbone_scaleoutx", "bbone_scaleoutx"),
+        ("bbone_scaleouty", "bbone_scaleouty"),
+        )
 
 
-def driver_update(driver: 'Driver', driven: 'PoseDrivenShapeKey') -> None:
-    pass
+def legacy_path(driven: 'PoseDrivenShapeKey', channel: str) -> str:
+    # Per shape key distance property used before distances were packed per group
+    return f'["{idprops.PREFIX}_{channel}_{driven.identifier}"]'
+
+
+def fcurve_remove(key: 'Key', path: str, index: Optional[int]=0) -> None:
+    animdata = key.animation_data
+    if animdata:
+        fcurve = animdata.drivers.find(path, index=index)
+        if fcurve is not None:
+            animdata.drivers.remove(fcurve)
+
+
+def expression_euclidean(tokens: Sequence[Tuple[str, str]]) -> str:
+    return registry.metric("euclidean").expression([a for a, _ in tokens], [b for _, b in tokens])
+
+
+def expression_minimize(group: 'PoseDrivenShapeKeyGroup',
+                        expression: str,
+                        names: Sequence[str],
+                        assign: Optional[bool]=False) -> str:
+    # Repeated subexpressions are only shared by kernels, as assignments would keep
+    # inline expressions from Blender's simple expression evaluator
+    return minimize.minimize(expression, group.expression_precision or None, assign, names).expression
+
+
+def expression_set(driver: 'Driver',
+                   group: 'PoseDrivenShapeKeyGroup',
+                   names: Sequence[str],
+                   expression: str) -> None:
+    # Sets the distance expression inline, or compiles it into a kernel called from
+    # the driver namespace if the group uses kernels
+    if group.expression_mode == 'KERNEL' and names:
+        driver.expression = kernels.define(names, expression_minimize(group, expression, names, True))
+    else:
+        driver.expression = expression_minimize(group, expression, names)
+
+
+def driver_reset(driver: 'Driver') -> None:
+    driver.type = 'SCRIPTED'
+    driver_variables_clear(driver.variables)
+
+
+# The distance expressions of each channel, with the names of the driver variables
+# they read. These only depend on the group's settings and the shape key's center,
+# so kernels can be generated again from them when a file is loaded.
+
+def location_expression(driven: 'PoseDrivenShapeKey',
+                        group: 'PoseDrivenShapeKeyGroup') -> Tuple[List[str], str]:
+    tokens = [(axis.lower(), str(value)) for axis, flag, value in zip("XYZ",
+              (group.location_x, group.location_y, group.location_z),
+              driven.activation.center.location) if flag]
+    return [name for name, _ in tokens], expression_euclidean(tokens)
+
+
+def rotation_expression(driven: 'PoseDrivenShapeKey',
+                        group: 'PoseDrivenShapeKeyGroup') -> Tuple[List[str], str]:
+    center = driven.activation.center
+    if group.rotation_mode == 'EULER':
+        # The center's angles in the order the variables read (see activation.rotation_order)
+        angles = transform.euler(center_matrix(center), rotation_order(group))
+        tokens = [(axis.lower(), str(value)) for axis, flag, value in zip("XYZ",
+                  (group.rotation_x, group.rotation_y, group.rotation_z),
+                  angles.tolist()) if flag]
+        return [name for name, _ in tokens], expression_euclidean(tokens)
+    metric = rotation_metric(group)
+    values = metric.params(np.array(center.rotation_quaternion, dtype=float))
+    return list(metric.names), metric.expression(metric.names, values.tolist())
+
+
+def scale_expression(driven: 'PoseDrivenShapeKey',
+                     group: 'PoseDrivenShapeKeyGroup') -> Tuple[List[str], str]:
+    tokens = [(axis.lower(), str(value)) for axis, flag, value in zip("XYZ",
+              (group.scale_x, group.scale_y, group.scale_z),
+              driven.activation.center.scale) if flag]
+    return [name for name, _ in tokens], expression_euclidean(tokens)
+
+
+def bbone_expression(driven: 'PoseDrivenShapeKey',
+                     group: 'PoseDrivenShapeKeyGroup') -> Tuple[List[str], str]:
+    center = driven.activation.center
+    keygen = DriverVariableNameGenerator()
+    tokens = [(next(keygen), str(getattr(center, name))) for name, _ in BBONE_PROPERTIES if getattr(group, name)]
+    return [name for name, _ in tokens], expression_euclidean(tokens)
+
+
+def bone_expression(driven: 'PoseDrivenShapeKey',
+                    group: 'PoseDrivenShapeKeyGroup',
+                    index: int) -> Tuple[List[str], str]:
+    # The mean of the enabled channel distances of one of the group's additional
+    # bones, from the pose stored for it in the shape key's center
+    bone = group.bones[index]
+    matrix = distance.bone_matrix(driven.activation.center, bone.name)
+    names = []
+    parts = []
+
+    location = (bone.location_x, bone.location_y, bone.location_z)
+    scale = (bone.scale_x, bone.scale_y, bone.scale_z)
+
+    for prefix, flags, values in (("l", location, transform.location(matrix)),
+                                  ("s", scale, transform.scale(matrix))):
+        tokens = [(f'{prefix}{axis.lower()}', str(value))
+                  for axis, flag, value in zip("XYZ", flags, values.tolist()) if flag]
+        if tokens:
+            names.extend(name for name, _ in tokens)
+            parts.append(expression_euclidean(tokens))
+
+    if bone.rotation:
+        metric = registry.metric("quaternion")
+        rotation = [f'r{x}' for x in metric.names]
+        names.extend(rotation)
+        values = metric.params(transform.quaternion(matrix))
+        parts.append(metric.expression(rotation, values.tolist()))
+
+    if len(parts) > 1:
+        expression = f'({"+".join(parts)})/{float(len(parts))}'
+    else:
+        expression = parts[0] if parts else "0.0"
+    return names, expression
+
+
+def rotation_metric(group: 'PoseDrivenShapeKeyGroup') -> registry.Metric:
+    return approximation.metric(group) or registry.rotation_metric(group.rotation_mode, group.rotation_axis)
+
+
+def location_driver_update(driver: 'Driver',
+                           driven: 'PoseDrivenShapeKey',
+                           group: 'PoseDrivenShapeKeyGroup') -> None:
+    driver_reset(driver)
+    for axis, flag in zip("XYZ", (group.location_x, group.location_y, group.location_z)):
+        if flag:
+            variable = driver.variables.new()
+            variable.type = 'TRANSFORMS'
+            variable.name = axis.lower()
+            target_assign__transform(f'LOC_{axis}', variable.targets[0], group)
+    expression_set(driver, group, *location_expression(driven, group))
+
+
+def rotation_driver_update(driver: 'Driver',
+                           driven: 'PoseDrivenShapeKey',
+                           group: 'PoseDrivenShapeKeyGroup') -> None:
+    driver_reset(driver)
+    if group.rotation_mode == 'EULER':
+        for axis, flag in zip("XYZ", (group.rotation_x, group.rotation_y, group.rotation_z)):
+            if flag:
+                variable = driver.variables.new()
+                variable.type = 'TRANSFORMS'
+                variable.name = axis.lower()
+                target_assign__transform(f'ROT_{axis}', variable.targets[0], group)
+    else:
+        metric = rotation_metric(group)
+        for type, name in zip(metric.variables, metric.names):
+            variable = driver.variables.new()
+            variable.type = 'TRANSFORMS'
+            variable.name = name
+            target_assign__transform(type, variable.targets[0], group)
+    expression_set(driver, group, *rotation_expression(driven, group))
+
+
+def scale_driver_update(driver: 'Driver',
+                        driven: 'PoseDrivenShapeKey',
+                        group: 'PoseDrivenShapeKeyGroup') -> None:
+    driver_reset(driver)
+    for axis, flag in zip("XYZ", (group.scale_x, group.scale_y, group.scale_z)):
+        if flag:
+            variable = driver.variables.new()
+            variable.type = 'TRANSFORMS'
+            variable.name = axis.lower()
+            target_assign__transform(f'SCALE_{axis}', variable.targets[0], group)
+    expression_set(driver, group, *scale_expression(driven, group))
+
+
+def bbone_driver_update(driver: 'Driver',
+                        driven: 'PoseDrivenShapeKey',
+                        group: 'PoseDrivenShapeKeyGroup') -> None:
+    driver_reset(driver)
+    keygen = DriverVariableNameGenerator()
+    for name, path in BBONE_PROPERTIES:
+        if getattr(group, name):
+            variable = driver.variables.new()
+            variable.type = 'SINGLE_PROP'
+            variable.name = next(keygen)
+            target_assign__bboneprop(path, variable.targets[0], group)
+    expression_set(driver, group, *bbone_expression(driven, group))
+
+
+def bone_driver_update(driver: 'Driver',
+                       driven: 'PoseDrivenShapeKey',
+                       group: 'PoseDrivenShapeKeyGroup',
+                       index: int) -> None:
+    driver_reset(driver)
+    bone = group.bones[index]
+    location = (bone.location_x, bone.location_y, bone.location_z)
+    scale = (bone.scale_x, bone.scale_y, bone.scale_z)
+
+    for prefix, type, flags in (("l", 'LOC', location), ("s", 'SCALE', scale)):
+        for axis, flag in zip("XYZ", flags):
+            if flag:
+                variable = driver.variables.new()
+                variable.type = 'TRANSFORMS'
+                variable.name = f'{prefix}{axis.lower()}'
+                target_assign__bone(f'{type}_{axis}', variable.targets[0], group, bone.name)
+
+    if bone.rotation:
+        metric = registry.metric("quaternion")
+        for type, name in zip(metric.variables, metric.names):
+            variable = driver.variables.new()
+            variable.type = 'TRANSFORMS'
+            variable.name = f'r{name}'
+            target_assign__bone(type, variable.targets[0], group, bone.name)
+
+    expression_set(driver, group, *bone_expression(driven, group, index))
+
+
+def channels(group: 'PoseDrivenShapeKeyGroup') -> Tuple[str, ...]:
+    result = []
+    if group.location_x or group.location_y or group.location_z:
+        result.append("loc")
+    if group.rotation_mode == 'EULER':
+        if group.rotation_x or group.rotation_y or group.rotation_z:
+            result.append("rot")
+    elif group.rotation:
+        result.append("rot")
+    if group.scale_x or group.scale_y or group.scale_z:
+        result.append("sca")
+    if any(getattr(group, name) for name, _ in BBONE_PROPERTIES):
+        result.append("bbn")
+    return tuple(result)
+
+
+CHANNEL_DRIVER_UPDATE = {
+    "loc": location_driver_update,
+    "rot": rotation_driver_update,
+    "sca": scale_driver_update,
+    "bbn": bbone_driver_update,
+    }
+
+CHANNEL_EXPRESSION = {
+    "loc": location_expression,
+    "rot": rotation_expression,
+    "sca": scale_expression,
+    "bbn": bbone_expression,
+    }
+
+
+def kernels_define(group: 'PoseDrivenShapeKeyGroup') -> None:
+    # Compiles the kernels called by the drivers of a group using kernels, from the
+    # same expressions its drivers were generated with
+    if group.expression_mode != 'KERNEL':
+        return
+    enabled = channels(group)
+    bones = distance.bones(group)
+    for driven in group:
+        items = [CHANNEL_EXPRESSION[channel](driven, group) for channel in enabled]
+        items.extend(bone_expression(driven, group, index) for index, _ in bones)
+        for names, expression in items:
+            if names:
+                kernels.define(names, expression_minimize(group, expression, names, True))
+
+
+def value_expression(names: Sequence[str], weights: Sequence[Tuple[float, int]]) -> str:
+    # 1 - the weighted mean of the bones' distances, each the mean of its (count)
+    # consecutive channel distances
+    if sum(weight for weight, _ in weights) <= 0.0:
+        # As for the distance matrices, zero weights count equally
+        weights = [(1.0, count) for _, count in weights]
+    if len(weights) <= 1:
+        return f'1.0-({"+".join(names)})/{float(len(names))}'
+    terms = []
+    start = 0
+    for weight, count in weights:
+        items = "+".join(names[start:start+count])
+        terms.append(f'{weight}*({items})/{float(count)}' if count > 1 else f'{weight}*{items}')
+        start += count
+    total = sum(weight for weight, _ in weights)
+    return f'1.0-({"+".join(terms)})/{total}'
+
+
+def value_driver_update(fcurve: 'FCurve',
+                        driven: 'PoseDrivenShapeKey',
+                        paths: Sequence[str],
+                        proxy: Optional[registry.Metric]=None,
+                        weights: Optional[Sequence[Tuple[float, int]]]=None,
+                        precision: Optional[int]=None) -> float:
+    key = driven.id_data
+    driver = fcurve.driver
+    driver_reset(driver)
+
+    for index, path in enumerate(paths):
+        variable = driver.variables.new()
+        variable.type = 'SINGLE_PROP'
+        variable.name = f'd{index}'
+
+        target = variable.targets[0]
+        target.id_type = 'KEY'
+        target.id = key
+        target.data_path = path
+
+    if paths:
+        names = [f'd{index}' for index in range(len(paths))]
+        driver.expression = minimize.minimize(value_expression(names, weights or ()), precision).expression
+    else:
+        driver.expression = "0.0"
+
+    fcurve.mute = driven.mute
+    return fcurves.fcurve_update(fcurve, driven.activation, proxy)
+
+
+def driver_update(driven: 'PoseDrivenShapeKey',
+                  group: 'PoseDrivenShapeKeyGroup',
+                  enabled: Sequence[str]) -> None:
+    key = driven.id_data
+    muted = engine.active(group)
+    paths = []
+    for channel in CHANNELS:
+        path, index = idprops.ensure(group, driven, channel)
+        if channel in enabled:
+            fcurve = driver_ensure(key, path, index)
+            CHANNEL_DRIVER_UPDATE[channel](fcurve.driver, driven, group)
+            fcurve.mute = muted
+            paths.append(idprops.element_path(path, index))
+        else:
+            fcurve_remove(key, path, index)
+
+        path = legacy_path(driven, channel)
+        if path[2:-2] in key:
+            fcurve_remove(key, path)
+            idprop_remove(key, path[2:-2])
+
+    bones = distance.bones(group)
+    weights = [(group.bone_weight, len(paths))] if paths else []
+    enabled_bones = {index for index, _ in bones}
+    if bones or idprops.bone_storage_name(group) in key:
+        for index in range(idprops.BONES):
+            path, element = idprops.bone_ensure(group, driven, index)
+            if index in enabled_bones:
+                fcurve = driver_ensure(key, path, element)
+                bone_driver_update(fcurve.driver, driven, group, index)
+                fcurve.mute = muted
+                paths.append(idprops.element_path(path, element))
+                weights.append((group.bones[index].weight, 1))
+            else:
+                fcurve_remove(key, path, element)
+
+    fcurve = resolve.driven_value_driver(driven)
+    error = value_driver_update(fcurve, driven, paths, approximation.metric(group), weights,
+                                group.expression_precision or None)
+    approximation.error_update(group, error)
+    fcurve.mute = driven.mute or muted
+    engine.invalidate(group)
+
+
+def group_update(group: 'PoseDrivenShapeKeyGroup',
+                 items: Optional[Sequence['PoseDrivenShapeKey']]=None,
+                 force: Optional[bool]=False) -> None:
+    """Updates the radii and drivers of the group's members (all by default).
+    Unless forced, nothing is done for a group, nor for any member, whose drivers
+    were generated from the current settings (see fingerprint).
+    """
+    members = list(group)
+    if items is None:
+        items = members
+    if not items or not group.is_valid:
+        return
+    if not force and len(items) == len(members) and fingerprint.unchanged(group):
+        return
+    # Suspended groups are updated with their drivers restored, then suspended again
+    suspended = group.is_suspended
+    if suspended:
+        suspend.resume((group,))
+    radii.update(group, items)
+    config = fingerprint.group_config(group)
+    stale = list(items) if force else fingerprint.stale(items, config)
+    if len(stale) == len(members):
+        approximation.error_reset(group)
+    enabled = channels(group)
+    for driven in stale:
+        driver_update(driven, group, enabled)
+    fingerprint.store(group, stale, config)
+    if suspended:
+        suspend.suspend((group,))
+
+
+def idprop_remove(key: 'Key', name: str) -> None:
+    try:
+        del key[name]
+    except KeyError: pass
+
+
+def drivers_remove(key: 'Key', items: Iterable['PoseDrivenShapeKey']) -> None:
+    paths: Set[str] = set()
+    elements: Set[Tuple[str, int]] = set()
+    released: Dict[str, List[str]] = {}
+
+    for driven in items:
+        identifier = driven.identifier
+        paths.add(f'key_blocks["{driven.name}"].value')
+        released.setdefault(driven.get("group", ""), []).append(identifier)
+        for channel in CHANNELS:
+            path = legacy_path(driven, channel)
+            paths.add(path)
+            idprop_remove(key, path[2:-2])
+
+    groups = key.pose_driven.groups
+    for name, identifiers in released.items():
+        group = groups.get(name)
+        if group is not None:
+            for slot in idprops.release(group, identifiers).values():
+                elements.update(idprops.elements(group, slot))
+
+    animdata = key.animation_data
+    if animdata:
+        drivers = animdata.drivers
+        for fcurve in [fcurve for fcurve in drivers
+                       if fcurve.data_path in paths
+                       or (fcurve.data_path, fcurve.array_index) in elements]:
+            drivers.remove(fcurve)
+
+    for name in released:
+        group = groups.get(name)
+        if group is not None:
+            idprops.compact(group)
+
+
+def items_by_group(items: Iterable['PoseDrivenShapeKey']) -> Dict[Tuple['Key', str], List['PoseDrivenShapeKey']]:
+    result: Dict[Tuple['Key', str], List['PoseDrivenShapeKey']] = {}
+    for item in items:
+        result.setdefault((item.id_data, item.get("group", "")), []).append(item)
+    return result
+
+
+@event_handler(PoseDrivenShapeKeyCreatedEvent)
+def on_shape_key_created(event: PoseDrivenShapeKeyCreatedEvent) -> None:
+    group = event.shapekey.group
+    if group is not None:
+        group_update(group)
+
+
+@event_handler(PoseDrivenShapeKeyBulkCreatedEvent)
+def on_shape_keys_created(event: PoseDrivenShapeKeyBulkCreatedEvent) -> None:
+    for key, name in items_by_group(event.items):
+        group = key.pose_driven.groups.get(name)
+        if group is not None:
+            group_update(group)
+
+
+@event_handler(PoseDrivenShapeKeyDisposeEvent)
+def on_shape_key_dispose(event: PoseDrivenShapeKeyDisposeEvent) -> None:
+    drivers_remove(event.shapekey.id_data, (event.shapekey,))
+
+
+@event_handler(PoseDrivenShapeKeyBulkDisposeEvent)
+def on_shape_keys_dispose(event: PoseDrivenShapeKeyBulkDisposeEvent) -> None:
+    for (key, _), items in items_by_group(event.items).items():
+        drivers_remove(key, items)
+
+
+@event_handler(PoseDrivenShapeKeyBulkRemovedEvent)
+def on_shape_keys_removed(event: PoseDrivenShapeKeyBulkRemovedEvent) -> None:
+    groups = event.shapekeys.groups
+    for name in event.groups:
+        group = groups.get(name)
+        if group is not None:
+            group_update(group)
+
+
+@event_handler(PoseDrivenShapeKeyGroupDisposeEvent)
+def on_group_dispose(event: PoseDrivenShapeKeyGroupDisposeEvent) -> None:
+    group = event.group
+    key = group.id_data
+    paths = {f'["{name}"]' for name, _ in idprops.arrays(group)}
+    animdata = key.animation_data
+    if animdata:
+        drivers = animdata.drivers
+        for fcurve in [fcurve for fcurve in drivers if fcurve.data_path in paths]:
+            drivers.remove(fcurve)
+    for name, _ in idprops.arrays(group):
+        idprop_remove(key, name)
 
 
 @event_handler(GroupBoneTargetUpdateEvent)
 def on_group_bone_target_update(event: GroupBoneTargetUpdateEvent) -> None:
-    pass
+    group_update(event.group)
 
 
 @event_handler(GroupObjectUpdateEvent)
 def on_group_object_update(event: GroupObjectUpdateEvent) -> None:
-    pass
+    group_update(event.group)
 
 
 @event_handler(GroupPropertyFlagUpdateEvent)
 def on_group_property_flag_update(event: GroupPropertyFlagUpdateEvent) -> None:
-    pass
+    group_update(event.group)
+
+
+@event_handler(GroupSettingsUpdateEvent)
+def on_group_settings_update(event: GroupSettingsUpdateEvent) -> None:
+    group_update(event.group, force=True)
+
 
+@event_handler(GroupBoneUpdateEvent)
+def on_group_bone_update(event: GroupBoneUpdateEvent) -> None:
+    group_update(event.group, force=True)
@@ -0,0 +1,468 @@
+
+from dataclasses import dataclass
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+from ..lib.transform_utils import transform_matrix
+from ..core import falloff, registry, transform
+from . import approximation, cache, distance, drivers, fcurves, idprops, resolve, sampler
+from .activation import rotation_order
+if TYPE_CHECKING:
+    from bpy.types import Depsgraph, FCurve, Key, Object, Scene
+    from ..api.group import PoseDrivenShapeKeyGroup
+    from ..api.shape_key import PoseDrivenShapeKey
+
+# Groups using the NUMPY engine are evaluated by a handler instead of by their
+# drivers. Each bone is read once per group, the activations of every member are
+# computed in a few vectorized calls and written to the Key with foreach_set.
+#
+# The drivers are kept but muted while the engine runs, and unmuted whenever
+# Blender runs in the background or a file is saved, so render farms (or a copy
+# of Blender without the add-on) evaluate the same result from the drivers alone.
+#
+# A solver caches everything about a group which doesn't depend on the pose. It is
+# discarded whenever the group's drivers are rebuilt.
+
+
+@dataclass
+class Channel:
+    name: str
+    metric: registry.Metric
+    # The enabled components of the channel, None for all
+    columns: Optional[Tuple[int, ...]]
+    # (n, k) center parameters
+    centers: np.ndarray
+    # Index of the bone read by the channel in Solver.bones
+    bone: int = 0
+
+
+@dataclass
+class Solver:
+    object: str
+    # The target bone followed by the group's enabled additional bones
+    bones: Tuple[str, ...]
+    # The weight of each bone's mean channel distance
+    weights: Tuple[float, ...]
+    rotation_mode: str
+    # The euler order the target bone's rotation is read in (see activation.rotation_order)
+    rotation_order: str
+    channels: List[Channel]
+    # Key block indices of the solved members
+    indices: np.ndarray
+    # Activation curves (see core.falloff.pad) and their lookup table
+    keyframes: np.ndarray
+    interpolation: np.ndarray
+    table: falloff.Table
+    blocks: int
+
+
+SOLVERS: Dict[Tuple[str, str], Solver] = {}
+
+# Cache digests per Key name, computed again after edits
+DIGESTS: Dict[str, str] = {}
+
+
+def driver_only() -> bool:
+    return bpy.app.background
+
+
+def active(group: 'PoseDrivenShapeKeyGroup') -> bool:
+    return group.engine == 'NUMPY' and not driver_only()
+
+
+def invalidate(group: Optional['PoseDrivenShapeKeyGroup']=None) -> None:
+    if group is None:
+        SOLVERS.clear()
+        DIGESTS.clear()
+    else:
+        SOLVERS.pop((group.id_data.name, group.name), None)
+        DIGESTS.pop(group.id_data.name, None)
+
+
+def columns(flags: Tuple[bool, ...]) -> Optional[Tuple[int, ...]]:
+    return None if all(flags) else tuple(i for i, x in enumerate(flags) if x)
+
+
+def solver_build(group: 'PoseDrivenShapeKeyGroup') -> Optional[Solver]:
+    if not group.is_valid:
+        return None
+
+    key: 'Key' = group.id_data
+    blocks = key.key_blocks
+    items: List['PoseDrivenShapeKey'] = [x for x in group if not x.mute and x.name in blocks]
+    if not items:
+        return None
+
+    centers = [x.activation.center for x in items]
+    matrices = np.array([x.transform_matrix for x in centers], dtype=float).reshape(-1, 4, 4)
+    euclidean = registry.metric("euclidean")
+    order = rotation_order(group)
+    channels = []
+
+    flags = (group.location_x, group.location_y, group.location_z)
+    if any(flags):
+        channels.append(Channel("loc", euclidean, columns(flags), transform.location(matrices)))
+
+    if group.rotation_mode == 'EULER':
+        flags = (group.rotation_x, group.rotation_y, group.rotation_z)
+        if any(flags):
+            channels.append(Channel("rot", euclidean, columns(flags), transform.euler(matrices, order)))
+    elif group.rotation:
+        metric = approximation.metric(group) or registry.rotation_metric(group.rotation_mode, group.rotation_axis)
+        channels.append(Channel("rot", metric, None, metric.params(transform.quaternion(matrices))))
+
+    flags = (group.scale_x, group.scale_y, group.scale_z)
+    if any(flags):
+        channels.append(Channel("sca", euclidean, columns(flags), transform.scale(matrices)))
+
+    flags = tuple(getattr(group, name) for name, _ in drivers.BBONE_PROPERTIES)
+    if any(flags):
+        values = np.array([[getattr(x, name) for name, _ in drivers.BBONE_PROPERTIES] for x in centers])
+        channels.append(Channel("bbn", euclidean, columns(flags), values))
+
+    bones = [group.bone_target]
+    weights = [group.bone_weight]
+    for _, bone in distance.bones(group):
+        matrices = distance.bone_matrices(centers, bone.name)
+        number = len(bones)
+        flags = (bone.location_x, bone.location_y, bone.location_z)
+        if any(flags):
+            channels.append(Channel("loc", euclidean, columns(flags), transform.location(matrices), number))
+        if bone.rotation:
+            metric = registry.metric("quaternion")
+            channels.append(Channel("rot", metric, None, metric.params(transform.quaternion(matrices)), number))
+        flags = (bone.scale_x, bone.scale_y, bone.scale_z)
+        if any(flags):
+            channels.append(Channel("sca", euclidean, columns(flags), transform.scale(matrices), number))
+        bones.append(bone.name)
+        weights.append(bone.weight)
+
+    curves, modes = zip(*(fcurves.curve_read(resolve.driven_value_driver(x)) for x in items))
+    keyframes = falloff.pad(curves)
+    interpolation = np.full(keyframes.shape[:2], falloff.BEZIER)
+    for row, data in zip(interpolation, modes):
+        if data:
+            row[:len(data)] = data
+            row[len(data):] = data[-1]
+
+    return Solver(group.object.name,
+                  tuple(bones),
+                  tuple(weights),
+                  group.rotation_mode,
+                  order,
+                  channels,
+                  np.array([blocks.find(x.name) for x in items], dtype=int),
+                  keyframes,
+                  interpolation,
+                  falloff.stack([sampler.table(x.activation) for x in items]),
+                  len(blocks))
+
+
+def solver(group: 'PoseDrivenShapeKeyGroup') -> Optional[Solver]:
+    ident = (group.id_data.name, group.name)
+    result = SOLVERS.get(ident)
+    if result is None or result.blocks != len(group.id_data.key_blocks):
+        result = solver_build(group)
+        if result is not None:
+            SOLVERS[ident] = result
+    return result
+
+
+def params(solver: Solver, matrices: np.ndarray, values: np.ndarray) -> Dict[Tuple[int, str], np.ndarray]:
+    # The (frames, k) parameters of each (bone, channel) for (frames, bones, 4, 4)
+    # local matrices and the target bone's (frames, len(BBONE_PROPERTIES)) bendy-bone
+    # values
+    result = {}
+    for channel in solver.channels:
+        data = matrices[:, channel.bone]
+        if channel.name == "loc":
+            value = transform.location(data)
+        elif channel.name == "sca":
+            value = transform.scale(data)
+        elif channel.name == "bbn":
+            value = np.asarray(values, dtype=float)
+        elif solver.rotation_mode == 'EULER' and channel.bone == 0:
+            value = transform.euler(data, solver.rotation_order)
+        else:
+            value = channel.metric.params(transform.quaternion(data))
+        result[(channel.bone, channel.name)] = value
+    return result
+
+
+def pose_params(solver: Solver, object: 'Object') -> Dict[Tuple[int, str], np.ndarray]:
+    pose = object.pose.bones
+    matrices = np.array([transform_matrix(pose[name], 'LOCAL_SPACE') for name in solver.bones], dtype=float)
+    if any(x.name == "bbn" for x in solver.channels):
+        bone = pose[solver.bones[0]]
+        values = np.array([bone.path_resolve(path) for _, path in drivers.BBONE_PROPERTIES], dtype=float)
+    else:
+        values = np.zeros(len(drivers.BBONE_PROPERTIES), dtype=float)
+    return params(solver, matrices[np.newaxis], values[np.newaxis])
+
+
+def evaluate(solver: Solver, params: Dict[Tuple[int, str], np.ndarray]) -> np.ndarray:
+    # The (frames, members) activations for the given parameters. As for the
+    # drivers, the channel distances of each bone are averaged, the bones' means
+    # weighted and the result mapped through each member's activation curve (by
+    # its lookup table).
+    frames = len(next(iter(params.values()))) if params else 1
+    count = len(solver.indices)
+    bones = len(solver.bones)
+    totals = np.zeros((bones, frames, count), dtype=float)
+    counts = np.zeros(bones, dtype=float)
+    for channel in solver.channels:
+        centers = channel.centers
+        pose = params[(channel.bone, channel.name)]
+        if channel.columns is not None:
+            centers = centers[:, list(channel.columns)]
+            pose = pose[:, list(channel.columns)]
+        totals[channel.bone] += channel.metric.kernel(centers[np.newaxis], pose[:, np.newaxis])
+        counts[channel.bone] += 1.0
+
+    if bones == 1:
+        x = 1.0 - totals[0] / max(counts[0], 1.0)
+    else:
+        used = counts > 0.0
+        weights = np.where(used, solver.weights, 0.0)
+        if weights.sum() <= 0.0:
+            weights = used.astype(float)
+        means = totals / np.maximum(counts, 1.0)[:, np.newaxis, np.newaxis]
+        x = 1.0 - np.tensordot(weights, means, axes=1) / max(weights.sum(), 1.0)
+
+    return falloff.lookup(solver.table, x)
+
+
+def solve(solver: Solver, object: 'Object') -> np.ndarray:
+    # The activations of the solver's members for the object's current pose
+    return evaluate(solver, pose_params(solver, object))[0]
+
+
+def fcurve_digest(hash: 'hashlib._Hash', fcurve: 'FCurve') -> None:
+    points = fcurve.keyframe_points
+    hash.update(f'{fcurve.data_path}[{fcurve.array_index}]{fcurve.extrapolation}{fcurve.mute}'.encode())
+    hash.update(",".join(x.interpolation for x in points).encode())
+    for name in ("co", "handle_left", "handle_right"):
+        buffer = np.empty(len(points) * 2, dtype=np.float32)
+        points.foreach_get(name, buffer)
+        hash.update(buffer.tobytes())
+
+
+def animation_digest(hash: 'hashlib._Hash', object: Optional['Object']) -> None:
+    # Everything of the object's own which poses its bones: the active action and
+    # NLA strips (any bone may constrain the group's bones), its drivers and the
+    # bone constraints
+    if object is None:
+        return
+    animdata = object.animation_data
+    if animdata is not None:
+        actions = [animdata.action] if animdata.action is not None else []
+        for track in animdata.nla_tracks:
+            hash.update(f'{track.name}:{track.mute}:{track.is_solo}'.encode())
+            for strip in track.strips:
+                hash.update(f'{strip.name}:{strip.mute}:{strip.frame_start}:{strip.frame_end}:'
+                            f'{strip.blend_type}:{strip.influence}:{strip.scale}:{strip.repeat}'.encode())
+                if strip.action is not None:
+                    actions.append(strip.action)
+        for action in actions:
+            hash.update(action.name.encode())
+            for fcurve in action.fcurves:
+                fcurve_digest(hash, fcurve)
+        for fcurve in animdata.drivers:
+            hash.update(fcurve.driver.expression.encode())
+            fcurve_digest(hash, fcurve)
+    if object.pose is not None:
+        for bone in object.pose.bones:
+            for constraint in bone.constraints:
+                target = getattr(constraint, "target", None)
+                hash.update(f'{bone.name}:{constraint.name}:{constraint.type}:{constraint.mute}:'
+                            f'{constraint.influence}:{target.name if target is not None else ""}:'
+                            f'{getattr(constraint, "subtarget", "")}'.encode())
+
+
+def key_digest(key: 'Key', scene: 'Scene', solvers: Sequence[Solver]) -> str:
+    """A digest of everything a Key's cached activations depend on: the solvers of
+    its engine groups, the animation of their armatures, the frame range and the
+    number of key blocks.
+    """
+    hash = hashlib.sha1()
+    hash.update(f'{scene.frame_start}:{scene.frame_end}:{len(key.key_blocks)}'.encode())
+    for data in solvers:
+        hash.update(f'{data.object}:{data.bones}:{data.weights}:{data.rotation_mode}:{data.rotation_order}'.encode())
+        for channel in data.channels:
+            hash.update(f'{channel.bone}:{channel.name}:{channel.metric.name}:{channel.columns}'.encode())
+            hash.update(np.ascontiguousarray(channel.centers, dtype=float).tobytes())
+        for array in (data.indices, data.keyframes, data.interpolation):
+            hash.update(np.ascontiguousarray(array).tobytes())
+        animation_digest(hash, bpy.data.objects.get(data.object))
+    return hash.hexdigest()
+
+
+def key_cache(key: 'Key', scene: 'Scene', solvers: Sequence[Solver]) -> Optional[cache.Cache]:
+    name = key.name
+    digest = DIGESTS.get(name)
+    if digest is None:
+        digest = DIGESTS[name] = key_digest(key, scene, solvers)
+    frames = scene.frame_end - scene.frame_start + 1
+    return cache.cache_open(name, digest, scene.frame_start, (frames, len(key.key_blocks)))
+
+
+def key_solve(key: 'Key',
+              depsgraph: Optional['Depsgraph']=None,
+              scene: Optional['Scene']=None) -> None:
+    # When given the scene (on frame changes) cached values are used for, and
+    # computed values stored in, the scene's current frame
+    groups = [x for x in key.pose_driven.groups if x.engine == 'NUMPY' and not x.is_suspended]
+    if not groups:
+        return
+
+    solvers = [x for x in map(solver, groups) if x is not None]
+    if not solvers:
+        return
+
+    blocks = key.key_blocks
+    values = np.empty(len(blocks), dtype=np.float32)
+    blocks.foreach_get("value", values)
+    result = values.copy()
+
+    store = None
+    if scene is not None:
+        store = key_cache(key, scene, solvers)
+        frame = scene.frame_current + scene.frame_subframe
+
+    for data in solvers:
+        cached = store.lookup(frame, data.indices) if store is not None else None
+        if cached is not None:
+            result[data.indices] = cached
+            continue
+        object = bpy.data.objects.get(data.object)
+        if object is None or any(x not in object.pose.bones for x in data.bones):
+            continue
+        if depsgraph is not None:
+            object = object.evaluated_get(depsgraph)
+        result[data.indices] = solve(data, object)
+        if store is not None:
+            store.store(frame, data.indices, result[data.indices])
+
+    # Writing tags the Key for update, so only write when something changed or the
+    # handler would keep triggering itself
+    if not np.array_equal(result, values):
+        blocks.foreach_set("value", result)
+        key.update_tag()
+
+
+def pending(key: 'Key') -> bool:
+    # Whether any of the Key's engine groups has no solver (i.e. was just edited)
+    return key.is_property_set("pose_driven") and any(
+        (key.name, x.name) not in SOLVERS
+        for x in key.pose_driven.groups if x.engine == 'NUMPY' and not x.is_suspended)
+
+
+def solve_all(depsgraph: Optional['Depsgraph']=None,
+              scene: Optional['Scene']=None,
+              keys: Optional[Sequence['Key']]=None) -> None:
+    if driver_only():
+        return
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        if key.is_property_set("pose_driven"):
+            key_solve(key, depsgraph, scene)
+
+
+def fcurves_mute(group: 'PoseDrivenShapeKeyGroup', state: bool) -> None:
+    # Mutes (or restores) the distance and value drivers of the group's members
+    animdata = group.id_data.animation_data
+    if animdata is None:
+        return
+    fcurves = animdata.drivers
+    slots = idprops.registry(group)
+    for driven in group:
+        slot = slots.get(driven.identifier)
+        if slot is not None:
+            for path, index in idprops.elements(group, slot):
+                fcurve = fcurves.find(path, index=index)
+                if fcurve is not None:
+                    fcurve.mute = state
+        fcurve = fcurves.find(f'key_blocks["{driven.name}"].value')
+        if fcurve is not None:
+            fcurve.mute = state or driven.mute
+
+
+def mute_all(state: Optional[bool]=None) -> None:
+    # Mutes the drivers of every group using the engine (state None), or sets them all to state
+    for key in bpy.data.shape_keys:
+        if key.is_property_set("pose_driven"):
+            for group in key.pose_driven.groups:
+                if group.engine == 'NUMPY' and not group.is_suspended:
+                    fcurves_mute(group, active(group) if state is None else state)
+
+
+@persistent
+def on_frame_change_post(scene: 'Scene', depsgraph: Optional['Depsgraph']=None) -> None:
+    solve_all(depsgraph, scene)
+
+
+@persistent
+def on_depsgraph_update_post(_: 'Scene', depsgraph: Optional['Depsgraph']=None) -> None:
+    # Only solve again when a pose (or action) changed, or for edited groups. Other
+    # updates include the ones caused by writing the values.
+    keys = None
+    if depsgraph is not None:
+        posed = False
+        for update in depsgraph.updates:
+            id = update.id
+            if isinstance(id, bpy.types.Action):
+                # Edited actions change what the caches hold
+                DIGESTS.clear()
+                posed = True
+            elif isinstance(id, bpy.types.Object) and id.type == 'ARMATURE':
+                posed = True
+        if not posed:
+            keys = [x for x in bpy.data.shape_keys if pending(x)]
+    solve_all(depsgraph, keys=keys)
+
+
+@persistent
+def on_load_post(_=None) -> None:
+    invalidate()
+    mute_all()
+
+
+@persistent
+def on_undo_post(_=None) -> None:
+    invalidate()
+
+
+@persistent
+def on_save_pre(_=None) -> None:
+    mute_all(False)
+
+
+@persistent
+def on_save_post(_=None) -> None:
+    mute_all()
+
+
+HANDLERS = (
+    ("frame_change_post", on_frame_change_post),
+    ("depsgraph_update_post", on_depsgraph_update_post),
+    ("load_post", on_load_post),
+    ("undo_post", on_undo_post),
+    ("redo_post", on_undo_post),
+    ("save_pre", on_save_pre),
+    ("save_post", on_save_post),
+    )
+
+
+def register() -> None:
+    for name, handler in HANDLERS:
+        getattr(bpy.app.handlers, name).append(handler)
+
+
+def unregister() -> None:
+    for name, handler in HANDLERS:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    mute_all(False)
+    invalidate()
@@ -1,16 +1,51 @@
 
-from typing import TYPE_CHECKING, Union
-from ..lib.events import event_handler
+from typing import List, Optional, Tuple, TYPE_CHECKING, Union
+import numpy as np
+from ..lib.dispatch import event_handler
 from ..lib.curve_mapping import to_bezier, keyframe_points_assign
-from ..api.activation import ActivationRadiusUpdateEvent, ActivationTargetUpdateEvent
+from ..api.activation import ActivationRadiusUpdateEvent, ActivationTargetUpdateEvent, ActivationUpdateEvent
 from ..api.shape_key import ShapeKeyMuteUpdateEvent
-from . import resolve
+from ..core import falloff
+from ..core.registry import Metric
+from . import approximation, engine, resolve, sampler
 if TYPE_CHECKING:
     from bpy.types import FCurve
     from ..api.activation import PoseDrivenShapeKeyActivation
 
 
-def fcurve_update(fcurve: 'FCurve', activation: PoseDrivenShapeKeyActivation) -> None:
+def curve_read(fcurve: 'FCurve') -> Tuple[np.ndarray, List[int]]:
+    points = fcurve.keyframe_points
+    count = len(points)
+    data = np.empty((3, count * 2), dtype=np.float32)
+    points.foreach_get("co", data[0])
+    points.foreach_get("handle_left", data[1])
+    points.foreach_get("handle_right", data[2])
+    keyframes = np.concatenate([x.reshape(count, 2) for x in data], axis=1).astype(float)
+    modes = [falloff.INTERPOLATION_CODES.get(x.interpolation, falloff.BEZIER) for x in points]
+    return keyframes, modes
+
+
+def curve_write(fcurve: 'FCurve', keyframes: np.ndarray) -> None:
+    # Replaces the keyframes with linearly interpolated (k, 6) keyframes
+    points = fcurve.keyframe_points
+    points.clear()
+    points.add(len(keyframes))
+    for offset, name in enumerate(("co", "handle_left", "handle_right")):
+        points.foreach_set(name, keyframes[:, offset*2:offset*2+2].astype(np.float32).ravel())
+    for point in points:
+        point.interpolation = 'LINEAR'
+        point.handle_left_type = 'FREE'
+        point.handle_right_type = 'FREE'
+    fcurve.update()
+
+
+def fcurve_update(fcurve: 'FCurve',
+                  activation: 'PoseDrivenShapeKeyActivation',
+                  proxy: Optional[Metric]=None) -> float:
+    """Sets the activation curve of a value driver. With a proxy metric the remap
+    to the exact metric is folded into the keyframes and the largest error of the
+    folded curve is returned.
+    """
     radius = activation.radius
     target = activation.target
     rangex = (1.0-radius, 1.0)
@@ -18,12 +53,29 @@ def fcurve_update(fcurve: 'FCurve', activation: PoseDrivenShapeKeyActivation) ->
     points = activation.points
     points = to_bezier(points, x_range=rangex, y_range=rangey, extrapolate=False)
     keyframe_points_assign(fcurve.keyframe_points, points)
+    sampler.invalidate(activation)
+    if proxy is None or proxy.remap is None:
+        return 0.0
+    keyframes, modes = curve_read(fcurve)
+    keyframes, error = falloff.fold(keyframes,
+                                    lambda x: approximation.inputs(proxy, x),
+                                    approximation.samples(proxy, radius),
+                                    modes)
+    curve_write(fcurve, keyframes)
+    return error
 
 
-def on_activation_fcurve_update(event: Union[ActivationRadiusUpdateEvent, ActivationTargetUpdateEvent]) -> None:
+def on_activation_fcurve_update(event: Union[ActivationRadiusUpdateEvent,
+                                             ActivationTargetUpdateEvent,
+                                             ActivationUpdateEvent]) -> None:
     activation = event.activation
-    fcurve = resolve.driven_value_driver(resolve.activation_shape(activation))
-    fcurve_update(fcurve, activation)
+    driven = resolve.activation_shape(activation)
+    group = driven.group
+    proxy = approximation.metric(group) if group is not None else None
+    error = fcurve_update(resolve.driven_value_driver(driven), activation, proxy)
+    if group is not None:
+        approximation.error_update(group, error)
+        engine.invalidate(group)
 
 
 @event_handler(ActivationRadiusUpdateEvent)
@@ -36,7 +88,17 @@ def on_activation_target_update(event: ActivationTargetUpdateEvent) -> None:
     on_activation_fcurve_update(event)
 
 
+@event_handler(ActivationUpdateEvent)
+def on_activation_update(event: ActivationUpdateEvent) -> None:
+    # The falloff curve was edited
+    on_activation_fcurve_update(event)
+
+
 @event_handler(ShapeKeyMuteUpdateEvent)
 def on_shape_key_mute_update(event: ShapeKeyMuteUpdateEvent) -> None:
-    fcurve = resolve.driven_value_driver(event.shapekey)
-    fcurve.mute = event.value
+    driven = event.shapekey
+    group = driven.group
+    fcurve = resolve.driven_value_driver(driven)
+    fcurve.mute = event.value or (group is not None and engine.active(group))
+    if group is not None:
+        engine.invalidate(group)
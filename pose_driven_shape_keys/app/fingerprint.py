@@ -0,0 +1,102 @@
+
+from typing import List, Optional, Sequence, TYPE_CHECKING
+from ..core.fingerprint import fingerprint
+from . import approximation, distance
+from .activation import rotation_order
+if TYPE_CHECKING:
+    from ..api.group import PoseDrivenShapeKeyGroup
+    from ..api.shape_key import PoseDrivenShapeKey
+
+# A content hash of everything a group's or shape key's drivers are generated from
+# is stored with the drivers ("fingerprint" on the group and each shape key). Rebuilds
+# skip the driver, distance matrix and keyframe work whenever the hashes match. The
+# hashes are exposed read-only (fingerprint properties) so external tools can cache
+# on them too. VERSION is part of every hash and changes whenever the generated
+# drivers do.
+
+VERSION = 3
+
+NAME = "fingerprint"
+
+GROUP_PROPERTIES = ("approximation",
+                    "bone_target",
+                    "bone_weight",
+                    "engine",
+                    "expression_mode",
+                    "expression_precision",
+                    "location_x",
+                    "location_y",
+                    "location_z",
+                    "rotation",
+                    "rotation_axis",
+                    "rotation_mode",
+                    "rotation_order",
+                    "rotation_x",
+                    "rotation_y",
+                    "rotation_z",
+                    "scale_x",
+                    "scale_y",
+                    "scale_z") + distance.BBONE_PROPERTIES
+
+BONE_PROPERTIES = ("location_x",
+                   "location_y",
+                   "location_z",
+                   "rotation",
+                   "scale_x",
+                   "scale_y",
+                   "scale_z",
+                   "weight")
+
+
+def group_config(group: 'PoseDrivenShapeKeyGroup') -> str:
+    # The hash of the group's own settings, which every member's drivers depend on
+    object = group.object
+    proxy = approximation.metric(group)
+    return fingerprint(VERSION,
+                       object.name if object is not None else "",
+                       [getattr(group, name) for name in GROUP_PROPERTIES],
+                       rotation_order(group),
+                       [[bone.name] + [getattr(bone, name) for name in BONE_PROPERTIES] for bone in group.bones],
+                       proxy.name if proxy is not None else "")
+
+
+def shape_key_fingerprint(driven: 'PoseDrivenShapeKey', config: str) -> str:
+    activation = driven.activation
+    center = activation.center
+    return fingerprint(config,
+                       driven.name,
+                       driven.identifier,
+                       driven.mute,
+                       center.transform_matrix,
+                       [getattr(center, name) for name in distance.BBONE_PROPERTIES],
+                       [(bone.name, bone.transform_matrix) for bone in center.bones],
+                       activation.radius,
+                       activation.target,
+                       [(tuple(point.location), point.get("handle_type", 0)) for point in activation.points])
+
+
+def group_fingerprint(group: 'PoseDrivenShapeKeyGroup', config: Optional[str]=None) -> str:
+    if config is None:
+        config = group_config(group)
+    return fingerprint(config, [shape_key_fingerprint(driven, config) for driven in group])
+
+
+def unchanged(group: 'PoseDrivenShapeKeyGroup') -> bool:
+    # Whether the group's drivers were generated from its current settings
+    value = group.get(NAME)
+    return value is not None and value == group_fingerprint(group)
+
+
+def stale(items: Sequence['PoseDrivenShapeKey'], config: str) -> List['PoseDrivenShapeKey']:
+    # The items whose drivers weren't generated from their current settings
+    return [driven for driven in items if driven.get(NAME) != shape_key_fingerprint(driven, config)]
+
+
+def store(group: 'PoseDrivenShapeKeyGroup',
+          items: Sequence['PoseDrivenShapeKey'],
+          config: Optional[str]=None) -> None:
+    if config is None:
+        config = group_config(group)
+    for driven in items:
+        driven[NAME] = shape_key_fingerprint(driven, config)
+    group[NAME] = group_fingerprint(group, config)
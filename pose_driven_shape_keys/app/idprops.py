@@ -1,30 +1,170 @@
 
-from typing import TYPE_CHECKING
+from itertools import count
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
-    from bpy.types import ID
-    from ..lib.mixins import Identifiable
+    from bpy.types import Key
+    from ..api.group import PoseDrivenShapeKeyGroup
     from ..api.shape_key import PoseDrivenShapeKey
 
+# Distances are stored in one packed float array per group (pds_<group identifier>)
+# rather than a property per shape key and channel. Each shape key is assigned a
+# stable slot of STRIDE values in the array, one per channel. The slot registry is
+# kept on the group as an identifier -> slot mapping. Removing shape keys frees
+# their slots and the array is compacted so it never holds unused slots.
+#
+# The distances of a group's additional bones are kept in a second array
+# (pdb_<group identifier>) using the same slots, with room for BONES bones per slot.
+
 PREFIX = "pds"
 
+CHANNELS = ("loc", "rot", "sca", "bbn")
+
+STRIDE = len(CHANNELS)
+
+BONE_PREFIX = "pdb"
+
+BONES = 4
+
+
+def storage_name(group: 'PoseDrivenShapeKeyGroup') -> str:
+    return f'{PREFIX}_{group.identifier}'
+
+
+def storage_path(group: 'PoseDrivenShapeKeyGroup') -> str:
+    return f'["{storage_name(group)}"]'
+
+
+def bone_storage_name(group: 'PoseDrivenShapeKeyGroup') -> str:
+    return f'{BONE_PREFIX}_{group.identifier}'
+
+
+def bone_storage_path(group: 'PoseDrivenShapeKeyGroup') -> str:
+    return f'["{bone_storage_name(group)}"]'
+
+
+def arrays(group: 'PoseDrivenShapeKeyGroup') -> Tuple[Tuple[str, int], ...]:
+    # The (name, stride) of the group's packed arrays
+    return ((storage_name(group), STRIDE), (bone_storage_name(group), BONES))
+
+
+def element_path(path: str, index: int) -> str:
+    return f'{path}[{index}]'
+
+
+def registry(group: 'PoseDrivenShapeKeyGroup') -> Dict[str, int]:
+    data = group.get("slots")
+    return data.to_dict() if data is not None else {}
+
+
+def storage_resize(group: 'PoseDrivenShapeKeyGroup', slots: int) -> None:
+    array_resize(group, storage_name(group), STRIDE, slots)
+    # The bone array only exists once a shape key has used it
+    if bone_storage_name(group) in group.id_data:
+        array_resize(group, bone_storage_name(group), BONES, slots)
+
+
+def array_resize(group: 'PoseDrivenShapeKeyGroup', name: str, stride: int, slots: int) -> None:
+    key = group.id_data
+    data = key.get(name)
+    size = max(slots, 1) * stride
+    if data is None:
+        key[name] = [0.0] * size
+    elif len(data) != size:
+        values = list(data)[:size]
+        key[name] = values + [0.0] * (size - len(values))
+
+
+def slot(group: 'PoseDrivenShapeKeyGroup', driven: 'PoseDrivenShapeKey') -> int:
+    identifier = driven.identifier
+    slots = registry(group)
+    index = slots.get(identifier)
+    if index is None:
+        used = set(slots.values())
+        index = next(i for i in count() if i not in used)
+        slots[identifier] = index
+        group["slots"] = slots
+        storage_resize(group, max(slots.values()) + 1)
+    return index
+
+
+def ensure(group: 'PoseDrivenShapeKeyGroup', driven: 'PoseDrivenShapeKey', channel: str) -> Tuple[str, int]:
+    # Returns the data path and array index of the shape key's channel distance
+    return storage_path(group), slot(group, driven) * STRIDE + CHANNELS.index(channel)
+
+
+def bone_ensure(group: 'PoseDrivenShapeKeyGroup', driven: 'PoseDrivenShapeKey', bone: int) -> Tuple[str, int]:
+    # Returns the data path and array index of the distance of the shape key's
+    # additional bone (by index in group.bones)
+    index = slot(group, driven)
+    array_resize(group, bone_storage_name(group), BONES, max(registry(group).values()) + 1)
+    return bone_storage_path(group), index * BONES + bone
+
+
+def elements(group: 'PoseDrivenShapeKeyGroup', index: int) -> List[Tuple[str, int]]:
+    # The data paths and array indices of every distance in the slot
+    return [(f'["{name}"]', i) for name, stride in arrays(group) for i in range(index*stride, (index+1)*stride)]
+
+
+def release(group: 'PoseDrivenShapeKeyGroup', identifiers: Iterable[str]) -> Dict[str, int]:
+    # Frees the slots of the given shape keys, returning the released slots
+    slots = registry(group)
+    released = {x: slots.pop(x) for x in identifiers if x in slots}
+    if released:
+        group["slots"] = slots
+    return released
 
-def ensure(owner: 'Identifiable', suffix: str) -> str:
-    name = f'{PREFIX}_{suffix}_{owner.identifier}'
-    owner.id_data[name] = 0.0
-    return f'["{name}"]'
 
+def compact(group: 'PoseDrivenShapeKeyGroup') -> bool:
+    """Moves the group's slots down to fill the gaps left by removed shape keys.
 
-def ensure_location(driven: 'PoseDrivenShapeKey') -> str:
-    return ensure(driven, "loc")
+    The array indices of the distance drivers and the paths of the value driver
+    variables reading them are remapped in a single pass over the Key's drivers.
+    Returns whether anything was moved.
+    """
+    slots = registry(group)
+    remap = {old: new for new, old in enumerate(sorted(slots.values()))}
 
+    if all(old == new for old, new in remap.items()):
+        storage_resize(group, len(slots))
+        return False
 
-def ensure_rotation(driven: 'PoseDrivenShapeKey') -> str:
-    return ensure(driven, "rot")
+    key: 'Key' = group.id_data
+    strides = {f'["{name}"]': stride for name, stride in arrays(group)}
+    prefixes = tuple((f'{path}[', path, stride) for path, stride in strides.items())
 
+    animdata = key.animation_data
+    if animdata:
+        moves = []
+        for fcurve in animdata.drivers:
+            if fcurve.data_path in strides:
+                moves.append(fcurve)
+            else:
+                for variable in fcurve.driver.variables:
+                    target = variable.targets[0]
+                    for prefix, path, stride in prefixes:
+                        if target.data_path.startswith(prefix):
+                            index = int(target.data_path[len(prefix):-1])
+                            old, channel = divmod(index, stride)
+                            if old in remap:
+                                target.data_path = element_path(path, remap[old] * stride + channel)
+                            break
 
-def ensure_scale(driven: 'PoseDrivenShapeKey') -> str:
-    return ensure(driven, "sca")
+        # Slots only move down, so updating in ascending order never collides
+        moves.sort(key=lambda fcurve: fcurve.array_index)
+        for fcurve in moves:
+            stride = strides[fcurve.data_path]
+            old, channel = divmod(fcurve.array_index, stride)
+            if old in remap:
+                fcurve.array_index = remap[old] * stride + channel
 
+    for name, stride in arrays(group):
+        data = key.get(name)
+        if data is not None:
+            values = list(data)
+            packed = [0.0] * (max(len(slots), 1) * stride)
+            for old, new in remap.items():
+                packed[new*stride:(new+1)*stride] = values[old*stride:(old+1)*stride]
+            key[name] = packed
 
-def ensure_bbone(driven: 'PoseDrivenShapeKey') -> str:
-    return ensure(driven, 'bbn')
\ No newline at end of file
+    group["slots"] = {identifier: remap[index] for identifier, index in slots.items()}
+    return True
@@ -0,0 +1,270 @@
+
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import bpy
+from bpy.app.handlers import persistent
+from ..core import parallel
+from . import audit, drivers, fingerprint, migration, radii, suspend
+if TYPE_CHECKING:
+    from bpy.types import Context, Key, Menu
+    from ..api.group import PoseDrivenShapeKeyGroup
+
+# Long running operations are split into small units of work which are run from a
+# timer within a time budget, so the UI stays responsive. Units only capture names
+# and resolve their data when they run: RNA pointers don't survive undo steps or
+# edits made between timer ticks. A unit whose data has gone is skipped. Errors
+# are collected on the job and reported in a popup once it finishes.
+
+BUDGET = 0.02
+INTERVAL = 0.01
+
+# Errors listed in the report popup
+REPORT_LINES = 10
+
+Unit = Callable[[], None]
+
+
+class Job:
+
+    def __init__(self,
+                 name: str,
+                 units: Sequence[Unit],
+                 finish: Optional[Callable[['Job'], None]]=None,
+                 undo: Optional[bool]=True) -> None:
+        self.name = name
+        self.units = list(units)
+        self.finish = finish
+        # Whether the job edits data, pushing an undo step when it finishes
+        self.undo = undo
+        self.index = 0
+        self.errors: List[str] = []
+        self.result: object = None
+        self.cancelled = False
+
+    @property
+    def done(self) -> bool:
+        return self.cancelled or self.index >= len(self.units)
+
+    @property
+    def progress(self) -> float:
+        return self.index / len(self.units) if self.units else 1.0
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def step(self) -> None:
+        unit = self.units[self.index]
+        self.index += 1
+        try:
+            unit()
+        except ReferenceError:
+            pass
+        except Exception as error:
+            self.errors.append(f'{self.name}: {error}')
+
+    def __str__(self) -> str:
+        return f'{self.name} {self.index}/{len(self.units)} ({self.progress*100.0:.0f}%)'
+
+
+JOBS: List[Job] = []
+
+
+def status_set(text: Optional[str]) -> None:
+    wm = bpy.context.window_manager
+    if wm is not None:
+        for window in wm.windows:
+            window.workspace.status_text_set(text)
+
+
+def job_report(job: Job) -> None:
+    wm = bpy.context.window_manager
+    if not job.errors or wm is None or not wm.windows:
+        return
+    errors = job.errors
+
+    def draw(menu: 'Menu', _: 'Context') -> None:
+        layout = menu.layout
+        for error in errors[:REPORT_LINES]:
+            layout.label(text=error)
+        if len(errors) > REPORT_LINES:
+            layout.label(text=f'... and {len(errors) - REPORT_LINES} more')
+
+    wm.popup_menu(draw, title=f'{job.name}: {len(errors)} errors', icon='ERROR')
+
+
+def job_finish(job: Job) -> None:
+    if job.finish is not None and not job.cancelled:
+        try:
+            job.finish(job)
+        except Exception as error:
+            job.errors.append(f'{job.name}: {error}')
+    if job.undo and job.index > 0:
+        try:
+            bpy.ops.ed.undo_push(message=job.name)
+        except RuntimeError: pass
+    job_report(job)
+
+
+def tick() -> Optional[float]:
+    deadline = perf_counter() + BUDGET
+    while JOBS and perf_counter() < deadline:
+        job = JOBS[0]
+        if job.done:
+            JOBS.pop(0)
+            job_finish(job)
+        else:
+            job.step()
+
+    if not JOBS:
+        status_set(None)
+        return None
+
+    queued = f' (+{len(JOBS)-1} queued)' if len(JOBS) > 1 else ""
+    status_set(f'{JOBS[0]}{queued}')
+    return INTERVAL
+
+
+def submit(job: Job) -> Job:
+    JOBS.append(job)
+    if not bpy.app.timers.is_registered(tick):
+        bpy.app.timers.register(tick, first_interval=0.0)
+    return job
+
+
+def cancel_all() -> None:
+    for job in JOBS:
+        job.cancel()
+
+
+def key_names(keys: Optional[Iterable['Key']]) -> List[str]:
+    return [key.name for key in (bpy.data.shape_keys if keys is None else keys)]
+
+
+def group_resolve(key_name: str, group_name: str) -> Optional['PoseDrivenShapeKeyGroup']:
+    key = bpy.data.shape_keys.get(key_name)
+    if key is not None and key.is_property_set("pose_driven"):
+        group = key.pose_driven.groups.get(group_name)
+        if group is not None and group.is_valid:
+            return group
+
+
+def rebuild_job(keys: Optional[Iterable['Key']]=None,
+                force: Optional[bool]=False,
+                workers: Optional[int]=1) -> Job:
+    # One unit solves a group's distance matrix and radii, then one unit per member
+    # builds its drivers. The channels are re-read per unit as the group's flags
+    # may have been edited in between. Unless forced, groups and members whose
+    # fingerprints match their settings are skipped. With more than one worker
+    # (0 for one per CPU) the groups' radii are solved concurrently instead, by
+    # first units each solving as many groups as there are workers (see
+    # radii.update_groups), so a timer tick never waits for more than one batch.
+    units: List[Unit] = []
+    names: List[Tuple[str, str]] = []
+
+    def solve(key_name: str, group_name: str) -> None:
+        group = group_resolve(key_name, group_name)
+        if group is not None:
+            radii.update(group)
+
+    def solve_batch(batch: List[Tuple[str, str]]) -> None:
+        groups = (group_resolve(key_name, group_name) for key_name, group_name in batch)
+        radii.update_groups([x for x in groups if x is not None], workers)
+
+    def build(key_name: str, group_name: str, name: str) -> None:
+        group = group_resolve(key_name, group_name)
+        if group is not None:
+            driven = group.id_data.pose_driven.get(name)
+            if driven is not None and driven.get("group", "") == group_name:
+                config = fingerprint.group_config(group)
+                if force or fingerprint.stale((driven,), config):
+                    drivers.driver_update(driven, group, drivers.channels(group))
+                    driven[fingerprint.NAME] = fingerprint.shape_key_fingerprint(driven, config)
+
+    def store(key_name: str, group_name: str) -> None:
+        group = group_resolve(key_name, group_name)
+        if group is not None:
+            fingerprint.store(group, ())
+
+    def restore(key_name: str, group_name: str) -> None:
+        group = group_resolve(key_name, group_name)
+        if group is not None:
+            suspend.resume((group,))
+
+    def stash(key_name: str, group_name: str) -> None:
+        group = group_resolve(key_name, group_name)
+        if group is not None:
+            suspend.suspend((group,))
+
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        if key.is_property_set("pose_driven"):
+            for group in key.pose_driven.groups:
+                if not force and fingerprint.unchanged(group):
+                    continue
+                # Suspended groups are rebuilt with their drivers restored
+                suspended = group.is_suspended
+                if suspended:
+                    units.append(lambda k=key.name, g=group.name: restore(k, g))
+                if workers == 1:
+                    units.append(lambda k=key.name, g=group.name: solve(k, g))
+                names.append((key.name, group.name))
+                for item in group:
+                    units.append(lambda k=key.name, g=group.name, n=item.name: build(k, g, n))
+                units.append(lambda k=key.name, g=group.name: store(k, g))
+                if suspended:
+                    units.append(lambda k=key.name, g=group.name: stash(k, g))
+
+    if workers != 1:
+        size = parallel.workers(workers)
+        units[:0] = [lambda b=names[i:i+size]: solve_batch(b) for i in range(0, len(names), size)]
+    return Job("Rebuilding pose drivers", units)
+
+
+def migrate_job(keys: Optional[Iterable['Key']]=None) -> Job:
+    report = migration.MigrationReport()
+
+    def migrate(name: str) -> None:
+        key = bpy.data.shape_keys.get(name)
+        if key is not None:
+            migration.migrate(key, report)
+
+    job = Job("Migrating pose drivers", [lambda n=name: migrate(n) for name in key_names(keys)])
+    job.result = report
+    return job
+
+
+def audit_job(keys: Optional[Iterable['Key']]=None, repair: Optional[bool]=False) -> Job:
+    issues: List[audit.Issue] = []
+
+    def run(name: str) -> None:
+        key = bpy.data.shape_keys.get(name)
+        if key is not None:
+            issues.extend(audit.audit(key))
+
+    def finish(job: Job) -> None:
+        if repair:
+            audit.repair(issues)
+
+    job = Job("Auditing pose drivers", [lambda n=name: run(n) for name in key_names(keys)], finish, repair)
+    job.result = issues
+    return job
+
+
+@persistent
+def on_load_pre(_=None) -> None:
+    # Names are meaningless in the next file
+    cancel_all()
+    JOBS.clear()
+
+
+def register() -> None:
+    bpy.app.handlers.load_pre.append(on_load_pre)
+
+
+def unregister() -> None:
+    cancel_all()
+    JOBS.clear()
+    if bpy.app.timers.is_registered(tick):
+        bpy.app.timers.unregister(tick)
+    status_set(None)
+    if on_load_pre in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(on_load_pre)
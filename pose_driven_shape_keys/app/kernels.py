@@ -0,0 +1,58 @@
+
+from typing import Sequence
+import bpy
+from bpy.app.handlers import persistent
+from ..core import kernels
+from . import drivers
+
+# The driver namespace isn't saved with the file, so kernels are generated again
+# from the settings of the groups using them when a file is loaded (see
+# drivers.kernels_define). Nothing but the groups' settings is read from the file,
+# and no kernel is compiled for files Blender didn't trust to run Python, whose
+# drivers wouldn't run the kernels anyway.
+
+
+def define(names: Sequence[str], expression: str) -> str:
+    # Compiles the kernel (unless already defined), returning the driver expression
+    # calling it
+    text = kernels.source(names, expression)
+    key = kernels.source_key(text)
+    if key not in kernels.KERNELS:
+        kernels.define(key, text)
+    return kernels.expression(key, names)
+
+
+def trusted() -> bool:
+    return not bpy.app.autoexec_fail
+
+
+def define_all() -> None:
+    kernels.KERNELS.clear()
+    if not trusted():
+        return
+    for key in bpy.data.shape_keys:
+        if key.is_property_set("pose_driven"):
+            for group in key.pose_driven.groups:
+                drivers.kernels_define(group)
+
+
+@persistent
+def on_load_post(_=None) -> None:
+    define_all()
+
+
+def register() -> None:
+    bpy.app.driver_namespace[kernels.NAME] = kernels.call
+    bpy.app.handlers.load_post.append(on_load_post)
+    # Data isn't accessible while add-ons are registered
+    bpy.app.timers.register(define_all, first_interval=0.0)
+
+
+def unregister() -> None:
+    if on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_load_post)
+    if bpy.app.timers.is_registered(define_all):
+        bpy.app.timers.unregister(define_all)
+    if bpy.app.driver_namespace.get(kernels.NAME) is kernels.call:
+        del bpy.app.driver_namespace[kernels.NAME]
+    kernels.KERNELS.clear()
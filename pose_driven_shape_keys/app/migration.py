@@ -0,0 +1,179 @@
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+import bpy
+from ..lib.curve_mapping import BCLMAP_CurveManager
+from . import drivers
+from .drivers import BBONE_PROPERTIES
+if TYPE_CHECKING:
+    from bpy.types import FCurve, Key, Object
+    from ..api.group import PoseDrivenShapeKeyGroup
+    from ..api.shape_key import PoseDrivenShapeKey
+
+# Enum indices for ID property writes (see api.group)
+ROTATION_MODE_INDEX = {'EULER': 0, 'QUATERNION': 1, 'SWING': 2, 'TWIST': 3}
+ROTATION_ORDER_INDEX = {'AUTO': 0, 'XYZ': 1, 'XZY': 2, 'YXZ': 3, 'YZX': 4, 'ZXY': 5, 'ZYX': 6}
+ROTATION_AXIS_INDEX = {'X': 0, 'Y': 1, 'Z': 2}
+
+CENTER_PROPERTIES = ("transform_matrix",) + tuple(name for name, _ in BBONE_PROPERTIES)
+
+# Channel flags of the legacy pose drivers, named after the group properties
+# they are written to
+FLAG_PROPERTIES = (("rotation",)
+                   + tuple(f'{channel}_{axis}' for channel in ("location", "rotation", "scale") for axis in "xyz")
+                   + tuple(name for name, _ in BBONE_PROPERTIES))
+
+
+@dataclass
+class MigrationReport:
+    keys: int = 0
+    groups: int = 0
+    shape_keys: int = 0
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def legacy_mode(mode: str) -> Tuple[str, str]:
+    if mode in ROTATION_MODE_INDEX:
+        return mode, 'AUTO'
+    return 'EULER', mode
+
+
+def legacy_bone_target(fcurves: Iterable['FCurve']) -> str:
+    for fcurve in fcurves:
+        variables = fcurve.driver.variables
+        if len(variables) > 0:
+            target = variables[0].targets[0]
+            if variables[0].type == 'TRANSFORMS':
+                return target.bone_target
+            path = target.data_path
+            if path.startswith('pose.bones["'):
+                return path[12:path.find('"]')]
+            break
+    return ""
+
+
+def legacy_flags(entry: object) -> Tuple[bool, ...]:
+    return tuple(bool(getattr(entry, f'use_{name}')) for name in FLAG_PROPERTIES)
+
+
+def group_init(group: 'PoseDrivenShapeKeyGroup',
+               ob: Optional['Object'],
+               bone_target: str,
+               mode: str,
+               flags: Tuple[bool, ...]) -> None:
+    mode, order = legacy_mode(mode)
+    group["rotation_mode"] = ROTATION_MODE_INDEX[mode]
+    group["rotation_order"] = ROTATION_ORDER_INDEX[order]
+    group["rotation_axis"] = ROTATION_AXIS_INDEX['Y']
+    for name, flag in zip(FLAG_PROPERTIES, flags):
+        group[name] = flag
+    group["object"] = ob
+    group["bone_target"] = bone_target
+
+
+def shape_key_init(driven: 'PoseDrivenShapeKey', entry: object) -> None:
+    driven["mute"] = entry.mute
+
+    activation = driven.activation
+    activation["radius"] = entry.radius
+    activation["radius_auto_update"] = False
+    activation["target"] = entry.value
+
+    center = activation.center
+    for name in CENTER_PROPERTIES:
+        value = entry.get(name)
+        if value is not None:
+            center[name] = value
+
+    src = entry.falloff
+    for name in ("curve_type", "interpolation", "easing", "ramp"):
+        value = src.get(name)
+        if value is not None:
+            activation[name] = value
+
+    activation.curve["extend"] = src.curve.get("extend", 0)
+    points = activation.curve.points.points__internal__
+    points.clear()
+    for point in src.curve.points:
+        data = points.add()
+        data["handle_type"] = point.get("handle_type", 0)
+        data["location"] = tuple(point.location)
+        data["select"] = point.select
+
+    # Bypass PoseDrivenShapeKeyActivation.update() so no per-item event is dispatched
+    BCLMAP_CurveManager.update(activation)
+
+
+def migrate(key: 'Key', report: Optional[MigrationReport]=None) -> MigrationReport:
+    if report is None:
+        report = MigrationReport()
+
+    if not key.is_property_set("pose_drivers") or len(key.pose_drivers) == 0:
+        return report
+
+    entries = list(key.pose_drivers)
+    shapes = key.key_blocks
+
+    # Index the Key's drivers once for all entries
+    fcurves: Dict[str, List['FCurve']] = {}
+    animdata = key.animation_data
+    if animdata:
+        for fcurve in animdata.drivers:
+            fcurves.setdefault(fcurve.data_path, []).append(fcurve)
+
+    # Entries only share a group when everything the group holds for them matches:
+    # the bone, the rotation mode (with the euler order) and the channels used
+    specs: Dict[Tuple[Optional['Object'], str, str, Tuple[bool, ...]], List[object]] = {}
+    migrated = []
+    for index, entry in enumerate(entries):
+        if entry.name not in shapes:
+            report.skipped.append((key.name, entry.name))
+            continue
+        bone_target = legacy_bone_target(fcurves.get(f'["{entry.identifier}_distances"]', ()))
+        spec = (entry.object, bone_target, entry.rotation_mode, legacy_flags(entry))
+        specs.setdefault(spec, []).append(entry)
+        migrated.append(index)
+
+    if not migrated:
+        return report
+
+    # Remove the legacy drivers in a single pass before the new drivers are written
+    obsolete = set()
+    for index in migrated:
+        entry = entries[index]
+        obsolete.add(f'["{entry.identifier}_distances"]')
+        obsolete.add(f'key_blocks["{entry.name}"].value')
+    for path in obsolete:
+        for fcurve in fcurves.get(path, ()):
+            animdata.drivers.remove(fcurve)
+    for index in migrated:
+        drivers.idprop_remove(key, f'{entries[index].identifier}_distances')
+
+    collection = key.pose_driven
+    for (ob, bone_target, mode, flags), group_entries in specs.items():
+        # The group has no object until initialized so creating its members
+        # does not trigger a driver build for each of them
+        group = collection.groups.new(name=bone_target or "PoseTarget")
+        items = collection.new_many([shapes[x.name] for x in group_entries], group)
+        for item, entry in zip(items, group_entries):
+            shape_key_init(item, entry)
+        group_init(group, ob, bone_target, mode, flags)
+        drivers.group_update(group, items)
+        report.groups += 1
+        report.shape_keys += len(items)
+
+    if len(migrated) == len(entries):
+        key.pose_drivers.clear()
+    else:
+        for index in reversed(migrated):
+            key.pose_drivers.remove(index)
+
+    report.keys += 1
+    return report
+
+
+def migrate_all(keys: Optional[Iterable['Key']]=None) -> MigrationReport:
+    report = MigrationReport()
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        migrate(key, report)
+    return report
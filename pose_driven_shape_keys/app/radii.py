@@ -1,12 +1,15 @@
 
-from typing import Sequence, TYPE_CHECKING
+from typing import Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
 import numpy as np
-from ..lib.events import event_handler
+from ..lib.dispatch import event_handler
 from ..api.activation_center import ActivationCenterUpdateEvent
+from ..core import distance as core_distance, parallel
+from ..core.radii import pose_radii
 from . import distance
 if TYPE_CHECKING:
     from ..api.activation_center import PoseDrivenShapeKeyActivationCenter
     from ..api.activation import PoseDrivenShapeKeyActivation
+    from ..api.group import PoseDrivenShapeKeyGroup
     from ..api.shape_key import PoseDrivenShapeKey
 
 
@@ -15,20 +18,58 @@ def resolve_activation_center_shape_key(center: 'PoseDrivenShapeKeyActivationCen
     return center.id_data.path_resolve(path.rpartition(".activation.")[0])
 
 
-def pose_radii(distance_matrix: np.ndarray) -> Sequence[float]:
-    radii = []
-    for row in np.ma.masked_values(distance_matrix, 0.0, atol=0.001):
-        row = row.compressed()
-        radii.append(0.0 if len(row) == 0 else np.min(row))
-    return radii
+def radius_default(group: 'PoseDrivenShapeKeyGroup') -> float:
+    # Radius of a pose without neighbours: the full range of the group's metrics
+    # where they are bounded (the radius itself is limited to 1.0)
+    scale = distance.scale(group)
+    return 0.0 if scale is None else min(scale, 1.0)
 
 
 @event_handler(ActivationCenterUpdateEvent)
 def on_activation_center_update(event: ActivationCenterUpdateEvent) -> None:
     shape = resolve_activation_center_shape_key(event.center)
     group = shape.group
-    radii = pose_radii(distance.matrix(group))
+    radii = pose_radii(distance.matrix(group), default=radius_default(group))
     for shape, radius in zip(group, radii):
         activation: 'PoseDrivenShapeKeyActivation' = shape.activation
         if activation.radius_auto_update:
             activation.radius = radius
+
+
+def solve(task: Tuple[core_distance.Poses, float]) -> np.ndarray:
+    # Safe to run on worker threads (see core.parallel)
+    poses, default = task
+    return pose_radii(core_distance.poses_matrix(poses), default=default)
+
+
+def apply(items: Sequence['PoseDrivenShapeKey'], radii: np.ndarray) -> None:
+    for shape, radius in zip(items, radii.tolist()):
+        activation: 'PoseDrivenShapeKeyActivation' = shape.activation
+        if activation.radius_auto_update:
+            # Written as an ID property so that no per-activation update event is
+            # dispatched. The caller is responsible for updating the f-curves.
+            activation["radius"] = radius
+
+
+def update(group: 'PoseDrivenShapeKeyGroup',
+           items: Optional[Sequence['PoseDrivenShapeKey']]=None) -> None:
+    if items is None:
+        items = list(group)
+    apply(items, solve((distance.poses(group, items), radius_default(group))))
+
+
+def update_groups(groups: Iterable['PoseDrivenShapeKeyGroup'], workers: Optional[int]=1) -> None:
+    """Updates the radii of every member of the groups. The pose tables are read on
+    the calling (main) thread, the groups' distance matrices and radii are solved
+    concurrently on worker threads (one at a time by default, 0 for one per CPU)
+    and the radii are written back on the calling thread.
+    """
+    members: List[List['PoseDrivenShapeKey']] = []
+    tasks: List[Tuple[core_distance.Poses, float]] = []
+    for group in groups:
+        items = list(group)
+        if items:
+            members.append(items)
+            tasks.append((distance.poses(group, items), radius_default(group)))
+    for items, radii in zip(members, parallel.run(solve, tasks, workers)):
+        apply(items, radii)
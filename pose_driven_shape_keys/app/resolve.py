@@ -12,5 +12,5 @@ def activation_shape(activation: 'PoseDrivenShapeKeyActivation') -> 'PoseDrivenS
     return activation.id_data.path_resolve(path.rpartition(".activation")[0])
 
 
-def driven_value_driver(driven: 'PoseDrivenShapeKey') -> FCurve:
+def driven_value_driver(driven: 'PoseDrivenShapeKey') -> 'FCurve':
     return driver_ensure(driven.id_data, f'key_blocks["{driven.name}"].value')
@@ -0,0 +1,189 @@
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, TYPE_CHECKING
+import bpy
+from . import engine, fingerprint, suspend
+if TYPE_CHECKING:
+    from bpy.types import DriverTarget, Key, Object
+
+# Swapping rigs (proxy to final, a new rig version) changes the object and bones
+# every driver reads. Rather than setting each group's object and bone_target,
+# which rebuilds its drivers, retarget() patches the driver targets' id,
+# bone_target and data_path in place in a single pass over each Key's drivers,
+# then updates the stored group settings (and the stashes of suspended groups)
+# without dispatching any update events. Expressions and keyframes are left
+# untouched.
+
+BONE_PATH = re.compile(r'pose\.bones\["((?:[^"\\]|\\.)*)"\]')
+
+
+class RetargetReport:
+
+    def __init__(self) -> None:
+        self.keys = 0
+        self.drivers = 0
+        self.targets = 0
+        self.groups = 0
+
+    def __str__(self) -> str:
+        return (f'Retargeted {self.targets} driver targets in {self.drivers} drivers '
+                f'and {self.groups} groups on {self.keys} keys')
+
+
+def bone_mapping(bones: Optional[Dict[str, str]]=None,
+                 pattern: Optional[str]="",
+                 replacement: Optional[str]="") -> Callable[[str], str]:
+    """Returns a function mapping bone names through the bones dictionary, or for
+    names it doesn't contain, through the regular expression substitution.
+    """
+    bones = bones or {}
+    expression = re.compile(pattern) if pattern else None
+
+    def mapping(name: str) -> str:
+        result = bones.get(name)
+        if result is None:
+            result = expression.sub(replacement, name) if expression is not None else name
+        return result
+
+    return mapping
+
+
+def path_retarget(path: str, bones: Callable[[str], str]) -> str:
+    return BONE_PATH.sub(lambda match: f'pose.bones["{bones(match.group(1))}"]', path)
+
+
+class Retarget:
+
+    def __init__(self,
+                 objects: Dict['Object', 'Object'],
+                 bones: Callable[[str], str]) -> None:
+        self.objects = objects
+        self.names = {source.name: target.name for source, target in objects.items()}
+        self.bones = bones
+
+    def scoped(self, object: Optional['Object']) -> bool:
+        # Bones are renamed for the mapped objects, or for every armature when only
+        # bones are mapped
+        if object is None:
+            return False
+        if self.objects:
+            return object in self.objects
+        return getattr(object, "type", "") == 'ARMATURE'
+
+    def target(self, target: 'DriverTarget', variable_type: str) -> bool:
+        id = target.id
+        if not self.scoped(id):
+            return False
+        changed = False
+        result = self.objects.get(id)
+        if result is not None and result != id:
+            target.id = result
+            changed = True
+        if variable_type == 'SINGLE_PROP':
+            path = target.data_path
+            value = path_retarget(path, self.bones)
+            if value != path:
+                target.data_path = value
+                changed = True
+        else:
+            name = target.bone_target
+            value = self.bones(name) if name else name
+            if value != name:
+                target.bone_target = value
+                changed = True
+        return changed
+
+    def stash(self, text: str) -> str:
+        # Patches the targets serialized in a suspended group's stash
+        try:
+            stash = json.loads(text)
+        except ValueError:
+            return text
+        for data in stash:
+            for variable in data["variables"]:
+                for item in variable["targets"]:
+                    if item["id_type"] != 'OBJECT':
+                        continue
+                    object = bpy.data.objects.get(item["id"])
+                    if not self.scoped(object):
+                        continue
+                    item["id"] = self.names.get(item["id"], item["id"])
+                    if variable["type"] == 'SINGLE_PROP':
+                        item["data_path"] = path_retarget(item["data_path"], self.bones)
+                    elif item["bone_target"]:
+                        item["bone_target"] = self.bones(item["bone_target"])
+        return json.dumps(stash, separators=(",", ":"))
+
+    def settings(self, settings: Any) -> bool:
+        # Sets the stored object (and bone) of a group or legacy pose driver
+        # without running its update callback
+        object = settings.object
+        if not self.scoped(object):
+            return False
+        result = self.objects.get(object)
+        if result is not None and result != object:
+            settings["object"] = result
+        bone = settings.get("bone_target")
+        if bone:
+            settings["bone_target"] = self.bones(bone)
+        return True
+
+
+def key_retarget(key: 'Key', retarget: Retarget, report: RetargetReport) -> None:
+    changed = False
+    animdata = key.animation_data
+    if animdata:
+        for fcurve in animdata.drivers:
+            count = 0
+            for variable in fcurve.driver.variables:
+                for target in variable.targets:
+                    if retarget.target(target, variable.type):
+                        count += 1
+            if count:
+                report.drivers += 1
+                report.targets += count
+                changed = True
+
+    if key.is_property_set("pose_driven"):
+        for group in key.pose_driven.groups:
+            text = group.get(suspend.STASH)
+            if text is not None:
+                group[suspend.STASH] = retarget.stash(text)
+            # Drivers are patched in place, so drivers which matched their settings
+            # still do and mustn't be regenerated by the next rebuild
+            current = fingerprint.unchanged(group)
+            if retarget.settings(group):
+                # Additional bones are stored by name, on the group and the centers
+                for bone in group.bones:
+                    bone.name = retarget.bones(bone.name)
+                for driven in group:
+                    for entry in driven.activation.center.bones:
+                        entry.name = retarget.bones(entry.name)
+                if current:
+                    fingerprint.store(group, list(group))
+                engine.invalidate(group)
+                report.groups += 1
+                changed = True
+
+    if key.is_property_set("pose_drivers"):
+        for settings in key.pose_drivers:
+            if retarget.settings(settings):
+                report.groups += 1
+                changed = True
+
+    if changed:
+        report.keys += 1
+
+
+def retarget(objects: Dict['Object', 'Object'],
+             bones: Optional[Callable[[str], str]]=None,
+             keys: Optional[Iterable['Key']]=None) -> RetargetReport:
+    """Points every driver reading the objects' keys (and their bones, renamed by
+    bones) at the objects' values, on the given Keys (all by default).
+    """
+    report = RetargetReport()
+    mapping = Retarget(objects, bones or (lambda name: name))
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        key_retarget(key, mapping, report)
+    return report
@@ -0,0 +1,67 @@
+
+from typing import Dict, Optional, Tuple, TYPE_CHECKING, Union
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+from ..lib.dispatch import event_handler
+from ..api.activation import (ActivationRadiusUpdateEvent,
+                              ActivationTargetUpdateEvent,
+                              ActivationUpdateEvent)
+from ..core import falloff
+from . import fcurves, resolve
+if TYPE_CHECKING:
+    from ..api.activation import PoseDrivenShapeKeyActivation
+
+# The engine (and anything else evaluating activations outside of the F-Curve
+# system) looks activations up in tables rather than solving the activation curve's
+# bezier segments for every sample. Each activation's curve is tabulated once (see
+# core.falloff.tabulate) from its value driver's keyframes, which hold the falloff
+# points, interpolation, radius and goal (and the remap of approximated groups).
+# Tables are cached per Key and shape key identifier until the activation is
+# updated or its value driver rebuilt, so a group's solver is rebuilt from the
+# tables of its unchanged members (see core.falloff.stack).
+
+TABLES: Dict[Tuple[str, str], falloff.Table] = {}
+
+
+def table_key(activation: 'PoseDrivenShapeKeyActivation') -> Tuple[str, str]:
+    return (activation.id_data.name, resolve.activation_shape(activation).identifier)
+
+
+def table(activation: 'PoseDrivenShapeKeyActivation') -> falloff.Table:
+    ident = table_key(activation)
+    result = TABLES.get(ident)
+    if result is None:
+        driven = resolve.activation_shape(activation)
+        keyframes, modes = fcurves.curve_read(resolve.driven_value_driver(driven))
+        result = TABLES[ident] = falloff.tabulate(keyframes[np.newaxis], np.array([modes or [falloff.BEZIER]]))
+    return result
+
+
+def invalidate(activation: Optional['PoseDrivenShapeKeyActivation']=None) -> None:
+    if activation is None:
+        TABLES.clear()
+    else:
+        TABLES.pop(table_key(activation), None)
+
+
+@event_handler(ActivationUpdateEvent, ActivationRadiusUpdateEvent, ActivationTargetUpdateEvent)
+def on_activation_update(event: Union[ActivationUpdateEvent,
+                                      ActivationRadiusUpdateEvent,
+                                      ActivationTargetUpdateEvent]) -> None:
+    invalidate(event.activation)
+
+
+@persistent
+def on_load_post(_=None) -> None:
+    invalidate()
+
+
+def register() -> None:
+    bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister() -> None:
+    if on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_load_post)
+    invalidate()
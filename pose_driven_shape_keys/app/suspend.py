@@ -0,0 +1,325 @@
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+from ..lib.dispatch import event_handler
+from ..lib.driver_utils import driver_ensure, driver_variables_clear
+from ..api.group import GroupSuspendUpdateEvent
+from ..api.shape_keys import PoseDrivenShapeKeysSuspendUpdateEvent
+from . import engine, idprops
+if TYPE_CHECKING:
+    from bpy.types import FCurve, Key, Object
+    from ..api.group import PoseDrivenShapeKeyGroup
+
+# A suspended group's drivers (the packed distance drivers and the members' value
+# drivers) are serialized into a single JSON string on the group and removed from
+# the Key, so the depsgraph no longer evaluates them. Resuming recreates them as
+# they were. Groups are suspended and resumed in bulk, with a single pass over a
+# Key's drivers however many of its groups change.
+#
+# The automatic policy suspends a group while none of the meshes using its Key is
+# visible with an enabled armature modifier deforming it by the group's armature.
+# Blender running in the background (i.e. rendering on a farm) resumes everything
+# and files are saved with automatically suspended groups resumed.
+
+STASH = "suspended"
+
+INTERVAL = 0.5
+
+ID_COLLECTIONS = {
+    'ACTION': "actions",
+    'ARMATURE': "armatures",
+    'CAMERA': "cameras",
+    'KEY': "shape_keys",
+    'LIGHT': "lights",
+    'MATERIAL': "materials",
+    'MESH': "meshes",
+    'OBJECT': "objects",
+    'SCENE': "scenes",
+    'TEXTURE': "textures",
+    'WORLD': "worlds",
+    }
+
+TARGET_PROPERTIES = ("data_path", "bone_target", "transform_type", "transform_space", "rotation_mode")
+
+
+def group_paths(group: 'PoseDrivenShapeKeyGroup') -> Set[str]:
+    # The data paths of the group's drivers
+    result = {idprops.storage_path(group), idprops.bone_storage_path(group)}
+    for driven in group:
+        result.add(f'key_blocks["{driven.name}"].value')
+    return result
+
+
+def fcurve_stash(fcurve: 'FCurve') -> Dict[str, Any]:
+    driver = fcurve.driver
+    points = fcurve.keyframe_points
+    data = np.empty((3, len(points) * 2), dtype=np.float32)
+    for buffer, name in zip(data, ("co", "handle_left", "handle_right")):
+        points.foreach_get(name, buffer)
+
+    variables = []
+    for variable in driver.variables:
+        targets = []
+        for target in variable.targets:
+            id = target.id
+            item = {name: getattr(target, name) for name in TARGET_PROPERTIES}
+            item["id_type"] = target.id_type
+            item["id"] = id.name if id is not None else ""
+            targets.append(item)
+        variables.append({"name": variable.name, "type": variable.type, "targets": targets})
+
+    return {
+        "path": fcurve.data_path,
+        "index": fcurve.array_index,
+        "mute": fcurve.mute,
+        "extrapolation": fcurve.extrapolation,
+        "type": driver.type,
+        "expression": driver.expression,
+        "use_self": driver.use_self,
+        "variables": variables,
+        "points": data.tolist(),
+        "interpolation": [x.interpolation for x in points],
+        "handles": [(x.handle_left_type, x.handle_right_type) for x in points],
+        }
+
+
+def fcurve_restore(key: 'Key', data: Dict[str, Any]) -> 'FCurve':
+    fcurve = driver_ensure(key, data["path"], data["index"])
+    driver = fcurve.driver
+    driver.type = data["type"]
+    driver.use_self = data["use_self"]
+    driver_variables_clear(driver.variables)
+
+    for item in data["variables"]:
+        variable = driver.variables.new()
+        variable.type = item["type"]
+        variable.name = item["name"]
+        for target, values in zip(variable.targets, item["targets"]):
+            if variable.type == 'SINGLE_PROP':
+                target.id_type = values["id_type"]
+            if values["id"]:
+                collection = getattr(bpy.data, ID_COLLECTIONS.get(values["id_type"], "objects"))
+                target.id = collection.get(values["id"])
+            for name in TARGET_PROPERTIES:
+                try:
+                    setattr(target, name, values[name])
+                except (AttributeError, TypeError): pass
+
+    driver.expression = data["expression"]
+
+    points = fcurve.keyframe_points
+    buffers = data["points"]
+    count = len(data["interpolation"])
+    points.clear()
+    if count:
+        points.add(count)
+        for name, buffer in zip(("co", "handle_left", "handle_right"), buffers):
+            points.foreach_set(name, buffer)
+        for point, interpolation, (left, right) in zip(points, data["interpolation"], data["handles"]):
+            point.interpolation = interpolation
+            point.handle_left_type = left
+            point.handle_right_type = right
+
+    fcurve.extrapolation = data["extrapolation"]
+    fcurve.mute = data["mute"]
+    fcurve.update()
+    return fcurve
+
+
+def by_key(groups: Iterable['PoseDrivenShapeKeyGroup']) -> Dict['Key', List['PoseDrivenShapeKeyGroup']]:
+    result: Dict['Key', List['PoseDrivenShapeKeyGroup']] = {}
+    for group in groups:
+        result.setdefault(group.id_data, []).append(group)
+    return result
+
+
+def suspend(groups: Iterable['PoseDrivenShapeKeyGroup']) -> int:
+    """Stashes and removes the drivers of the given groups, returning how many
+    groups were suspended. Groups which are already suspended are skipped.
+    """
+    count = 0
+    for key, items in by_key(x for x in groups if not x.is_suspended).items():
+        owners: Dict[str, int] = {}
+        for index, group in enumerate(items):
+            for path in group_paths(group):
+                owners[path] = index
+
+        stashes: List[List[Dict[str, Any]]] = [[] for _ in items]
+        animdata = key.animation_data
+        if animdata:
+            drivers = animdata.drivers
+            matches = []
+            for fcurve in drivers:
+                owner = owners.get(fcurve.data_path)
+                if owner is not None:
+                    matches.append((owner, fcurve))
+            for owner, fcurve in matches:
+                stashes[owner].append(fcurve_stash(fcurve))
+            for _, fcurve in matches:
+                drivers.remove(fcurve)
+
+        for group, stash in zip(items, stashes):
+            group[STASH] = json.dumps(stash, separators=(",", ":"))
+            engine.invalidate(group)
+            count += 1
+    return count
+
+
+def resume(groups: Iterable['PoseDrivenShapeKeyGroup']) -> int:
+    """Recreates the stashed drivers of the given groups, returning how many
+    groups were resumed. Groups which aren't suspended are skipped.
+    """
+    count = 0
+    for group in groups:
+        text = group.get(STASH)
+        if text is None:
+            continue
+        key = group.id_data
+        try:
+            stash = json.loads(text)
+        except ValueError:
+            stash = []
+        for data in stash:
+            fcurve_restore(key, data)
+        del group[STASH]
+        if group.engine == 'NUMPY':
+            engine.fcurves_mute(group, engine.active(group))
+        engine.invalidate(group)
+        count += 1
+    return count
+
+
+def key_users() -> Dict[str, List['Object']]:
+    # Maps Key names to the mesh objects using them
+    result: Dict[str, List['Object']] = {}
+    for object in bpy.data.objects:
+        if object.type == 'MESH':
+            key = object.data.shape_keys
+            if key is not None:
+                result.setdefault(key.name, []).append(object)
+    return result
+
+
+def deformed(object: 'Object', armature: Optional['Object']) -> bool:
+    for modifier in object.modifiers:
+        if modifier.type == 'ARMATURE' and modifier.show_viewport and modifier.object == armature:
+            return True
+    return False
+
+
+def auto_suspended(group: 'PoseDrivenShapeKeyGroup', users: List['Object']) -> bool:
+    armature = group.object
+    for object in users:
+        try:
+            visible = object.visible_get()
+        except RuntimeError:
+            visible = not object.hide_viewport
+        if visible and deformed(object, armature):
+            return False
+    return True
+
+
+def suspended_mode(group: 'PoseDrivenShapeKeyGroup') -> str:
+    # The group's effective mode, which the Key's mode overrides
+    mode = group.id_data.pose_driven.suspend
+    return group.suspend if mode == 'GROUPS' else mode
+
+
+def apply(keys: Optional[Iterable['Key']]=None, save: Optional[bool]=False) -> None:
+    """Suspends and resumes the groups of the given Keys (all by default) as their
+    modes require. With save set automatically suspended groups are resumed.
+    """
+    background = bpy.app.background
+    users = None
+    pending_suspend = []
+    pending_resume = []
+
+    for key in (bpy.data.shape_keys if keys is None else keys):
+        if not key.is_property_set("pose_driven"):
+            continue
+        for group in key.pose_driven.groups:
+            mode = suspended_mode(group)
+            if mode == 'ON':
+                state = True
+            elif mode == 'AUTO' and not background and not save:
+                if users is None:
+                    users = key_users()
+                state = auto_suspended(group, users.get(key.name, []))
+            else:
+                state = False
+            if state != group.is_suspended:
+                (pending_suspend if state else pending_resume).append(group)
+
+    if pending_resume:
+        resume(pending_resume)
+    if pending_suspend:
+        suspend(pending_suspend)
+
+
+def auto_keys() -> List['Key']:
+    result = []
+    for key in bpy.data.shape_keys:
+        if key.is_property_set("pose_driven"):
+            mode = key.pose_driven.suspend
+            if mode == 'AUTO' or (mode == 'GROUPS' and any(x.suspend == 'AUTO' for x in key.pose_driven.groups)):
+                result.append(key)
+    return result
+
+
+def tick() -> Optional[float]:
+    # Visibility and modifier changes don't notify, so the policy is polled
+    keys = auto_keys()
+    if keys:
+        apply(keys)
+    return INTERVAL
+
+
+@event_handler(GroupSuspendUpdateEvent)
+def on_group_suspend_update(event: GroupSuspendUpdateEvent) -> None:
+    apply((event.group.id_data,))
+
+
+@event_handler(PoseDrivenShapeKeysSuspendUpdateEvent)
+def on_shape_keys_suspend_update(event: PoseDrivenShapeKeysSuspendUpdateEvent) -> None:
+    apply((event.shapekeys.id_data,))
+
+
+@persistent
+def on_load_post(_=None) -> None:
+    apply()
+
+
+@persistent
+def on_save_pre(_=None) -> None:
+    apply(auto_keys(), save=True)
+
+
+@persistent
+def on_save_post(_=None) -> None:
+    apply(auto_keys())
+
+
+HANDLERS = (
+    ("load_post", on_load_post),
+    ("save_pre", on_save_pre),
+    ("save_post", on_save_post),
+    )
+
+
+def register() -> None:
+    for name, handler in HANDLERS:
+        getattr(bpy.app.handlers, name).append(handler)
+    if not bpy.app.background:
+        bpy.app.timers.register(tick, first_interval=INTERVAL, persistent=True)
+
+
+def unregister() -> None:
+    for name, handler in HANDLERS:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    if bpy.app.timers.is_registered(tick):
+        bpy.app.timers.unregister(tick)
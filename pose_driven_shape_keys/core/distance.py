@@ -0,0 +1,73 @@
+
+from dataclasses import dataclass
+from typing import Callable, Sequence, Tuple
+import numpy as np
+
+Metric = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+Channel = Tuple[np.ndarray, Metric]
+
+
+def pairwise(params: np.ndarray, metric: Metric) -> np.ndarray:
+    params = np.asarray(params, dtype=float)
+    if params.ndim == 1:
+        params = params[:, np.newaxis]
+    return metric(params[:, np.newaxis, :], params[np.newaxis, :, :])
+
+
+def columns(params: np.ndarray, flags: Sequence[bool]) -> np.ndarray:
+    params = np.asarray(params, dtype=float)
+    return params[:, [i for i, flag in enumerate(flags) if flag]]
+
+
+def normalized(params: np.ndarray) -> np.ndarray:
+    # Normalizes each column (parameter) to unit length so that parameters with
+    # different ranges contribute equally
+    params = np.array(params, dtype=float)
+    norm = np.linalg.norm(params, axis=0)
+    return params / np.where(norm == 0.0, 1.0, norm)
+
+
+def combine(stack: Sequence[np.ndarray], count: int) -> np.ndarray:
+    if not stack:
+        return np.zeros((count, count), dtype=float)
+    if len(stack) == 1:
+        return np.asarray(stack[0], dtype=float)
+    return np.add.reduce(stack, axis=0) / float(len(stack))
+
+
+def weighted(stack: Sequence[np.ndarray], weights: Sequence[float], count: int) -> np.ndarray:
+    # Weighted mean of distance matrices (plain mean when the weights sum to zero)
+    if not stack:
+        return np.zeros((count, count), dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    total = float(weights.sum())
+    if total <= 0.0:
+        weights = np.ones(len(stack), dtype=float)
+        total = float(len(stack))
+    return np.tensordot(weights, np.asarray(stack, dtype=float), axes=1) / total
+
+
+@dataclass(frozen=True)
+class Poses:
+    # A group's pose table: per bone (the target bone first), the (count, k)
+    # parameters of each enabled channel at every pose and the metric comparing them
+    count: int
+    channels: Tuple[Tuple[Channel, ...], ...]
+    weights: Tuple[float, ...]
+
+
+def poses_matrix(poses: Poses) -> np.ndarray:
+    # The mean of each bone's channel distances, weighted across bones
+    count = poses.count
+    stacks = [[pairwise(params, metric) for params, metric in items] for items in poses.channels]
+    if len(stacks) == 1:
+        return combine(stacks[0], count)
+    distances = []
+    weights = []
+    for index, (stack, weight) in enumerate(zip(stacks, poses.weights)):
+        # The target bone only counts if any of its channels are enabled
+        if stack or index > 0:
+            distances.append(combine(stack, count))
+            weights.append(weight)
+    return weighted(distances, weights, count)
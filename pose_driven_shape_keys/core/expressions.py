@@ -0,0 +1,49 @@
+
+from typing import Sequence, Tuple
+
+# Driver expression generators. Tokens pair a driver variable name with the
+# (stringified) center value it is compared against.
+
+
+def euclidean(tokens: Sequence[Tuple[str, str]]) -> str:
+    return f'sqrt({"+".join("pow("+a+"-"+b+",2.0)" for a,b in tokens)})'
+
+
+def quaternion(tokens: Sequence[Tuple[str, str]]) -> str:
+    return f'acos((2.0*pow(clamp({"+".join(["*".join(x) for x in tokens])},-1.0,1.0),2.0))-1.0)/pi'
+
+
+def swing_dot(values: Tuple[float, float, float, float], axis: str) -> str:
+    # The dot product of the rotated axis with the center's rotated axis
+    w, x, y, z = values
+    if axis == 'X':
+        a = str(1.0-2.0*(y*y+z*z))
+        b = str(2.0*(x*y+w*z))
+        c = str(2.0*(x*z-w*y))
+        return f'(1.0-2.0*(y*y+z*z))*{a}+2.0*(x*y+w*z)*{b}+2.0*(x*z-w*y)*{c}'
+    if axis == 'Y':
+        a = str(2.0*(x*y-w*z))
+        b = str(1.0-2.0*(x*x+z*z))
+        c = str(2.0*(y*z+w*x))
+        return f'2.0*(x*y-w*z)*{a}+(1.0-2.0*(x*x+z*z))*{b}+2.0*(y*z+w*x)*{c}'
+    a = str(2.0*(x*z+w*y))
+    b = str(2.0*(y*z-w*x))
+    c = str(1.0-2.0*(x*x+y*y))
+    return f'2.0*(x*z+w*y)*{a}+2.0*(y*z-w*x)*{b}+(1.0-2.0*(x*x+y*y))*{c}'
+
+
+def swing(values: Tuple[float, float, float, float], axis: str) -> str:
+    return f'((pi/2.0)-asin(clamp({swing_dot(values, axis)},-1.0,1.0)))/pi'
+
+
+def swing_chord(values: Tuple[float, float, float, float], axis: str) -> str:
+    return f'(1.0-({swing_dot(values, axis)}))/2.0'
+
+
+def quaternion_chord(tokens: Sequence[Tuple[str, str]]) -> str:
+    return f'1.0-pow({"+".join(["*".join(x) for x in tokens])},2.0)'
+
+
+def twist(tokens: Sequence[Tuple[str, float]]) -> str:
+    return f'fabs({tokens[0][0]}-{str(tokens[0][1])})/pi'
+
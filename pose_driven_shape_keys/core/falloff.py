@@ -0,0 +1,255 @@
+
+from dataclasses import dataclass
+from typing import Callable, Sequence, Tuple
+import numpy as np
+
+# Keyframes are (n, 6) arrays of [co.x, co.y, handle_left.x, handle_left.y,
+# handle_right.x, handle_right.y] sorted by co.x, mirroring an F-Curve's keyframe points.
+# Interpolation codes follow the F-Curve keyframe enum order.
+
+CONSTANT = 0
+LINEAR = 1
+BEZIER = 2
+
+INTERPOLATION_CODES = {'CONSTANT': CONSTANT, 'LINEAR': LINEAR, 'BEZIER': BEZIER}
+
+
+def segments(keyframes: np.ndarray) -> np.ndarray:
+    # Returns (..., n-1, 4, 2) bezier control points per segment with the handles
+    # corrected so that x increases monotonically, as Blender does before evaluation
+    keyframes = np.asarray(keyframes, dtype=float)
+    p0 = keyframes[..., :-1, 0:2]
+    p1 = keyframes[..., :-1, 4:6].copy()
+    p2 = keyframes[..., 1:, 2:4].copy()
+    p3 = keyframes[..., 1:, 0:2]
+
+    h1 = p0 - p1
+    h2 = p3 - p2
+    length = p3[..., 0] - p0[..., 0]
+    total = np.abs(h1[..., 0]) + np.abs(h2[..., 0])
+    fac = np.where(total > length, length / np.where(total == 0.0, 1.0, total), 1.0)[..., np.newaxis]
+    p1 = p0 - fac * h1
+    p2 = p3 - fac * h2
+    return np.stack((p0, p1, p2, p3), axis=-2)
+
+
+def bezier(p: np.ndarray, t: np.ndarray) -> np.ndarray:
+    u = 1.0 - t
+    return u*u*u*p[..., 0] + 3.0*u*u*t*p[..., 1] + 3.0*u*t*t*p[..., 2] + t*t*t*p[..., 3]
+
+
+def evaluate(keyframes: np.ndarray,
+             x: np.ndarray,
+             interpolation: Sequence[int]=None,
+             iterations: int=32) -> np.ndarray:
+    keyframes = np.asarray(keyframes, dtype=float)
+    x = np.asarray(x, dtype=float)
+    count = len(keyframes)
+
+    if count == 0:
+        return np.zeros_like(x)
+    if count == 1:
+        return np.full_like(x, keyframes[0, 1])
+
+    if interpolation is None:
+        interpolation = np.full(count, BEZIER)
+    interpolation = np.asarray(interpolation)
+
+    xs = keyframes[:, 0]
+    index = np.clip(np.searchsorted(xs, x, side='right') - 1, 0, count - 2)
+    result = solve(segments(keyframes)[index], interpolation[index], x, iterations)
+
+    # Constant extrapolation
+    result = np.where(x <= xs[0], keyframes[0, 1], result)
+    result = np.where(x >= xs[-1], keyframes[-1, 1], result)
+    return result
+
+
+def solve(control: np.ndarray, mode: np.ndarray, x: np.ndarray, iterations: int) -> np.ndarray:
+    # Evaluates the (..., 4, 2) segments at x
+    x0 = control[..., 0, 0]
+    x1 = control[..., 3, 0]
+    y0 = control[..., 0, 1]
+    y1 = control[..., 3, 1]
+    span = np.where(x1 > x0, x1 - x0, 1.0)
+    fraction = np.clip((x - x0) / span, 0.0, 1.0)
+
+    # Solve x(t) = x by bisection (x(t) is monotonic after handle correction)
+    lo = np.zeros_like(x)
+    hi = np.ones_like(x)
+    px = control[..., 0]
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        below = bezier(px, mid) < x
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    t = 0.5 * (lo + hi)
+
+    return np.where(mode == BEZIER, bezier(control[..., 1], t),
+                    np.where(mode == LINEAR, y0 + (y1 - y0) * fraction, y0))
+
+
+def pad(curves: Sequence[np.ndarray]) -> np.ndarray:
+    # Stacks the keyframes of several curves into an (m, k, 6) array, repeating
+    # the last keyframe of shorter curves (zero length segments are never reached)
+    size = max((len(x) for x in curves), default=0)
+    result = np.zeros((len(curves), size, 6), dtype=float)
+    for row, keyframes in zip(result, curves):
+        if len(keyframes):
+            row[:len(keyframes)] = keyframes
+            row[len(keyframes):] = keyframes[-1]
+    return result
+
+
+def evaluate_batch(keyframes: np.ndarray,
+                   x: np.ndarray,
+                   interpolation: np.ndarray=None,
+                   iterations: int=32) -> np.ndarray:
+    # Evaluates m curves, given as (m, k, 6) keyframes (see pad), each at one x
+    keyframes = np.asarray(keyframes, dtype=float)
+    x = np.asarray(x, dtype=float)
+    count = keyframes.shape[1]
+
+    if count == 0:
+        return np.zeros_like(x)
+    if count == 1:
+        return keyframes[:, 0, 1].copy()
+
+    if interpolation is None:
+        interpolation = np.full(keyframes.shape[:2], BEZIER)
+    interpolation = np.asarray(interpolation)
+
+    rows = np.arange(len(keyframes))
+    xs = keyframes[..., 0]
+    index = np.clip(np.sum(xs <= x[:, np.newaxis], axis=1) - 1, 0, count - 2)
+    result = solve(segments(keyframes)[rows, index], interpolation[rows, index], x, iterations)
+
+    result = np.where(x <= xs[:, 0], keyframes[:, 0, 1], result)
+    result = np.where(x >= xs[:, -1], keyframes[:, -1, 1], result)
+    return result
+
+
+def linear_keyframes(points: np.ndarray) -> np.ndarray:
+    # Keyframes for a polyline through (n, 2) points, with handles on the segment
+    # thirds so bezier interpolation reproduces straight segments
+    points = np.asarray(points, dtype=float)
+    previous = np.concatenate((points[:1], points[:-1]))
+    following = np.concatenate((points[1:], points[-1:]))
+    keyframes = np.empty((len(points), 6), dtype=float)
+    keyframes[:, 0:2] = points
+    keyframes[:, 2:4] = points + (previous - points) / 3.0
+    keyframes[:, 4:6] = points + (following - points) / 3.0
+    return keyframes
+
+
+def fold(keyframes: np.ndarray,
+         function: Callable[[np.ndarray], np.ndarray],
+         xs: np.ndarray,
+         interpolation: Sequence[int]=None) -> Tuple[np.ndarray, float]:
+    """Returns linear keyframes at xs approximating the curve of function(x), and
+    the largest difference from the exact composition between the samples.
+    """
+    xs = np.sort(np.asarray(xs, dtype=float))
+    ys = evaluate(keyframes, function(xs), interpolation)
+    result = linear_keyframes(np.stack((xs, ys), axis=-1))
+
+    error = 0.0
+    if len(xs) > 1:
+        t = np.array([0.25, 0.5, 0.75])
+        x = (xs[:-1, np.newaxis] + (xs[1:] - xs[:-1])[:, np.newaxis] * t).ravel()
+        y = (ys[:-1, np.newaxis] + (ys[1:] - ys[:-1])[:, np.newaxis] * t).ravel()
+        error = float(np.max(np.abs(evaluate(keyframes, function(x), interpolation) - y)))
+    return result, error
+
+
+# Lookup tables sample curves at evenly spaced xs between their first and last
+# keyframes, so evaluating them is a linear interpolation between two samples
+# instead of a bisection of the bezier segment. The number of samples is doubled
+# from TABLE_SAMPLES until interpolating between the samples stays within the
+# tolerance of the curve (measured at the quarters between samples), or until
+# TABLE_MAX_SAMPLES is reached.
+
+TABLE_SAMPLES = 64
+
+TABLE_MAX_SAMPLES = 8192
+
+TABLE_TOLERANCE = 1e-5
+
+
+@dataclass(frozen=True)
+class Table:
+    # (m,) first keyframe x and sample spacing of each curve
+    start: np.ndarray
+    step: np.ndarray
+    # (m, n) samples of each curve
+    values: np.ndarray
+    # Largest measured difference between the table and the curves
+    error: float
+
+
+def evaluate_grid(keyframes: np.ndarray, x: np.ndarray, interpolation: np.ndarray) -> np.ndarray:
+    # Evaluates m curves, given as (m, k, 6) keyframes, each at its row of (m, n) xs
+    m, n = x.shape
+    shape = (m * n,) + keyframes.shape[1:]
+    keyframes = np.broadcast_to(keyframes[:, np.newaxis], (m, n) + keyframes.shape[1:]).reshape(shape)
+    interpolation = np.broadcast_to(interpolation[:, np.newaxis], (m, n) + interpolation.shape[1:]).reshape(shape[:2])
+    return evaluate_batch(keyframes, x.ravel(), interpolation).reshape(m, n)
+
+
+def tabulate(keyframes: np.ndarray,
+             interpolation: np.ndarray=None,
+             tolerance: float=TABLE_TOLERANCE,
+             samples: int=TABLE_SAMPLES,
+             limit: int=TABLE_MAX_SAMPLES) -> Table:
+    """Returns the lookup table of m curves, given as (m, k, 6) keyframes (see pad)."""
+    keyframes = np.asarray(keyframes, dtype=float)
+    count = len(keyframes)
+    if keyframes.shape[1] == 0:
+        return Table(np.zeros(count), np.zeros(count), np.zeros((count, 2)), 0.0)
+    if interpolation is None:
+        interpolation = np.full(keyframes.shape[:2], BEZIER)
+    interpolation = np.asarray(interpolation)
+
+    start = keyframes[:, 0, 0]
+    span = np.maximum(keyframes[:, -1, 0] - start, 0.0)
+    fractions = np.array([0.25, 0.5, 0.75])
+    size = max(samples, 1)
+    while True:
+        step = span / size
+        xs = start[:, np.newaxis] + step[:, np.newaxis] * np.arange(size + 1)
+        values = evaluate_grid(keyframes, xs, interpolation)
+        x = (xs[:, :-1, np.newaxis] + step[:, np.newaxis, np.newaxis] * fractions).reshape(count, -1)
+        y = (values[:, :-1, np.newaxis] + (values[:, 1:] - values[:, :-1])[..., np.newaxis] * fractions).reshape(count, -1)
+        error = float(np.max(np.abs(evaluate_grid(keyframes, x, interpolation) - y), initial=0.0))
+        if error <= tolerance or size >= limit:
+            return Table(start, step, values, error)
+        size *= 2
+
+
+def stack(tables: Sequence[Table]) -> Table:
+    """Returns the lookup table of the curves of all the tables. Shorter tables are
+    padded with their last value, which lookup() would extrapolate anyway.
+    """
+    width = max(x.values.shape[1] for x in tables)
+    values = np.concatenate([np.pad(x.values, ((0, 0), (0, width - x.values.shape[1])), mode="edge")
+                             for x in tables])
+    return Table(np.concatenate([x.start for x in tables]),
+                 np.concatenate([x.step for x in tables]),
+                 values,
+                 max(x.error for x in tables))
+
+
+def lookup(table: Table, x: np.ndarray) -> np.ndarray:
+    """Evaluates the table's m curves at (..., m) xs, extrapolating constantly."""
+    x = np.asarray(x, dtype=float)
+    last = table.values.shape[1] - 1
+    step = np.where(table.step > 0.0, table.step, 1.0)
+    position = np.clip((x - table.start) / step, 0.0, last)
+    # Curves of a single x (zero steps) take their last value from that x on
+    position = np.where(table.step > 0.0, position, np.where(x >= table.start, last, 0.0))
+    index = np.minimum(position.astype(int), last - 1)
+    fraction = position - index
+    rows = np.arange(len(table.values))
+    a = table.values[rows, index]
+    b = table.values[rows, index + 1]
+    return a + (b - a) * fraction
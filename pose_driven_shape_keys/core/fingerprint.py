@@ -0,0 +1,50 @@
+
+import hashlib
+from typing import Any
+import numpy as np
+
+# Stable content hashes of configurations. Values are serialized with their type
+# (so 1, 1.0, "1" and True differ) and floats are rounded to PRECISION digits, so
+# round trips through single precision RNA properties don't change the hash.
+
+PRECISION = 6
+
+
+def update(hash: 'hashlib._Hash', value: Any) -> None:
+    if value is None:
+        hash.update(b"N;")
+    elif isinstance(value, (bool, np.bool_)):
+        hash.update(b"T;" if value else b"F;")
+    elif isinstance(value, (int, np.integer)):
+        hash.update(b"I%d;" % value)
+    elif isinstance(value, (float, np.floating)):
+        # Adding 0.0 turns -0.0 into 0.0
+        hash.update(b"R" + repr(round(float(value), PRECISION) + 0.0).encode() + b";")
+    elif isinstance(value, str):
+        data = value.encode()
+        hash.update(b"S%d:" % len(data))
+        hash.update(data)
+    elif isinstance(value, dict):
+        hash.update(b"D%d:" % len(value))
+        for name in sorted(value):
+            update(hash, name)
+            update(hash, value[name])
+    elif isinstance(value, np.ndarray):
+        data = np.round(np.asarray(value, dtype=float), PRECISION) + 0.0
+        hash.update(b"A" + repr(data.shape).encode() + b":")
+        hash.update(np.ascontiguousarray(data).tobytes())
+    else:
+        items = list(value)
+        hash.update(b"L%d:" % len(items))
+        for item in items:
+            update(hash, item)
+
+
+def fingerprint(*values: Any) -> str:
+    """Returns the hex digest of the given values (numbers, strings, sequences,
+    dictionaries and arrays, nested in any way).
+    """
+    hash = hashlib.blake2b(digest_size=16)
+    for value in values:
+        update(hash, value)
+    return hash.hexdigest()
@@ -0,0 +1,55 @@
+
+import hashlib
+from typing import Callable, Dict, Iterable, Sequence
+from .registry import NAMESPACE
+
+# Compiled distance kernels. Instead of a long scripted expression which Blender
+# re-parses and interprets on every evaluation, a driver can call a single
+# function in the driver namespace (pds_k) with the kernel's key and its variables.
+# Each kernel is the driver expression compiled once into a function, so center
+# values are constants folded into its code object. Kernels are keyed by a hash of
+# their source, so drivers only ever call the function they were generated with,
+# whichever Key (or copy of a Key) they belong to.
+
+NAME = "pds_k"
+
+Kernel = Callable[..., float]
+
+KERNELS: Dict[str, Kernel] = {}
+
+INFINITY = float("inf")
+
+
+def source(names: Sequence[str], expression: str) -> str:
+    return f'lambda {",".join(names)}: {expression}'
+
+
+def source_key(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def compile_kernel(text: str) -> Kernel:
+    return eval(compile(text, "<pds_kernel>", "eval"), dict(NAMESPACE))
+
+
+def define(key: str, text: str) -> Kernel:
+    kernel = compile_kernel(text)
+    KERNELS[key] = kernel
+    return kernel
+
+
+def discard(keys: Iterable[str]) -> None:
+    for key in keys:
+        KERNELS.pop(key, None)
+
+
+def call(key: str, *values: float) -> float:
+    # Unknown kernels (i.e. before the kernels of a file are defined) evaluate to
+    # an infinite distance, leaving the shape key inactive, rather than raising
+    # which would flag the driver as invalid
+    kernel = KERNELS.get(key)
+    return kernel(*values) if kernel is not None else INFINITY
+
+
+def expression(key: str, names: Sequence[str]) -> str:
+    return f'{NAME}("{key}",{",".join(names)})'
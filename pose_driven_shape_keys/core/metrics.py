@@ -0,0 +1,53 @@
+
+import numpy as np
+from .rotation import axis_vector
+
+# Batched distance metrics. Arguments broadcast against each other over all but the
+# last axis, which holds the components of each value.
+
+
+def euclidean(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.sum(np.square(np.asarray(a, dtype=float) - np.asarray(b, dtype=float)), axis=-1))
+
+
+def angle(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs(np.asarray(a, dtype=float)[..., 0] - np.asarray(b, dtype=float)[..., 0]) / np.pi
+
+
+def quaternion(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    dot = np.clip(np.sum(np.asarray(a, dtype=float) * np.asarray(b, dtype=float), axis=-1), -1.0, 1.0)
+    return np.arccos(np.clip(2.0 * dot * dot - 1.0, -1.0, 1.0)) / np.pi
+
+
+def direction(a: np.ndarray, b: np.ndarray, axis: str) -> np.ndarray:
+    dot = np.sum(axis_vector(a, axis) * axis_vector(b, axis), axis=-1)
+    return (np.pi / 2.0 - np.arcsin(np.clip(dot, -1.0, 1.0))) / np.pi
+
+
+# Chord distances: cheap monotonic proxies of the angular metrics above, mapped
+# back to them by chord_angle
+
+
+def quaternion_chord(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    dot = np.sum(np.asarray(a, dtype=float) * np.asarray(b, dtype=float), axis=-1)
+    return 1.0 - dot * dot
+
+
+def direction_chord(a: np.ndarray, b: np.ndarray, axis: str) -> np.ndarray:
+    return (1.0 - np.sum(axis_vector(a, axis) * axis_vector(b, axis), axis=-1)) / 2.0
+
+
+def chord_angle(value: np.ndarray) -> np.ndarray:
+    return np.arccos(np.clip(1.0 - 2.0 * np.asarray(value, dtype=float), -1.0, 1.0)) / np.pi
+
+
+def direction_x(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return direction(a, b, 'X')
+
+
+def direction_y(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return direction(a, b, 'Y')
+
+
+def direction_z(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return direction(a, b, 'Z')
@@ -0,0 +1,509 @@
+
+import ast
+from copy import deepcopy
+from dataclasses import dataclass
+from math import pi
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from .registry import NAMESPACE
+
+# Generated driver expressions embed full precision center values and repeat
+# subexpressions. minimize() parses an expression into a Python AST and rewrites it:
+#
+#   constant folding       arithmetic and namespace calls on constants, including
+#                          pi, are evaluated, and constant factors (terms) of
+#                          products (sums) are gathered into one
+#   strength reduction     pow(a,2) -> a*a, pow(a,0.5) -> sqrt(a), 2*x/c -> (2/c)*x,
+#                          x*1 -> x, x+0 -> x, x+-y -> x-y etc.
+#   subexpression sharing  with assign, repeated subexpressions are computed once
+#                          using assignment expressions, (_c0:=a-b)*_c0
+#
+# Numbers are written with precision significant digits (all digits by default).
+# Rewrites don't always pay off (expanding pow(a-b,2) repeats a-b, sharing a short
+# subexpression costs more than it saves), so several candidates are generated and
+# the shortest is kept.
+#
+# Assignment expressions aren't supported by Blender's simple expression evaluator,
+# so sharing is only used for expressions run by Python (kernels). Kernels always
+# square as (_c0:=a-b)*_c0, which Python evaluates faster than pow(a-b,2).
+
+CONSTANTS = {"pi": pi}
+
+FUNCTIONS: Dict[str, Callable[..., float]] = {name: value for name, value in NAMESPACE.items() if callable(value)}
+
+PREFIX = "_c"
+
+OPERATORS = {
+    ast.Add: ("+", 10, lambda a, b: a + b),
+    ast.Sub: ("-", 10, lambda a, b: a - b),
+    ast.Mult: ("*", 11, lambda a, b: a * b),
+    ast.Div: ("/", 11, lambda a, b: a / b),
+    ast.Mod: ("%", 11, lambda a, b: a % b),
+    ast.FloorDiv: ("//", 11, lambda a, b: a // b),
+    ast.Pow: ("**", 13, lambda a, b: a ** b),
+    }
+
+COMPARISONS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    }
+
+# Precedence of unary minus, and of names, numbers and calls
+UNARY = 12
+ATOM = 14
+
+
+@dataclass(frozen=True)
+class Minimized:
+    expression: str
+    # Length of the original expression
+    size: int
+
+    @property
+    def length(self) -> int:
+        return len(self.expression)
+
+    @property
+    def reduction(self) -> float:
+        return 1.0 - self.length / self.size if self.size else 0.0
+
+
+def constant(node: ast.AST) -> Optional[float]:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    return None
+
+
+def number(value: float) -> ast.Constant:
+    return ast.Constant(value=float(value))
+
+
+class Names:
+    # Allocates the names of shared subexpressions, avoiding the variables' names
+
+    def __init__(self, used: Sequence[str]) -> None:
+        self.used = set(used)
+        self.index = 0
+
+    def new(self) -> str:
+        name = f'{PREFIX}{self.index}'
+        while name in self.used:
+            self.index += 1
+            name = f'{PREFIX}{self.index}'
+        self.used.add(name)
+        self.index += 1
+        return name
+
+
+# How pow(a,2) is rewritten when a isn't a name or number: None keeps the call,
+# otherwise a function of a returning the product
+Square = Optional[Callable[[ast.AST], ast.AST]]
+
+
+def duplicate(base: ast.AST) -> ast.AST:
+    return binary(ast.Mult(), base, deepcopy(base))
+
+
+def binder(names: Names) -> Callable[[ast.AST], ast.AST]:
+    def bind(base: ast.AST) -> ast.AST:
+        name = names.new()
+        return binary(ast.Mult(),
+                      ast.NamedExpr(target=ast.Name(id=name, ctx=ast.Store()), value=base),
+                      ast.Name(id=name, ctx=ast.Load()))
+    return bind
+
+
+def fold(node: ast.AST, square: Square=None) -> ast.AST:
+    # Folds the node's children, then the node itself
+    if isinstance(node, ast.Name):
+        value = CONSTANTS.get(node.id)
+        return number(value) if value is not None else node
+
+    if isinstance(node, ast.UnaryOp):
+        operand = fold(node.operand, square)
+        value = constant(operand)
+        if value is not None:
+            if isinstance(node.op, ast.USub):
+                return number(-value)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+        return ast.UnaryOp(op=node.op, operand=operand)
+
+    if isinstance(node, ast.BinOp):
+        return binary(node.op, fold(node.left, square), fold(node.right, square))
+
+    if isinstance(node, ast.Call):
+        args = [fold(x, square) for x in node.args]
+        name = node.func.id
+        values = [constant(x) for x in args]
+        function = FUNCTIONS.get(name)
+        if function is not None and None not in values:
+            try:
+                return number(function(*values))
+            except (ArithmeticError, ValueError): pass
+        if name == "pow" and len(args) == 2:
+            return power(args[0], values[1], node, square)
+        return ast.Call(func=node.func, args=args, keywords=[])
+
+    if isinstance(node, ast.IfExp):
+        return ast.IfExp(test=fold(node.test, square), body=fold(node.body, square), orelse=fold(node.orelse, square))
+
+    if isinstance(node, ast.Compare):
+        return ast.Compare(left=fold(node.left, square), ops=node.ops,
+                           comparators=[fold(x, square) for x in node.comparators])
+
+    if isinstance(node, ast.BoolOp):
+        return ast.BoolOp(op=node.op, values=[fold(x, square) for x in node.values])
+
+    return node
+
+
+def power(base: ast.AST, exponent: Optional[float], node: ast.Call, square: Square) -> ast.AST:
+    if exponent == 1.0:
+        return base
+    if exponent == 0.5:
+        return ast.Call(func=ast.Name(id="sqrt", ctx=ast.Load()), args=[base], keywords=[])
+    if exponent == 2.0:
+        if isinstance(base, (ast.Name, ast.Constant)):
+            return duplicate(base)
+        if square is not None:
+            return square(base)
+    if exponent == 3.0 and isinstance(base, ast.Name):
+        return binary(ast.Mult(), binary(ast.Mult(), base, deepcopy(base)), deepcopy(base))
+    if exponent == -1.0:
+        return binary(ast.Div(), number(1.0), base)
+    return ast.Call(func=node.func, args=[base, node.args[1] if exponent is None else number(exponent)], keywords=[])
+
+
+def terms(node: ast.AST, op: type) -> List[ast.AST]:
+    # The operands of a chain of op (a+b+c or a*b*c). Sums include the terms
+    # subtracted by chain() (x-2*y-1 is x+(-2*y)+(-1)).
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, op):
+            return terms(node.left, op) + terms(node.right, op)
+        if op is ast.Add and isinstance(node.op, ast.Sub):
+            return terms(node.left, op) + [negate(node.right)]
+    return [node]
+
+
+def negate(node: ast.AST) -> ast.AST:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return node.operand
+    return binary(ast.Mult(), number(-1.0), node)
+
+
+def negated(node: ast.AST) -> Optional[ast.AST]:
+    # The node without its leading minus sign, if it has one (-2 -> 2, -x -> x,
+    # -2*x -> 2*x), for sums to subtract it
+    value = constant(node)
+    if value is not None:
+        return number(-value) if value < 0.0 else None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return node.operand
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mult, ast.Div)):
+        left = negated(node.left)
+        if left is None:
+            return None
+        if isinstance(node.op, ast.Mult) and constant(left) == 1.0:
+            return node.right
+        return ast.BinOp(left=left, op=node.op, right=node.right)
+    return None
+
+
+def binary(op: ast.operator, left: ast.AST, right: ast.AST) -> ast.AST:
+    a = constant(left)
+    b = constant(right)
+    if a is not None and b is not None:
+        try:
+            return number(OPERATORS[type(op)][2](a, b))
+        except (ArithmeticError, ValueError):
+            return ast.BinOp(left=left, op=op, right=right)
+
+    if isinstance(op, (ast.Mult, ast.Div)) and b == 1.0:
+        return left
+
+    if isinstance(op, ast.Div) and b is not None and b != 0.0:
+        # Dividing a product with a constant factor folds into that factor
+        items = terms(left, ast.Mult)
+        if any(constant(x) is not None for x in items):
+            return chain(ast.Mult(), items + [number(1.0 / b)])
+
+    if isinstance(op, ast.Sub):
+        # a-b is a+(-b), so that constant terms fold together
+        return binary(ast.Add(), left, negate(right))
+
+    if isinstance(op, (ast.Add, ast.Mult)):
+        return chain(op, terms(left, type(op)) + terms(right, type(op)))
+
+    return ast.BinOp(left=left, op=op, right=right)
+
+
+def chain(op: ast.operator, items: List[ast.AST]) -> ast.AST:
+    # Rebuilds a sum or product with its constants gathered into one, placed first
+    # in products (2*x*y) and last in sums (x+y-1, but 1-x-y)
+    product = isinstance(op, ast.Mult)
+    value = 1.0 if product else 0.0
+    found = 0
+    rest = []
+    for item in items:
+        x = constant(item)
+        if x is None:
+            rest.append(item)
+        else:
+            value = value * x if product else value + x
+            found += 1
+
+    if not rest:
+        return number(value)
+    if found == 0 or value == (1.0 if product else 0.0):
+        items = rest
+    elif product:
+        if value == -1.0:
+            items = [ast.UnaryOp(op=ast.USub(), operand=rest[0])] + rest[1:]
+        else:
+            items = [number(value)] + rest
+    elif value > 0.0 and negated(rest[0]) is not None:
+        # 1-x rather than -x+1
+        items = [number(value)] + rest
+    else:
+        items = rest + [number(value)]
+
+    result = items[0]
+    for item in items[1:]:
+        positive = None if product else negated(item)
+        if positive is not None:
+            result = ast.BinOp(left=result, op=ast.Sub(), right=positive)
+        else:
+            result = ast.BinOp(left=result, op=op, right=item)
+    return result
+
+
+def walk(node: ast.AST, visit: Callable[[ast.AST], None]) -> None:
+    # Visits the subexpressions which are always evaluated, in evaluation order
+    visit(node)
+    if isinstance(node, ast.BinOp):
+        walk(node.left, visit)
+        walk(node.right, visit)
+    elif isinstance(node, ast.UnaryOp):
+        walk(node.operand, visit)
+    elif isinstance(node, ast.Call):
+        for item in node.args:
+            walk(item, visit)
+    elif isinstance(node, ast.NamedExpr):
+        walk(node.value, visit)
+    elif isinstance(node, ast.Compare):
+        walk(node.left, visit)
+        for item in node.comparators:
+            walk(item, visit)
+    elif isinstance(node, ast.IfExp):
+        walk(node.test, visit)
+    elif isinstance(node, ast.BoolOp):
+        walk(node.values[0], visit)
+
+
+def replace(node: ast.AST, function: Callable[[ast.AST], Optional[ast.AST]]) -> ast.AST:
+    # Replaces the subexpressions for which function returns a node, in evaluation order
+    result = function(node)
+    if result is not None:
+        return result
+    if isinstance(node, ast.BinOp):
+        node.left = replace(node.left, function)
+        node.right = replace(node.right, function)
+    elif isinstance(node, ast.UnaryOp):
+        node.operand = replace(node.operand, function)
+    elif isinstance(node, ast.Call):
+        node.args = [replace(x, function) for x in node.args]
+    elif isinstance(node, ast.NamedExpr):
+        node.value = replace(node.value, function)
+    elif isinstance(node, ast.Compare):
+        node.left = replace(node.left, function)
+        node.comparators = [replace(x, function) for x in node.comparators]
+    elif isinstance(node, ast.IfExp):
+        node.test = replace(node.test, function)
+    elif isinstance(node, ast.BoolOp):
+        node.values[0] = replace(node.values[0], function)
+    return node
+
+
+def bound(node: ast.AST, target: str, name: str) -> ast.AST:
+    # Binds the first evaluated occurrence of the target subexpression to name and
+    # reads the name everywhere else
+    state = {"bound": False}
+
+    def substitute(item: ast.AST) -> Optional[ast.AST]:
+        if isinstance(item, (ast.BinOp, ast.Call, ast.UnaryOp)) and ast.dump(item) == target:
+            if state["bound"]:
+                return ast.Name(id=name, ctx=ast.Load())
+            state["bound"] = True
+            return ast.NamedExpr(target=ast.Name(id=name, ctx=ast.Store()), value=item)
+        return None
+
+    return replace(node, substitute)
+
+
+def share(node: ast.AST, names: Names, precision: Optional[int]) -> ast.AST:
+    # Repeatedly binds the largest repeated subexpression whose binding shortens
+    # the expression
+    length = len(emit(node, precision))
+    while True:
+        counts: Dict[str, int] = {}
+        sizes: Dict[str, int] = {}
+
+        def visit(item: ast.AST) -> None:
+            if isinstance(item, (ast.BinOp, ast.Call, ast.UnaryOp)):
+                key = ast.dump(item)
+                counts[key] = counts.get(key, 0) + 1
+                sizes[key] = len(key)
+
+        walk(node, visit)
+        repeated = sorted((key for key, count in counts.items() if count > 1), key=sizes.get, reverse=True)
+        name = names.new()
+        for target in repeated:
+            result = bound(deepcopy(node), target, name)
+            size = len(emit(result, precision))
+            if size < length:
+                node = result
+                length = size
+                break
+        else:
+            return node
+
+
+def literal(value: float, precision: Optional[int]) -> str:
+    value = float(value) + 0.0
+    if value == pi:
+        return "pi"
+    if precision is None:
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+    text = f'{value:.{precision}g}'
+    return "0" if text == "-0" else text
+
+
+def emit(node: ast.AST, precision: Optional[int]) -> str:
+    return text(node, precision)[0]
+
+
+def text(node: ast.AST, precision: Optional[int]) -> tuple:
+    # Returns the node's source and its precedence
+    if isinstance(node, ast.Constant):
+        if type(node.value) in (int, float):
+            result = literal(node.value, precision)
+            return result, (UNARY if result.startswith("-") else ATOM)
+        return repr(node.value), ATOM
+
+    if isinstance(node, ast.Name):
+        return node.id, ATOM
+
+    if isinstance(node, ast.Call):
+        return f'{node.func.id}({",".join(emit(x, precision) for x in node.args)})', ATOM
+
+    if isinstance(node, ast.UnaryOp):
+        symbol = {ast.USub: "-", ast.UAdd: "+", ast.Not: "not "}[type(node.op)]
+        level = 4 if isinstance(node.op, ast.Not) else UNARY
+        operand, inner = text(node.operand, precision)
+        if inner < level or (inner == UNARY and symbol in operand[:1]):
+            operand = f'({operand})'
+        return symbol + operand, level
+
+    if isinstance(node, ast.BinOp):
+        symbol, level, _ = OPERATORS[type(node.op)]
+        left, a = text(node.left, precision)
+        right, b = text(node.right, precision)
+        if a < level or (a == level and level == 13):
+            left = f'({left})'
+        if b < level or (b == level and level != 13):
+            right = f'({right})'
+        return f'{left}{symbol}{right}', level
+
+    if isinstance(node, ast.NamedExpr):
+        return f'({node.target.id}:={emit(node.value, precision)})', ATOM
+
+    if isinstance(node, ast.Compare):
+        parts = [parenthesized(node.left, 6, precision)]
+        for op, item in zip(node.ops, node.comparators):
+            parts.append(COMPARISONS[type(op)])
+            parts.append(parenthesized(item, 6, precision))
+        return "".join(parts), 5
+
+    if isinstance(node, ast.BoolOp):
+        symbol, level = (" and ", 3) if isinstance(node.op, ast.And) else (" or ", 2)
+        return symbol.join(parenthesized(x, level + 1, precision) for x in node.values), level
+
+    if isinstance(node, ast.IfExp):
+        return (f'{parenthesized(node.body, 2, precision)} if {parenthesized(node.test, 2, precision)} '
+                f'else {parenthesized(node.orelse, 1, precision)}'), 1
+
+    raise ValueError(f'Unsupported expression node {type(node).__name__}')
+
+
+def parenthesized(node: ast.AST, level: int, precision: Optional[int]) -> str:
+    result, inner = text(node, precision)
+    return result if inner >= level else f'({result})'
+
+
+def supported(node: ast.AST) -> bool:
+    for item in ast.walk(node):
+        if isinstance(item, ast.Call):
+            if not isinstance(item.func, ast.Name) or item.keywords:
+                return False
+        elif isinstance(item, ast.UnaryOp):
+            if isinstance(item.op, ast.Invert):
+                return False
+        elif isinstance(item, ast.BinOp):
+            if type(item.op) not in OPERATORS:
+                return False
+        elif isinstance(item, ast.Compare):
+            if any(type(x) not in COMPARISONS for x in item.ops):
+                return False
+        elif not isinstance(item, (ast.Expression, ast.Constant, ast.Name, ast.BoolOp, ast.IfExp,
+                                   ast.NamedExpr, ast.operator, ast.unaryop, ast.cmpop,
+                                   ast.boolop, ast.expr_context)):
+            return False
+    return True
+
+
+def minimize(expression: str,
+             precision: Optional[int]=None,
+             assign: Optional[bool]=False,
+             names: Optional[Sequence[str]]=()) -> Minimized:
+    """Returns the shortest equivalent of a driver expression, with numbers written
+    with precision significant digits (all by default) and, if assign, repeated
+    subexpressions computed once. names are the expression's variables, which
+    shared subexpressions must not shadow. Expressions using syntax other than
+    arithmetic, calls, comparisons and conditionals are returned unchanged.
+    """
+    size = len(expression)
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return Minimized(expression, size)
+    if not supported(tree):
+        return Minimized(expression, size)
+    body = tree.body
+    if assign:
+        allocated = Names(names)
+        node = fold(body, binder(allocated))
+        candidates = [node, share(deepcopy(node), allocated, precision)]
+    else:
+        candidates = [fold(body), fold(body, duplicate), body]
+    results = [emit(x, precision) for x in candidates]
+    # Folding never lengthens an expression by much, but writing every digit of
+    # folded constants can
+    if precision is None and not assign:
+        results.append(expression)
+    return Minimized(min(results, key=len), size)
+
+
+def report(items: Sequence[Minimized]) -> Dict[str, Any]:
+    size = sum(x.size for x in items)
+    length = sum(x.length for x in items)
+    return {
+        "expressions": len(items),
+        "size": size,
+        "length": length,
+        "reduction": 1.0 - length / size if size else 0.0,
+        }
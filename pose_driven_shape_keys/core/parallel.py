@@ -0,0 +1,29 @@
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+# NumPy releases the GIL in its kernels, so the distance matrices and radii of
+# independent groups can be solved concurrently on worker threads. Workers must
+# only be given data snapshot on the main thread (NumPy arrays, not RNA), as
+# Blender's data isn't safe to access from other threads.
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def workers(count: Optional[int]=0) -> int:
+    # The number of worker threads, one per CPU unless given
+    return count if count and count > 0 else (os.cpu_count() or 1)
+
+
+def run(function: Callable[[T], R], items: Iterable[T], count: Optional[int]=0) -> List[R]:
+    """Returns the results of function for each item, computed on count worker
+    threads (one per CPU by default, on the calling thread for a single worker).
+    """
+    items = list(items)
+    count = min(workers(count), len(items))
+    if count <= 1:
+        return [function(x) for x in items]
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="pds") as pool:
+        return list(pool.map(function, items))
@@ -0,0 +1,11 @@
+
+import numpy as np
+
+
+def pose_radii(distance_matrix: np.ndarray, atol: float=0.001, default: float=0.0) -> np.ndarray:
+    # The distance from each pose to its nearest neighbour, ignoring coincident poses.
+    # Poses without a neighbour get the default radius.
+    matrix = np.asarray(distance_matrix, dtype=float)
+    masked = np.where(np.isclose(matrix, 0.0, rtol=0.0, atol=atol), np.inf, matrix)
+    radii = masked.min(axis=-1, initial=np.inf)
+    return np.where(np.isinf(radii), default, radii)
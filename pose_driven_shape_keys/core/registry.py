@@ -0,0 +1,164 @@
+
+from dataclasses import dataclass
+from functools import partial
+from math import acos, asin, fabs, pi, sqrt
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+from . import expressions, metrics, rotation
+
+# Each distance metric is defined once here: the batched kernel used for distance
+# matrices and radii, the generator for the equivalent driver expression, the
+# transform channels its driver reads and its natural range.
+
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    # Batched distance between parameter arrays (see core.metrics)
+    kernel: Callable[[np.ndarray, np.ndarray], np.ndarray]
+    # Driver expression for the distance from a center, given the variable names
+    # and the center's parameters
+    expression: Callable[[Sequence[str], Sequence[float]], str]
+    # Transform types of the driver variables (ROT_W etc.). Empty when the caller
+    # chooses the variables, as for euclidean distances of enabled components.
+    variables: Tuple[str, ...] = ()
+    # Upper bound of the metric, None if unbounded
+    scale: Optional[float] = None
+    # Maps rotation quaternions to the metric's parameters
+    params: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    # Name of a cheaper monotonic proxy of the metric
+    proxy: Optional[str] = None
+    # For proxies, maps the proxy's values to the values of the metric it stands for
+    remap: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(x.rpartition("_")[2].lower() for x in self.variables)
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register(metric: Metric) -> Metric:
+    METRICS[metric.name] = metric
+    return metric
+
+
+def metric(name: str) -> Metric:
+    return METRICS[name]
+
+
+def expression_euclidean(names: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.euclidean([(a, str(b)) for a, b in zip(names, values)])
+
+
+def expression_quaternion(names: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.quaternion([(a, str(b)) for a, b in zip(names, values)])
+
+
+def expression_swing(axis: str, _: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.swing(tuple(values), axis)
+
+
+def expression_swing_chord(axis: str, _: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.swing_chord(tuple(values), axis)
+
+
+def expression_quaternion_chord(names: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.quaternion_chord([(a, str(b)) for a, b in zip(names, values)])
+
+
+def expression_twist(names: Sequence[str], values: Sequence[float]) -> str:
+    return expressions.twist([(names[0], values[0])])
+
+
+def params_twist(axis: str, q: np.ndarray) -> np.ndarray:
+    return rotation.twist(q, axis)[..., np.newaxis]
+
+
+register(Metric("euclidean", metrics.euclidean, expression_euclidean))
+
+register(Metric("quaternion", metrics.quaternion, expression_quaternion,
+                ("ROT_W", "ROT_X", "ROT_Y", "ROT_Z"), 1.0, np.asarray, "quaternion_chord"))
+
+register(Metric("quaternion_chord", metrics.quaternion_chord, expression_quaternion_chord,
+                ("ROT_W", "ROT_X", "ROT_Y", "ROT_Z"), 1.0, np.asarray, None, metrics.chord_angle))
+
+for axis in "XYZ":
+    register(Metric(f'swing_{axis.lower()}',
+                    partial(metrics.direction, axis=axis),
+                    partial(expression_swing, axis),
+                    ("ROT_W", "ROT_X", "ROT_Y", "ROT_Z"), 1.0, np.asarray, f'swing_chord_{axis.lower()}'))
+
+    register(Metric(f'swing_chord_{axis.lower()}',
+                    partial(metrics.direction_chord, axis=axis),
+                    partial(expression_swing_chord, axis),
+                    ("ROT_W", "ROT_X", "ROT_Y", "ROT_Z"), 1.0, np.asarray, None, metrics.chord_angle))
+
+    register(Metric(f'twist_{axis.lower()}',
+                    metrics.angle,
+                    expression_twist,
+                    (f'ROT_{axis}',), 1.0, partial(params_twist, axis)))
+
+
+def rotation_metric(mode: str, axis: str, approximate: Optional[bool]=False) -> Metric:
+    if approximate:
+        metric = rotation_metric(mode, axis)
+        return METRICS[metric.proxy] if metric.proxy else metric
+    if mode == 'SWING':
+        return METRICS[f'swing_{axis.lower()}']
+    if mode == 'TWIST':
+        return METRICS[f'twist_{axis.lower()}']
+    if mode == 'QUATERNION':
+        return METRICS["quaternion"]
+    return METRICS["euclidean"]
+
+
+# Names available to driver expressions (a subset of Blender's driver namespace)
+NAMESPACE = {
+    "acos": acos,
+    "asin": asin,
+    "clamp": lambda value, lo=0.0, hi=1.0: min(max(value, lo), hi),
+    "fabs": fabs,
+    "pi": pi,
+    "pow": pow,
+    "sqrt": sqrt,
+    }
+
+
+def remap_error(metric: Metric, samples: Optional[int]=1000, seed: Optional[int]=0) -> float:
+    """Returns the largest difference between a proxy's remapped values and the
+    values of the metric it stands for, for random pairs of rotations.
+    """
+    exact = next(x for x in METRICS.values() if x.proxy == metric.name)
+    rng = np.random.default_rng(seed)
+    q = rng.normal(size=(2, samples, 4))
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    q = np.where(q[..., :1] < 0.0, -q, q)
+    a = metric.remap(metric.kernel(metric.params(q[0]), metric.params(q[1])))
+    b = exact.kernel(exact.params(q[0]), exact.params(q[1]))
+    return float(np.max(np.abs(a - b)))
+
+
+def equivalence(metric: Metric, samples: Optional[int]=1000, seed: Optional[int]=0) -> float:
+    """Returns the largest difference between the metric's kernel and its driver
+    expression evaluated for random pairs of centers and poses.
+    """
+    rng = np.random.default_rng(seed)
+    if metric.params is not None:
+        q = rng.normal(size=(2, samples, 4))
+        q /= np.linalg.norm(q, axis=-1, keepdims=True)
+        q = np.where(q[..., :1] < 0.0, -q, q)
+        centers, poses = metric.params(q[0]), metric.params(q[1])
+        names = metric.names
+    else:
+        centers, poses = rng.uniform(-2.0, 2.0, size=(2, samples, 3))
+        names = ("x", "y", "z")
+
+    expected = metric.kernel(centers, poses)
+    error = 0.0
+    for center, pose, value in zip(centers.tolist(), poses.tolist(), expected.tolist()):
+        code = compile(metric.expression(names, center), "<driver>", "eval")
+        result = eval(code, dict(NAMESPACE), dict(zip(names, pose)))
+        error = max(error, abs(result - value))
+    return error
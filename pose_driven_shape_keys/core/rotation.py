@@ -0,0 +1,66 @@
+
+from typing import Tuple
+import numpy as np
+
+AXIS_INDEX = {'X': 1, 'Y': 2, 'Z': 3}
+
+
+def multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack((aw*bw - ax*bx - ay*by - az*bz,
+                     aw*bx + ax*bw + ay*bz - az*by,
+                     aw*by - ax*bz + ay*bw + az*bx,
+                     aw*bz + ax*by - ay*bx + az*bw), axis=-1)
+
+
+def swing_twist(q: np.ndarray, axis: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Equivalent to mathutils.Quaternion.to_swing_twist(axis). Returns the swing
+    # quaternions and the twist angles.
+    q = np.asarray(q, dtype=float)
+    q = np.where(q[..., :1] < 0.0, -q, q)
+    index = AXIS_INDEX[axis]
+    t = np.arctan2(q[..., index], q[..., 0])
+    twist_inv = np.zeros(q.shape, dtype=float)
+    twist_inv[..., 0] = np.cos(t)
+    twist_inv[..., index] = -np.sin(t)
+    return multiply(q, twist_inv), 2.0 * t
+
+
+def twist(q: np.ndarray, axis: str) -> np.ndarray:
+    return swing_twist(q, axis)[1]
+
+
+def swing(q: np.ndarray, axis: str) -> np.ndarray:
+    return swing_twist(q, axis)[0]
+
+
+def axis_vector(q: np.ndarray, axis: str) -> np.ndarray:
+    # The direction of the rotated basis vector for axis (a column of the rotation matrix)
+    q = np.asarray(q, dtype=float)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    if axis == 'X':
+        v = (1.0-2.0*(y*y+z*z), 2.0*(x*y+w*z), 2.0*(x*z-w*y))
+    elif axis == 'Y':
+        v = (2.0*(x*y-w*z), 1.0-2.0*(x*x+z*z), 2.0*(y*z+w*x))
+    else:
+        v = (2.0*(x*z+w*y), 2.0*(y*z-w*x), 1.0-2.0*(x*x+y*y))
+    return np.stack(v, axis=-1)
+
+
+def swing_vector(q: np.ndarray, axis: str) -> np.ndarray:
+    # Swing as a 2D rotation vector (the components orthogonal to the twist axis), as
+    # displayed for the legacy pose driver's swing rotation.
+    s = swing(q, axis)
+    index = AXIS_INDEX[axis]
+    other = [i for i in (1, 2, 3) if i != index]
+    sin_s = np.hypot(s[..., other[0]], s[..., other[1]])
+    cos_s = s[..., 0]
+    safe = np.where(sin_s > 0.0, sin_s, 1.0)
+    angle = np.where(sin_s < cos_s,
+                     2.0 * np.arcsin(np.clip(sin_s, -1.0, 1.0)),
+                     2.0 * np.arccos(np.clip(cos_s, -1.0, 1.0)))
+    scale = np.where(sin_s > 0.0, angle / safe, 0.0)
+    return np.stack((s[..., other[0]] * scale, s[..., other[1]] * scale), axis=-1)
@@ -0,0 +1,146 @@
+
+from typing import Tuple
+import numpy as np
+from .rotation import multiply
+
+# Matrices are (..., 4, 4) arrays in row-major order (the layout of np.array(mathutils.Matrix)).
+# Flattened matrices use Blender's column-major property layout.
+
+
+def unflatten(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return np.swapaxes(values.reshape(values.shape[:-1] + (4, 4)), -1, -2)
+
+
+def flatten(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=float)
+    return np.swapaxes(matrix, -1, -2).reshape(matrix.shape[:-2] + (16,))
+
+
+def location(matrix: np.ndarray) -> np.ndarray:
+    return np.asarray(matrix, dtype=float)[..., :3, 3].copy()
+
+
+def scale(matrix: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(np.asarray(matrix, dtype=float)[..., :3, :3], axis=-2)
+
+
+def rotation_matrix(matrix: np.ndarray) -> np.ndarray:
+    basis = np.asarray(matrix, dtype=float)[..., :3, :3]
+    size = np.linalg.norm(basis, axis=-2)
+    size = np.where(size == 0.0, 1.0, size)
+    return basis / size[..., np.newaxis, :]
+
+
+def quaternion(matrix: np.ndarray) -> np.ndarray:
+    m = rotation_matrix(matrix)
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+
+    # Shepperd's method, evaluated for all four cases and selected per element
+    trace = m00 + m11 + m22
+    candidates = np.stack((
+        np.stack((1.0+trace, m21-m12, m02-m20, m10-m01), axis=-1),
+        np.stack((m21-m12, 1.0+m00-m11-m22, m01+m10, m02+m20), axis=-1),
+        np.stack((m02-m20, m01+m10, 1.0-m00+m11-m22, m12+m21), axis=-1),
+        np.stack((m10-m01, m02+m20, m12+m21, 1.0-m00-m11+m22), axis=-1),
+        ), axis=-2)
+    choice = np.argmax(np.stack((trace, m00, m11, m22), axis=-1), axis=-1)
+    q = np.take_along_axis(candidates, choice[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    # Canonical form with a non-negative W component
+    return np.where(q[..., :1] < 0.0, -q, q)
+
+
+# The (i, j, k) axes and parity of each euler order, as Blender's rotation order table
+EULER_ORDERS = {
+    'XYZ': (0, 1, 2, False),
+    'XZY': (0, 2, 1, True),
+    'YXZ': (1, 0, 2, True),
+    'YZX': (1, 2, 0, False),
+    'ZXY': (2, 0, 1, False),
+    'ZYX': (2, 1, 0, True),
+    }
+
+
+def euler(matrix: np.ndarray, order: str='XYZ') -> np.ndarray:
+    # Angles are returned in XYZ component order whatever the rotation order. Of
+    # the two equivalent solutions the one with the smallest sum of absolute angles
+    # is chosen, as mathutils does.
+    i, j, k, parity = EULER_ORDERS[order]
+    m = rotation_matrix(matrix)
+    cy = np.hypot(m[..., i, i], m[..., j, i])
+    regular = cy > 16.0 * np.finfo(np.float32).eps
+
+    a = np.empty(m.shape[:-2] + (3,), dtype=float)
+    a[..., i] = np.where(regular, np.arctan2(m[..., k, j], m[..., k, k]), np.arctan2(-m[..., j, k], m[..., j, j]))
+    a[..., j] = np.arctan2(-m[..., k, i], cy)
+    a[..., k] = np.where(regular, np.arctan2(m[..., j, i], m[..., i, i]), 0.0)
+
+    b = a.copy()
+    b[..., i] = np.where(regular, np.arctan2(-m[..., k, j], -m[..., k, k]), a[..., i])
+    b[..., j] = np.where(regular, np.arctan2(-m[..., k, i], -cy), a[..., j])
+    b[..., k] = np.where(regular, np.arctan2(-m[..., j, i], -m[..., i, i]), a[..., k])
+
+    if parity:
+        a, b = -a, -b
+
+    choose_a = np.abs(a).sum(axis=-1) <= np.abs(b).sum(axis=-1)
+    return np.where(choose_a[..., np.newaxis], a, b)
+
+
+def quaternion_matrix(q: np.ndarray) -> np.ndarray:
+    q = np.asarray(q, dtype=float)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack((
+        np.stack((1.0-2.0*(y*y+z*z), 2.0*(x*y-w*z), 2.0*(x*z+w*y)), axis=-1),
+        np.stack((2.0*(x*y+w*z), 1.0-2.0*(x*x+z*z), 2.0*(y*z-w*x)), axis=-1),
+        np.stack((2.0*(x*z-w*y), 2.0*(y*z+w*x), 1.0-2.0*(x*x+y*y)), axis=-1),
+        ), axis=-2)
+
+
+def euler_quaternion(angles: np.ndarray, order: str='XYZ') -> np.ndarray:
+    # Rotations are applied in the given order (as Blender's euler rotation modes)
+    angles = np.asarray(angles, dtype=float) * 0.5
+    if order == 'XYZ':
+        cx, cy, cz = np.moveaxis(np.cos(angles), -1, 0)
+        sx, sy, sz = np.moveaxis(np.sin(angles), -1, 0)
+        return np.stack((cx*cy*cz + sx*sy*sz,
+                         sx*cy*cz - cx*sy*sz,
+                         cx*sy*cz + sx*cy*sz,
+                         cx*cy*sz - sx*sy*cz), axis=-1)
+    result = None
+    for axis in order:
+        index = "XYZ".index(axis)
+        q = np.zeros(angles.shape[:-1] + (4,), dtype=float)
+        q[..., 0] = np.cos(angles[..., index])
+        q[..., index+1] = np.sin(angles[..., index])
+        result = q if result is None else multiply(q, result)
+    return result
+
+
+def axis_angle_quaternion(values: np.ndarray) -> np.ndarray:
+    # Values are (angle, x, y, z) as stored by the AXIS_ANGLE rotation mode
+    values = np.asarray(values, dtype=float)
+    axis = values[..., 1:]
+    norm = np.linalg.norm(axis, axis=-1, keepdims=True)
+    axis = np.where(norm > 0.0, axis / np.where(norm > 0.0, norm, 1.0), [0.0, 1.0, 0.0])
+    half = values[..., :1] * 0.5
+    return np.concatenate((np.cos(half), axis * np.sin(half)), axis=-1)
+
+
+def compose(location: np.ndarray, rotation: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    location = np.asarray(location, dtype=float)
+    basis = quaternion_matrix(rotation) * np.asarray(scale, dtype=float)[..., np.newaxis, :]
+    shape = np.broadcast_shapes(location.shape[:-1], basis.shape[:-2])
+    matrix = np.zeros(shape + (4, 4), dtype=float)
+    matrix[..., :3, :3] = basis
+    matrix[..., :3, 3] = location
+    matrix[..., 3, 3] = 1.0
+    return matrix
+
+
+def decompose(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return location(matrix), quaternion(matrix), scale(matrix)
@@ -0,0 +1,188 @@
+
+from collections import Counter
+from dataclasses import fields, replace
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Set, Tuple, Type, TypeVar
+from ..events import dataclass, Event
+
+__all__ = ["dataclass", "deferrable", "dispatch", "dispatch_event", "Event", "event_handler"]
+
+# Handlers are registered here rather than with lib.events so dispatching needs no
+# search: TABLE maps each concrete event class to the flattened tuple of handlers
+# registered for it and its base classes. Entries are filled on first dispatch and
+# the table is cleared whenever a handler is registered or removed. dispatch(cls,
+# *args) returns without constructing the event when no handler would receive it.
+
+# Property update callbacks write other properties whose callbacks dispatch more
+# events, which can cascade into hundreds of nested updates. Events dispatched
+# while another is being handled are deferred until the outermost dispatch has
+# returned, when they're dispatched in order. Deferrable events (property update
+# events) for the same data and property are coalesced into one, keeping the
+# first previous value and the latest value. Events other than deferrable ones
+# are dispatched immediately.
+#
+# An event raised again more than MAX_REPEATS times in one outer update is part
+# of a cycle and is dropped. Outer updates causing more than STORM_THRESHOLD
+# nested events log a report with the counts for each event type. That bookkeeping
+# (a Storm) is only created once an event is deferred, so an outer update raising
+# no deferrable events costs no more than its handlers.
+
+MAX_REPEATS = 16
+
+STORM_THRESHOLD = 100
+
+log = logging.getLogger(__name__)
+
+DEFERRABLE: Set[Type[Event]] = set()
+
+E = TypeVar("E", bound=Type[Event])
+
+Handler = Callable[[Event], None]
+
+HANDLERS: Dict[Type[Event], List[Handler]] = {}
+
+TABLE: Dict[Type[Event], Tuple[Handler, ...]] = {}
+
+
+def event_handler(*types: Type[Event]) -> Callable[[Handler], Handler]:
+    """Decorator registering a function as the handler of the given event classes
+    (and their subclasses).
+    """
+    def decorator(function: Handler) -> Handler:
+        for cls in types:
+            HANDLERS.setdefault(cls, []).append(function)
+        TABLE.clear()
+        return function
+    return decorator
+
+
+def event_handler_remove(function: Handler) -> None:
+    for handlers in HANDLERS.values():
+        while function in handlers:
+            handlers.remove(function)
+    TABLE.clear()
+
+
+def handlers(cls: Type[Event]) -> Tuple[Handler, ...]:
+    result = TABLE.get(cls)
+    if result is None:
+        result = []
+        for base in reversed(cls.__mro__):
+            for function in HANDLERS.get(base, ()):
+                if function not in result:
+                    result.append(function)
+        result = TABLE[cls] = tuple(result)
+    return result
+
+
+def deferrable(cls: E) -> E:
+    """Marks an event class as safe to defer and coalesce when dispatched from
+    within another event's handlers.
+    """
+    DEFERRABLE.add(cls)
+    return cls
+
+
+class Storm:
+
+    def __init__(self, event: Event) -> None:
+        self.origin = type(event).__name__
+        self.pending: Dict[Hashable, Event] = {}
+        self.raised = Counter()
+        self.dispatched = Counter()
+        self.repeats = Counter()
+        self.cycles: Set[str] = set()
+
+    def defer(self, key: Hashable, event: Event) -> None:
+        name = type(event).__name__
+        self.raised[name] += 1
+        if self.repeats[key] >= MAX_REPEATS:
+            self.cycles.add(name)
+            return
+        previous = self.pending.get(key)
+        if previous is not None and hasattr(event, "previous_value"):
+            event = replace(event, previous_value=previous.previous_value)
+        self.pending[key] = event
+
+    def pop(self) -> Tuple[Hashable, Event]:
+        key = next(iter(self.pending))
+        event = self.pending.pop(key)
+        self.repeats[key] += 1
+        self.dispatched[type(event).__name__] += 1
+        return key, event
+
+    @property
+    def total(self) -> int:
+        return sum(self.raised.values())
+
+    def report(self) -> str:
+        lines = [f'Update storm from {self.origin}: {self.total} nested events, '
+                 f'{sum(self.dispatched.values())} dispatched']
+        for name, count in self.raised.most_common():
+            line = f'  {name}: {count} raised, {self.dispatched[name]} dispatched'
+            if name in self.cycles:
+                line += " (cycle, dropped)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+# The outermost event being dispatched, and the Storm of the events it deferred
+OUTER = None
+
+STORM = None
+
+
+def identity(value: Any) -> Hashable:
+    try:
+        return value.as_pointer()
+    except AttributeError: pass
+    try:
+        hash(value)
+    except TypeError:
+        return id(value)
+    return value
+
+
+def event_key(event: Event) -> Hashable:
+    # Events for the same data and property share a key, whatever their values
+    return (type(event),) + tuple(identity(getattr(event, x.name))
+                                  for x in fields(event)
+                                  if x.name not in ("value", "previous_value"))
+
+
+def handle(event: Event) -> None:
+    for function in handlers(type(event)):
+        function(event)
+
+
+def dispatch_event(event: Event) -> None:
+    global OUTER, STORM
+
+    if OUTER is not None:
+        if type(event) in DEFERRABLE:
+            if STORM is None:
+                STORM = Storm(OUTER)
+            STORM.defer(event_key(event), event)
+        else:
+            handle(event)
+        return
+
+    OUTER = event
+    try:
+        handle(event)
+        storm = STORM
+        while storm is not None and storm.pending:
+            _, deferred = storm.pop()
+            handle(deferred)
+    finally:
+        storm = STORM
+        OUTER = STORM = None
+
+    if storm is not None and (storm.total > STORM_THRESHOLD or storm.cycles):
+        log.warning(storm.report())
+
+
+def dispatch(cls: Type[Event], *args: Any) -> None:
+    """Dispatches cls(*args), without constructing the event if nothing handles it."""
+    if handlers(cls):
+        dispatch_event(cls(*args))
@@ -0,0 +1,47 @@
+
+import json
+from typing import Dict, Set, TYPE_CHECKING
+from bpy.types import Operator
+from bpy.props import BoolProperty
+from ..app import audit
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+class POSEDRIVENSHAPEKEYS_OT_audit(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.audit'
+    bl_label = "Audit Pose Drivers"
+    bl_description = "Check the file's pose driver data for inconsistencies and optionally repair them"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    repair: BoolProperty(
+        name="Repair",
+        description="Remove orphaned drivers and properties and entries for missing shape keys",
+        default=False,
+        options=set()
+        )
+
+    def execute(self, context: 'Context') -> Set[str]:
+        issues = audit.audit_all(context.blend_data.shape_keys)
+        if not issues:
+            self.report({'INFO'}, "No pose driver issues found")
+            return {'FINISHED'}
+
+        # Machine-readable output for pipeline tools
+        texts = context.blend_data.texts
+        text = texts.get(audit.REPORT_TEXT) or texts.new(audit.REPORT_TEXT)
+        text.from_string(json.dumps([issue.as_dict() for issue in issues], indent=2))
+
+        counts: Dict[str, int] = {}
+        for issue in issues:
+            counts[issue.code] = counts.get(issue.code, 0) + 1
+        summary = ", ".join(f'{code}: {count}' for code, count in sorted(counts.items()))
+
+        if self.repair:
+            repaired = audit.repair(issues)
+            self.report({'INFO'}, f'Repaired {repaired} of {len(issues)} issues ({summary}), see {text.name}')
+        else:
+            self.report({'WARNING'}, f'Found {len(issues)} issues ({summary}), see {text.name}')
+
+        return {'FINISHED'}
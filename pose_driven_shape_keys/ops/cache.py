@@ -0,0 +1,38 @@
+
+from typing import Set, TYPE_CHECKING
+from bpy.types import Operator
+from ..app import bake, jobs
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+class POSEDRIVENSHAPEKEYS_OT_cache_bake(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.cache_bake'
+    bl_label = "Bake Activation Cache"
+    bl_description = "Cache the activations of groups using the NumPy engine for the scene's frame range"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        return bool(context.blend_data.filepath)
+
+    def execute(self, context: 'Context') -> Set[str]:
+        jobs.submit(bake.bake_job(context.scene, context.blend_data.shape_keys))
+        return {'FINISHED'}
+
+
+class POSEDRIVENSHAPEKEYS_OT_cache_clear(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.cache_clear'
+    bl_label = "Clear Activation Cache"
+    bl_description = "Delete the cached activations of every Key"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        return bool(context.blend_data.filepath)
+
+    def execute(self, context: 'Context') -> Set[str]:
+        bake.clear(context.blend_data.shape_keys)
+        return {'FINISHED'}
@@ -0,0 +1,57 @@
+
+from typing import Set, TYPE_CHECKING
+from bpy.types import Operator
+from bpy.props import BoolProperty, StringProperty
+from ..app import centers
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+class POSEDRIVENSHAPEKEYS_OT_group_centers_update(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.group_centers_update'
+    bl_label = "Update Group Centers"
+    bl_description = "Update the pose values of every shape key in the active group from the pose markers of an action"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    action: StringProperty(
+        name="Action",
+        description="The action holding a pose marker for each shape key",
+        default="",
+        options=set()
+        )
+
+    set_flags: BoolProperty(
+        name="Auto-Enable Channels",
+        description="Enable the channels in which any of the poses differ from the rest pose",
+        default=False,
+        options=set()
+        )
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        ob = context.object
+        if ob is not None:
+            key = getattr(ob.data, "shape_keys", None)
+            if key is not None and key.is_property_set("pose_driven"):
+                group = key.pose_driven.groups.active
+                return group is not None and group.is_valid
+        return False
+
+    def invoke(self, context: 'Context', _) -> Set[str]:
+        if not self.action:
+            animdata = context.object.data.shape_keys.pose_driven.groups.active.object.animation_data
+            if animdata and animdata.action:
+                self.action = animdata.action.name
+        return self.execute(context)
+
+    def execute(self, context: 'Context') -> Set[str]:
+        group = context.object.data.shape_keys.pose_driven.groups.active
+        action = context.blend_data.actions.get(self.action)
+        if action is None:
+            self.report({'ERROR'}, f'Action "{self.action}" not found')
+            return {'CANCELLED'}
+
+        items = centers.update(group, action=action, set_flags=self.set_flags)
+        self.report({'INFO'}, f'Updated {len(items)} of {len(group)} centers')
+        return {'FINISHED'}
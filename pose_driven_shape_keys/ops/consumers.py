@@ -0,0 +1,84 @@
+
+from typing import Set, TYPE_CHECKING
+from bpy.types import Operator
+from bpy.props import StringProperty
+from ..app import consumers
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+def active_group(context: 'Context'):
+    object = context.object
+    if object is not None:
+        key = getattr(object.data, "shape_keys", None)
+        if key is not None and key.is_property_set("pose_driven"):
+            return key.pose_driven.groups.active
+
+
+class POSEDRIVENSHAPEKEYS_OT_consumer_add(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.consumer_add'
+    bl_label = "Add Consumer"
+    bl_description = "Make the matching shape keys of another Key follow the active group"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    key: StringProperty(
+        name="Key",
+        description="Name of the shape key datablock to link",
+        default="",
+        options=set()
+        )
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        return active_group(context) is not None
+
+    def execute(self, context: 'Context') -> Set[str]:
+        group = active_group(context)
+        key = context.blend_data.shape_keys.get(self.key)
+        if key is None or key == group.id_data:
+            self.report({'ERROR'}, f'Invalid consumer "{self.key}"')
+            return {'CANCELLED'}
+        group.consumer_add(key)
+        return {'FINISHED'}
+
+
+class POSEDRIVENSHAPEKEYS_OT_consumer_remove(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.consumer_remove'
+    bl_label = "Remove Consumer"
+    bl_description = "Stop another Key from following the active group"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    key: StringProperty(
+        name="Key",
+        description="Name of the shape key datablock to unlink",
+        default="",
+        options=set()
+        )
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        group = active_group(context)
+        return group is not None and len(group.consumers) > 0
+
+    def execute(self, context: 'Context') -> Set[str]:
+        group = active_group(context)
+        key = context.blend_data.shape_keys.get(self.key)
+        if key is None or not any(x.key == key for x in group.consumers):
+            self.report({'ERROR'}, f'"{self.key}" is not a consumer of {group.name}')
+            return {'CANCELLED'}
+        group.consumer_remove(key)
+        return {'FINISHED'}
+
+
+class POSEDRIVENSHAPEKEYS_OT_consumers_sync(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.consumers_sync'
+    bl_label = "Sync Consumers"
+    bl_description = "Update the drivers of all linked consumers, following renamed and removed shape keys"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context: 'Context') -> Set[str]:
+        consumers.sync_all(context.blend_data.shape_keys)
+        return {'FINISHED'}
@@ -0,0 +1,75 @@
+
+from typing import Set, TYPE_CHECKING
+from bpy.types import Operator
+from bpy.props import BoolProperty, EnumProperty, IntProperty
+from ..app import jobs
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+class POSEDRIVENSHAPEKEYS_OT_job_start(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.job_start'
+    bl_label = "Run in Background"
+    bl_description = "Run a pose driver operation on every Key in the file without blocking the interface"
+    bl_options = {'REGISTER'}
+
+    job: EnumProperty(
+        name="Job",
+        items=[
+            ('REBUILD', "Rebuild", "Rebuild the drivers of every pose driven shape key"),
+            ('MIGRATE', "Migrate", "Migrate legacy pose drivers"),
+            ('AUDIT'  , "Audit"  , "Check the pose driver data for inconsistencies"),
+            ],
+        default='REBUILD',
+        options=set()
+        )
+
+    force: BoolProperty(
+        name="Force",
+        description="Rebuild drivers even where they match their settings",
+        default=False,
+        options=set()
+        )
+
+    repair: BoolProperty(
+        name="Repair",
+        description="Repair the issues found by the audit",
+        default=False,
+        options=set()
+        )
+
+    threads: IntProperty(
+        name="Threads",
+        description="Worker threads solving the groups' distances and radii (0 for one per CPU, 1 to solve them one at a time)",
+        min=0,
+        default=1,
+        options=set()
+        )
+
+    def execute(self, context: 'Context') -> Set[str]:
+        keys = context.blend_data.shape_keys
+        if self.job == 'MIGRATE':
+            job = jobs.migrate_job(keys)
+        elif self.job == 'AUDIT':
+            job = jobs.audit_job(keys, self.repair)
+        else:
+            job = jobs.rebuild_job(keys, self.force, self.threads)
+        jobs.submit(job)
+        return {'FINISHED'}
+
+
+class POSEDRIVENSHAPEKEYS_OT_job_cancel(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.job_cancel'
+    bl_label = "Cancel Background Jobs"
+    bl_description = "Cancel the running and queued pose driver jobs"
+    bl_options = {'INTERNAL'}
+
+    @classmethod
+    def poll(cls, context: 'Context') -> bool:
+        return len(jobs.JOBS) > 0
+
+    def execute(self, context: 'Context') -> Set[str]:
+        jobs.cancel_all()
+        return {'FINISHED'}
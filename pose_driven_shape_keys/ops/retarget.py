@@ -0,0 +1,100 @@
+
+from re import error as RegexError
+from typing import Set, TYPE_CHECKING
+from bpy.types import Operator
+from bpy.props import BoolProperty, StringProperty
+from ..app import retarget
+if TYPE_CHECKING:
+    from bpy.types import Context
+
+
+class POSEDRIVENSHAPEKEYS_OT_retarget(Operator):
+
+    bl_idname = 'pose_driven_shape_keys.retarget'
+    bl_label = "Retarget Pose Drivers"
+    bl_description = "Point every pose driver reading an armature (and its bones) at another armature, without rebuilding the drivers"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    source: StringProperty(
+        name="From",
+        description="The armature object the drivers currently read",
+        default="",
+        options=set()
+        )
+
+    target: StringProperty(
+        name="To",
+        description="The armature object the drivers should read (leave empty to only rename bones)",
+        default="",
+        options=set()
+        )
+
+    bone_pattern: StringProperty(
+        name="Bone Pattern",
+        description="Regular expression matching the bone names to replace",
+        default="",
+        options=set()
+        )
+
+    bone_replacement: StringProperty(
+        name="Replacement",
+        description="Replacement for the matched bone names (may use \\1 etc.)",
+        default="",
+        options=set()
+        )
+
+    active_only: BoolProperty(
+        name="Active Key Only",
+        description="Only retarget the drivers of the active object's shape keys",
+        default=False,
+        options=set()
+        )
+
+    def invoke(self, context: 'Context', _) -> Set[str]:
+        if not self.source:
+            key = getattr(getattr(context.object, "data", None), "shape_keys", None)
+            if key is not None and key.is_property_set("pose_driven"):
+                group = key.pose_driven.groups.active
+                if group is not None and group.object is not None:
+                    self.source = group.object.name
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context: 'Context') -> None:
+        layout = self.layout
+        layout.use_property_split = True
+        data = context.blend_data
+        layout.prop_search(self, "source", data, "objects", icon='ARMATURE_DATA')
+        layout.prop_search(self, "target", data, "objects", icon='ARMATURE_DATA')
+        layout.prop(self, "bone_pattern")
+        layout.prop(self, "bone_replacement")
+        layout.prop(self, "active_only")
+
+    def execute(self, context: 'Context') -> Set[str]:
+        data = context.blend_data
+        source = data.objects.get(self.source)
+        if source is None or source.type != 'ARMATURE':
+            self.report({'ERROR'}, f'Armature "{self.source}" not found')
+            return {'CANCELLED'}
+
+        target = data.objects.get(self.target) if self.target else source
+        if target is None or target.type != 'ARMATURE':
+            self.report({'ERROR'}, f'Armature "{self.target}" not found')
+            return {'CANCELLED'}
+
+        try:
+            bones = retarget.bone_mapping(pattern=self.bone_pattern, replacement=self.bone_replacement)
+        except RegexError as error:
+            self.report({'ERROR'}, f'Invalid bone pattern: {error}')
+            return {'CANCELLED'}
+
+        keys = None
+        if self.active_only:
+            key = getattr(getattr(context.object, "data", None), "shape_keys", None)
+            if key is None:
+                self.report({'ERROR'}, "The active object has no shape keys")
+                return {'CANCELLED'}
+            keys = (key,)
+
+        report = retarget.retarget({source: target}, bones, keys)
+        self.report({'INFO'}, str(report))
+        return {'FINISHED'}
@@ -0,0 +1,98 @@
+import bpy
+from .api.activation_center import PoseDrivenShapeKeyActivationCenterBone, PoseDrivenShapeKeyActivationCenter
+from .api.activation import PoseDrivenShapeKeyActivation
+from .api.consumer import PoseDrivenShapeKeyConsumer
+from .api.group_bone import PoseDrivenShapeKeyGroupBone
+from .api.group import PoseDrivenShapeKeyGroup
+from .api.groups import PoseDrivenShapeKeyGroups
+from .api.shape_key import PoseDrivenShapeKey
+from .api.shape_keys import PoseDrivenShapeKeys
+from .app import (approximation,
+                  cache,
+                  consumers,
+                  drivers,
+                  engine,
+                  fcurves,
+                  jobs,
+                  kernels,
+                  radii,
+                  sampler,
+                  suspend)
+from .ops.audit import POSEDRIVENSHAPEKEYS_OT_audit
+from .ops.cache import POSEDRIVENSHAPEKEYS_OT_cache_bake, POSEDRIVENSHAPEKEYS_OT_cache_clear
+from .ops.centers import POSEDRIVENSHAPEKEYS_OT_group_centers_update
+from .ops.consumers import (POSEDRIVENSHAPEKEYS_OT_consumer_add,
+                            POSEDRIVENSHAPEKEYS_OT_consumer_remove,
+                            POSEDRIVENSHAPEKEYS_OT_consumers_sync)
+from .ops.jobs import POSEDRIVENSHAPEKEYS_OT_job_start, POSEDRIVENSHAPEKEYS_OT_job_cancel
+from .ops.retarget import POSEDRIVENSHAPEKEYS_OT_retarget
+
+# Registered by the add-on after its own classes (the curve mapping types the
+# activations use).
+
+CLASSES = [
+    PoseDrivenShapeKeyActivationCenterBone,
+    PoseDrivenShapeKeyActivationCenter,
+    PoseDrivenShapeKeyActivation,
+    PoseDrivenShapeKeyConsumer,
+    PoseDrivenShapeKeyGroupBone,
+    PoseDrivenShapeKeyGroup,
+    PoseDrivenShapeKeyGroups,
+    PoseDrivenShapeKey,
+    PoseDrivenShapeKeys,
+    POSEDRIVENSHAPEKEYS_OT_audit,
+    POSEDRIVENSHAPEKEYS_OT_cache_bake,
+    POSEDRIVENSHAPEKEYS_OT_cache_clear,
+    POSEDRIVENSHAPEKEYS_OT_group_centers_update,
+    POSEDRIVENSHAPEKEYS_OT_consumer_add,
+    POSEDRIVENSHAPEKEYS_OT_consumer_remove,
+    POSEDRIVENSHAPEKEYS_OT_consumers_sync,
+    POSEDRIVENSHAPEKEYS_OT_job_start,
+    POSEDRIVENSHAPEKEYS_OT_job_cancel,
+    POSEDRIVENSHAPEKEYS_OT_retarget,
+    ]
+
+# Modules whose event handlers are connected by importing them
+HANDLERS = (
+    consumers,
+    drivers,
+    fcurves,
+    radii,
+    )
+
+# Modules with handlers, timers or driver namespace entries of their own
+MODULES = [
+    cache,
+    sampler,
+    kernels,
+    approximation,
+    engine,
+    suspend,
+    jobs,
+    ]
+
+
+def register() -> None:
+    for cls in CLASSES:
+        bpy.utils.register_class(cls)
+
+    bpy.types.Key.pose_driven = bpy.props.PointerProperty(
+        name="Pose Driven Shape Keys",
+        type=PoseDrivenShapeKeys,
+        options=set()
+        )
+
+    for module in MODULES:
+        module.register()
+
+
+def unregister() -> None:
+    for module in reversed(MODULES):
+        module.unregister()
+
+    try:
+        del bpy.types.Key.pose_driven
+    except: pass
+
+    for cls in reversed(CLASSES):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,75 @@
+"""Reports how much minimizing shortens each registered metric's driver expression,
+at full precision and at fewer significant digits, and the largest difference the
+minimized expressions make to the distances. Kernel rows minimize as for kernels,
+sharing subexpressions and squaring with assignments rather than pow().
+
+Runs outside Blender: python scripts/expression_size.py [samples] [--output sizes.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_driven_shape_keys.core import minimize, registry
+
+PRECISIONS = (None, 9, 6, 4)
+
+
+def samples(metric: registry.Metric, count: int, seed: int=0) -> tuple:
+    rng = np.random.default_rng(seed)
+    if metric.params is not None:
+        q = rng.normal(size=(2, count, 4))
+        q /= np.linalg.norm(q, axis=-1, keepdims=True)
+        q = np.where(q[..., :1] < 0.0, -q, q)
+        return metric.params(q[0]), metric.params(q[1]), metric.names
+    centers, poses = rng.uniform(-2.0, 2.0, size=(2, count, 3))
+    return centers, poses, ("x", "y", "z")
+
+
+def measure(metric: registry.Metric, count: int) -> dict:
+    centers, poses, names = samples(metric, count)
+    results = {}
+    for precision in PRECISIONS:
+        for assign in (False, True):
+            items = []
+            error = 0.0
+            for center, pose in zip(centers.tolist(), poses.tolist()):
+                text = metric.expression(names, center)
+                item = minimize.minimize(text, precision, assign, names)
+                items.append(item)
+                namespace = dict(zip(names, pose))
+                a = eval(compile(text, "<driver>", "eval"), dict(registry.NAMESPACE), dict(namespace))
+                b = eval(compile(item.expression, "<driver>", "eval"), dict(registry.NAMESPACE), dict(namespace))
+                error = max(error, abs(a - b))
+            result = minimize.report(items)
+            result["error"] = error
+            results[f'{precision or "full"}{" kernel" if assign else ""}'] = result
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("samples", type=int, nargs="?", default=200)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    results = {}
+    for metric in registry.METRICS.values():
+        results[metric.name] = measure(metric, args.samples)
+        print(metric.name)
+        for name, result in results[metric.name].items():
+            print(f'  {name:<12} {result["size"]/result["expressions"]:7.1f} -> '
+                  f'{result["length"]/result["expressions"]:7.1f} chars '
+                  f'({result["reduction"]*100.0:5.1f}% shorter), max error {result["error"]:.2e}')
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
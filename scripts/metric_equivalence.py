@@ -0,0 +1,65 @@
+"""Checks that every registered metric's driver expression matches its NumPy kernel,
+and that approximate metrics map back onto the metric they stand for. For euler
+groups of every rotation order, checks that the engine's distances match those
+of the driver expressions, which read the bone's angles in that order.
+
+Runs outside Blender: python scripts/metric_equivalence.py [samples]
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_driven_shape_keys.core import registry, transform
+
+TOLERANCE = 1e-9
+
+# acos loses precision near its domain bounds
+REMAP_TOLERANCE = 1e-6
+
+
+def euler_error(order: str, samples: int, seed: int=0) -> float:
+    # Poses are built from euler angles (in the principal range, where the driver
+    # reads back the bone's own angles) as Blender composes a bone's rotation
+    rng = np.random.default_rng(seed)
+    angles = rng.uniform(-1.5, 1.5, size=(2, samples, 3))
+    matrices = transform.compose(np.zeros(3), transform.euler_quaternion(angles, order), np.ones(3))
+    euclidean = registry.metric("euclidean")
+    # As engine.solver_build and engine.params
+    centers, poses = transform.euler(matrices, order)
+    expected = euclidean.kernel(centers, poses)
+    error = 0.0
+    # As drivers.rotation_expression
+    for center, pose, value in zip(centers.tolist(), angles[1].tolist(), expected.tolist()):
+        code = compile(euclidean.expression(("x", "y", "z"), center), "<driver>", "eval")
+        result = eval(code, dict(registry.NAMESPACE), dict(zip(("x", "y", "z"), pose)))
+        error = max(error, abs(result - value))
+    return error
+
+
+def main() -> int:
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    failed = False
+    for metric in registry.METRICS.values():
+        error = registry.equivalence(metric, samples)
+        status = "ok" if error <= TOLERANCE else "FAILED"
+        failed = failed or error > TOLERANCE
+        print(f'{metric.name:<16} max error {error:.3e} {status}')
+        if metric.remap is not None:
+            # Proxies must also map back onto the metric they stand for
+            error = registry.remap_error(metric, samples)
+            status = "ok" if error <= REMAP_TOLERANCE else "FAILED"
+            failed = failed or error > REMAP_TOLERANCE
+            print(f'{"  remapped":<16} max error {error:.3e} {status}')
+    for order in transform.EULER_ORDERS:
+        error = euler_error(order, samples)
+        status = "ok" if error <= TOLERANCE else "FAILED"
+        failed = failed or error > TOLERANCE
+        print(f'{"euler_" + order:<16} max error {error:.3e} {status}')
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())